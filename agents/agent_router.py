@@ -1,11 +1,35 @@
-from typing import Optional
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional, Sequence
 
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+
+from agents.intents import ECOMMERCE_KEYWORDS, ROUTER, RouteResult
+from agents.memory import load_session_store
+from backend.admission import AdmissionController, Overloaded, remaining
+from backend.metrics import count, merge_trace, set_intent, stage
+from backend.response_cache import cached_reply, order_status_response
+from config.settings import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_MODE,
+    BATCH_DEADLINE_MS,
+    HYBRID_RETRIEVAL,
+    LLM_STREAM_KWARGS,
+    RAG_FOLLOWUP_MODE,
+    RAG_RETRIEVAL_MAX_CONCURRENT,
+    RAG_RETRIEVAL_MAX_QUEUE,
+)
 from prompts.system_prompt import QA_PROMPT
+from rag.answer_cache import AnswerCache
+from rag.context_budget import ContextBudget, token_counter
+from rag.embeddings import query_vector
+from rag.extractive import SentenceIndex
+from rag.followup import followup_question, followup_vector, is_self_contained
+from rag.hybrid import HybridRetriever
+from rag.vectorstore import knowledge_base_hash
 from backend.mock_tools import (
-    get_order_status,
     create_return_request,
     get_refund_policy,
     payment_failed_help,
@@ -14,17 +38,6 @@ from backend.mock_tools import (
 import re
 
 
-# Keywords used to quickly check if a query is related to e‑commerce.
-ECOMMERCE_KEYWORDS = [
-    "order", "refund", "payment", "pay", "card", "upi", "wallet",
-    "shipping", "delivery", "track", "tracking",
-    "product", "item", "size", "color", "stock", "availability",
-    "price", "discount", "offer", "coupon", "promo",
-    "return", "replace", "exchange", "cancel", "cancellation",
-    "invoice", "bill", "receipt",
-    "account", "login", "signup", "register", "address",
-]
-
 def escalation_message() -> str:
     return (
         "I might not be able to fully resolve this through the chatbot. "
@@ -37,8 +50,7 @@ def escalation_message() -> str:
 
 # Quick intent filter.
 def is_ecommerce_query(query: str) -> bool:
-    q = query.lower()
-    return any(word in q for word in ECOMMERCE_KEYWORDS)
+    return "ecommerce" in ROUTER.classify(query)
 
 def clean_answer(text: str) -> str:
     """
@@ -84,172 +96,588 @@ def extract_order_id(text: str) -> Optional[str]:
     return None
 
 
-def create_agent(llm, vectorstore):
+def _order_status_reply(query: str) -> str:
+    order_id = extract_order_id(query)
+    if not order_id:
+        return (
+            "I can help you track an order, but I need the order ID first. "
+            "For example: 'Where is my order ORD123?'."
+        )
+    return order_status_response(order_id).body
+
+
+def _return_reply(query: str) -> str:
+    order_id = extract_order_id(query)
+    if not order_id:
+        return (
+            "Please include your order ID to start a return or exchange. "
+            "Example: 'I want to return order ORD123 because the item is damaged.'"
+        )
+    return create_return_request(order_id, query)
+
+
+def _payment_cancel_reply(query: str) -> str:
+    payment_msg = (
+        "If your payment failed but money was deducted, "
+        "it is usually reversed automatically within 5–7 business days."
+    )
+    cancel_msg = (
+        "Regarding cancellation: orders can only be cancelled while they are "
+        "in Pending or Processing status. Shipped orders cannot be cancelled "
+        "and may need a return after delivery."
+    )
+    return payment_msg + "\n\n" + cancel_msg
+
+
+def _canned(text: str):
+    return lambda query: text
+
+
+# Intent -> reply handler for everything answered without the LLM.
+# Intents missing here (the "rag" fallback) go to the RAG chain.
+RULE_HANDLERS = {
+    # Friendly greetings
+    "greeting": _canned(
+        "Hi! 👋 I’m your shopping assistant. "
+        "I can help you track orders, manage returns, handle payments, "
+        "or answer questions about delivery and offers."
+    ),
+    # Generic help
+    "help": _canned(
+        "Of course! 😊 Please tell me what you need help with — "
+        "for example, tracking an order, returns, refunds, or payment issues."
+    ),
+    # Polite appreciation
+    "thanks": _canned(
+        "You’re welcome! If you have any more questions about orders, "
+        "shipping, returns, or payments, feel free to ask anytime."
+    ),
+    # Repeated complaints / no response
+    "repeated_complaint": _canned(
+        "I’m really sorry about the inconvenience. "
+        "It looks like this issue needs attention from our human support team.\n\n"
+        "You can contact customer support via:\n"
+        "- Email: support@example.com\n"
+        "- Phone: 1800-123-456\n"
+        "- Live chat (9 AM – 6 PM)"
+    ),
+    # Very short or unclear queries
+    "unclear": _canned(
+        "Could you please provide a bit more detail? 😊 "
+        "For example, you can ask about order status, delivery time, refunds, or payments."
+    ),
+    "out_of_scope": _canned(
+        "I can help with shopping-related questions like orders, "
+        "returns, refunds, payments, delivery, and offers. "
+        "Please let me know how I can assist you."
+    ),
+    # Escalation cases (CRITICAL)
+    "escalation": lambda query: escalation_message(),
+    "order_status": _order_status_reply,
+    "return": _return_reply,
+    "modify_order": _canned(
+        "Orders can be modified or cancelled only while they are in Pending "
+        "or Processing status. Once shipped, changes are not possible and "
+        "a return may be requested after delivery."
+    ),
+    # Mixed intent: payment + cancel
+    "payment_cancel": _payment_cancel_reply,
+    "payment_failed": lambda query: payment_failed_help(),
+    "double_charge": lambda query: double_charge_help(),
+    "refund_policy": lambda query: get_refund_policy(),
+}
+
+
+# Intents answered by backend tools rather than canned text.
+TOOL_INTENTS = frozenset({"order_status", "return", "payment_failed", "double_charge", "refund_policy"})
+
+# Store policies: the handlers above give the default store's. A tenant
+# answers them from its own knowledge base instead.
+POLICY_INTENTS = frozenset({"refund_policy", "modify_order", "payment_cancel"})
+
+
+def rule_intent(intent: str, tenant: Optional[str] = None) -> bool:
+    """True if a rule or tool answers `intent` (for `tenant`), False for RAG."""
+    return intent in RULE_HANDLERS and not (tenant is not None and intent in POLICY_INTENTS)
+
+
+def intent_kind(intent: str) -> str:
+    """Which path answers an intent: "rule", "tool" or "rag"."""
+    if intent in TOOL_INTENTS:
+        return "tool"
+    if intent in RULE_HANDLERS:
+        return "rule"
+    return "rag"
+
+
+def route_query(query: str) -> RouteResult:
+    """Resolve the intent of `query` with the compiled intent table."""
+    return ROUTER.route(query)
+
+
+# Intents whose reply does not depend on the query text at all.
+STATIC_INTENTS = frozenset(RULE_HANDLERS) - {"order_status", "return"}
+
+
+def rule_reply(query: str, route: RouteResult) -> Optional[str]:
+    """Answer a routed query without the LLM, or None if it needs RAG."""
+    handler = RULE_HANDLERS.get(route.intent)
+    if handler is None:
+        return None
+    if route.intent in STATIC_INTENTS:
+        return cached_reply(route.intent, "", lambda: handler(query)).body
+    if route.intent == "order_status":
+        order_id = extract_order_id(query)
+        if order_id:
+            return order_status_response(order_id).body
+    return handler(query)
+
+
+class PreparedAnswer(NamedTuple):
+    """A RAG query up to generation (see `prepare_answer` in create_agent)."""
+    question: str
+    vector: Optional[object]  # embedding of the query itself, for the answer cache
+    ids: List[int]  # retrieved passage ids
+    reply: Optional[str]  # set when no generation is needed
+
+
+def create_agent(llm, vectorstore, sessions=None, answer_cache=None, admission=None,
+                 followup_mode=RAG_FOLLOWUP_MODE, answer_mode=ANSWER_MODE, sentence_index=None,
+                 retrieval_admission=None, tenant=None):
     """
     Agent factory.
 
-    - Builds a ConversationalRetrievalChain (LLM + vector store + memory)
+    - Builds a ConversationalRetrievalChain (LLM + vector store)
       used for FAQ / policy questions (shipping time, discounts, payments, etc.).
+      Its steps (condense, retrieve, answer) are run one by one so each
+      can be timed per request. With followup_mode "blend" (the default)
+      follow-ups are retrieved with the recent user turns instead of being
+      condensed by the LLM, so it generates once per request.
     - Wraps that chain in an `agent` function which:
         * Filters out non‑ecommerce queries.
-        * Calls mock backend tools for order_status / return / refund policy.
-        * Falls back to RAG+LLM when no tool is needed.
+        * Calls mock backend tools for order_status / return / refund policy
+          (a `tenant` agent answers policy questions from its own documents).
+        * Falls back to RAG+LLM when no tool is needed, passing the chat
+          history of the caller's session only.
+        * Serves repeated / paraphrased standalone FAQ questions from the
+          semantic answer cache instead of generating again.
+        * With answer_mode "extractive", replies with the knowledge-base
+          sentences closest to the question when they are similar enough,
+          and only generates below that threshold.
+        * Bounds concurrent generations (admission control), and
+          separately concurrent embedding / retrieval / extraction, and
+          answers with the top retrieved passage verbatim when a request is
+          shed or misses its deadline.
     """
 
-    # Multi‑turn chat memory so the chain can see previous messages.
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True,
-        output_key="answer",
-    )
+    # Multi‑turn chat memory, kept separately for every session id.
+    if sessions is None:
+        sessions = load_session_store()
+
+    # Answers are only valid for the knowledge base they were generated from.
+    if answer_cache is None and ANSWER_CACHE_ENABLED:
+        answer_cache = AnswerCache(
+            vectorstore.embeddings, kb_hash=knowledge_base_hash()
+        )
+
+    # Knowledge-base sentences, embedded once, for extractive replies.
+    if answer_mode != "extractive":
+        sentence_index = None
+    elif sentence_index is None:
+        sentence_index = SentenceIndex.build(vectorstore)
+
+    # Dense + BM25 retrieval fused by rank (dense only without a BM25 index).
+    lexical = getattr(vectorstore, "lexical_index", None) if HYBRID_RETRIEVAL else None
+    retriever = HybridRetriever(vectorstore=vectorstore, lexical=lexical)
 
     # RAG chain over your knowledge base documents.
     qa_chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
-        retriever=vectorstore.as_retriever(search_kwargs={"k": 5}),
-        memory=memory,
+        retriever=retriever,
         combine_docs_chain_kwargs={"prompt": QA_PROMPT},
         chain_type="stuff",
         return_source_documents=False,
         verbose=False,
     )
 
-    def agent(query: str) -> str:
-        q_lower = query.lower()
-        
-        # Friendly greetings
-        if q_lower.strip() in ["hi", "hello", "hey", "good morning", "good evening"]:
-            return (
-                "Hi! 👋 I’m your shopping assistant. "
-                "I can help you track orders, manage returns, handle payments, "
-                "or answer questions about delivery and offers."
-            )
+    if admission is None:
+        admission = AdmissionController()
+    if retrieval_admission is None:
+        retrieval_admission = AdmissionController(RAG_RETRIEVAL_MAX_CONCURRENT, RAG_RETRIEVAL_MAX_QUEUE)
 
-        # Generic help
-        if q_lower.strip() in ["i need help", "help", "can you help me"]:
-            return (
-                "Of course! 😊 Please tell me what you need help with — "
-                "for example, tracking an order, returns, refunds, or payment issues."
-            )
+    # Passages and history are packed into the model's input window.
+    budget = ContextBudget(token_counter(llm))
+    condense_prompt = qa_chain.question_generator.prompt
 
-        # 0. Polite appreciation
-        if any(p in q_lower for p in ["thank you", "thanks", "appreciate", "good job"]):
-            return (
-                "You’re welcome! If you have any more questions about orders, "
-                "shipping, returns, or payments, feel free to ask anytime."
-            )
+    technical_issue = (
+        "Sorry, I ran into a technical issue. Please try again later or "
+        "contact customer support."
+    )
 
-        # Repeated complaints / no response
-        if "multiple complaints" in q_lower or "no response" in q_lower:
-            return (
-                "I’m really sorry about the inconvenience. "
-                "It looks like this issue needs attention from our human support team.\n\n"
-                "You can contact customer support via:\n"
-                "- Email: support@example.com\n"
-                "- Phone: 1800-123-456\n"
-                "- Live chat (9 AM – 6 PM)"
-            )
-        # Very short or unclear queries
-        if len(q_lower.split()) < 2:
+    def routed_reply(query: str, route: Optional[RouteResult] = None) -> Optional[str]:
+        """Route `query` (unless already routed); answer it if a rule or tool handles its intent."""
+        if route is None:
+            with stage("route"):
+                route = route_query(query)
+        set_intent(route.intent)
+        if not rule_intent(route.intent, tenant):
+            return None
+        with stage(intent_kind(route.intent)):
+            return rule_reply(query, route)
+
+    def cacheable(query: str, history) -> bool:
+        # Follow-ups depend on the conversation, so only self-contained
+        # questions are served from / stored in the answer cache.
+        return answer_cache is not None and (not history or is_self_contained(query))
+
+    def cache_vector(query: str, question: str, vector):
+        """The retrieval embedding, when it is the embedding of `query` itself."""
+        return vector if question == query else None
+
+    def lookup_cache(query: str, history, vector=None) -> Optional[str]:
+        if not cacheable(query, history):
+            return None
+        with stage("cache_lookup"):
+            return answer_cache.lookup(query, vector)
+
+    def finish(query: str, session_id, history, raw_answer: str, elapsed: float, vector=None) -> str:
+        with stage("clean"):
+            answer = clean_answer(raw_answer)
+        if not answer or len(answer) < 20:
             return (
-                "Could you please provide a bit more detail? 😊 "
-                "For example, you can ask about order status, delivery time, refunds, or payments."
-            )
-        # 1. Out-of-scope
-        if not is_ecommerce_query(q_lower):
-             return (
-                "I can help with shopping-related questions like orders, "
-                "returns, refunds, payments, delivery, and offers. "
-                "Please let me know how I can assist you."
+                "I’m not completely sure about that. Could you please provide "
+                "a bit more detail about your issue?"
             )
 
-        # 2. Escalation cases (CRITICAL)
-        if any(p in q_lower for p in [
-            "missing item", "items missing", "courier not responding",
-            "multiple complaints", "no response", "not responding"
-        ]):
-            return escalation_message()
-
-        # 3. Order tracking
-        if "order" in q_lower and ("status" in q_lower or "track" in q_lower or "where is" in q_lower):
-            order_id = extract_order_id(query)
-            if not order_id:
-                return (
-                    "I can help you track an order, but I need the order ID first. "
-                    "For example: 'Where is my order ORD123?'."
-                )
-            return get_order_status(order_id)
-
-        # 4. Return / exchange
-        if any(p in q_lower for p in ["return", "replace", "exchange"]):
-            order_id = extract_order_id(query)
-            if not order_id:
-                return (
-                    "Please include your order ID to start a return or exchange. "
-                    "Example: 'I want to return order ORD123 because the item is damaged.'"
-                )
-            return create_return_request(order_id, query)
+        if cacheable(query, history):
+            with stage("cache_store"):
+                answer_cache.store(query, answer, elapsed, vector)
+        sessions.append(session_id, query, answer)
+        return answer
 
-        # 5. Modify / cancel order
-        if "modify my order" in q_lower or "change my order" in q_lower:
-            return (
-                "Orders can be modified or cancelled only while they are in Pending "
-                "or Processing status. Once shipped, changes are not possible and "
-                "a return may be requested after delivery."
-            )
-            
-        # Mixed intent: payment + cancel
-        if "payment" in q_lower and "cancel" in q_lower:
-            payment_msg = (
-                "If your payment failed but money was deducted, "
-                "it is usually reversed automatically within 5–7 business days."
+    def record_packing(part: str, packed) -> None:
+        count("chat_prompt_tokens_total", packed.tokens, part=part)
+        count("chat_prompt_dropped_tokens_total", packed.dropped_tokens, part=part)
+        if packed.duplicates:
+            count("chat_prompt_duplicate_passages_total", packed.duplicates)
+
+    def condense(query: str, history, deadline: Optional[float] = None) -> str:
+        """
+        The LLM's standalone rewrite of follow-up `query`. It is a generation
+        like any other, so it waits for a generation slot; raises Overloaded,
+        or FutureTimeout when the deadline passes first.
+        """
+        with stage("pack"):
+            turns = budget.pack_history(
+                history, budget.remaining(condense_prompt, chat_history="", question=query)
             )
-            cancel_msg = (
-                "Regarding cancellation: orders can only be cancelled while they are "
-                "in Pending or Processing status. Shipped orders cannot be cancelled "
-                "and may need a return after delivery."
-            )
-            return payment_msg + "\n\n" + cancel_msg
-
-        # 6. Payment failures
-        if "payment failed" in q_lower or "upi failed" in q_lower:
-            return payment_failed_help()
+        record_packing("history", turns)
 
-        if "charged twice" in q_lower or "double charge" in q_lower:
-            return double_charge_help()
-
-        # 7. Refund policy
-        if "refund policy" in q_lower:
-            return get_refund_policy()
+        def generate():
+            with stage("condense"):
+                return qa_chain.question_generator.run(
+                    question=query, chat_history=_get_chat_history(turns.items)
+                )
 
-        # 8. Generic help
-        if q_lower.strip() in ["help", "i need help"]:
-            return (
-                "I can assist you with:\n"
-                "- Order tracking\n"
-                "- Returns & refunds\n"
-                "- Payment issues\n"
-                "- Delivery & offers\n\n"
-                "Please tell me what you need help with."
+        with stage("admission"):
+            future = admission.submit(generate, deadline)
+        question = future.result(timeout=remaining(deadline))
+        merge_trace(future.trace)
+        return question
+
+    def standalone_question(query: str, history, deadline: Optional[float] = None) -> str:
+        """The question a follow-up is retrieved with (condensed in llm mode)."""
+        if history and followup_mode == "llm":
+            return condense(query, history, deadline)
+        return followup_question(query, history)
+
+    def embed_question(query: str, question: str, history):
+        """The embedding `question` is retrieved with."""
+        with stage("embed"):
+            if history and followup_mode == "llm":
+                return query_vector(vectorstore.embeddings, question)
+            return followup_vector(vectorstore.embeddings, query, history)
+
+    def retrieve(query: str, history):
+        """(question, embedding, passage ids) RAG answers `query` from."""
+        question = standalone_question(query, history)
+        vector = embed_question(query, question, history)
+        with stage("retrieve"):
+            ids = retriever.ranked_ids(question, vector)
+        return question, vector, ids
+
+    def search(query: str, session_id: Optional[str] = None):
+        """Passages RAG would answer `query` from in this session."""
+        _, _, ids = retrieve(query, sessions.get_history(session_id))
+        return retriever.documents(ids)
+
+    def extractive_reply(vector, ids) -> Optional[str]:
+        """Top knowledge-base sentences, or None to generate instead."""
+        if sentence_index is None:
+            return None
+        with stage("extract"):
+            reply, _ = sentence_index.extract(vector, ids)
+        count("chat_extractive_total", outcome="fallback" if reply is None else "answered")
+        return reply
+
+    def prompt_question(query: str, question: str) -> str:
+        """
+        The question the LLM answers: the condensed rewrite in llm mode, else
+        the latest message; blended follow-up text is only for retrieval.
+        """
+        return question if followup_mode == "llm" else query
+
+    def build_prompt(question: str, ids) -> str:
+        """
+        The prompt qa_chain sends to the LLM for its answer, built step by
+        step so each step can be timed: read the retrieved passages, pack
+        them into QA_PROMPT within the token budget.
+        """
+        with stage("retrieve"):
+            docs = retriever.documents(ids)
+        with stage("pack"):
+            passages = budget.pack_passages(
+                [doc.page_content for doc in docs],
+                budget.remaining(QA_PROMPT, context="", question=question),
             )
+        record_packing("context", passages)
+        return QA_PROMPT.format(context="\n\n".join(passages.items), question=question)
 
-        # 9. RAG fallback (FAQs only)
+    def degraded_reply(query: str, reason: str) -> str:
+        """Top retrieved passage verbatim (no LLM), else the escalation text."""
+        count("chat_rag_degraded_total", reason=reason)
         try:
-            result = qa_chain({"question": query})
-            answer = clean_answer(result.get("answer", ""))
+            with stage("degraded"):
+                ids = retriever.lexical_ids(query)[:1]
+                if not ids:
+                    ids = retriever.dense_ids(query_vector(vectorstore.embeddings, query))[:1]
+                docs = retriever.documents(ids)
         except Exception:
-            return (
-                "Sorry, I ran into a technical issue. Please try again later or "
-                "contact customer support."
-            )
-
-        if not answer or len(answer) < 20:
-            return (
-                "I’m not completely sure about that. Could you please provide "
-                "a bit more detail about your issue?"
-            )
+            docs = []
+        return docs[0].page_content if docs else escalation_message()
+
+    def store_late_answer(query: str, history, vector=None):
+        """Done-callback keeping a generation that missed its deadline."""
+        def store(future):
+            if not cacheable(query, history) or future.exception() is not None:
+                return
+            raw_answer, elapsed = future.result()
+            answer = clean_answer(raw_answer)
+            if len(answer) >= 20:
+                answer_cache.store(query, answer, elapsed, vector)
+        return store
+
+    @contextmanager
+    def retrieval_slot(deadline: Optional[float] = None):
+        """Hold a retrieval slot for the block; raises Overloaded."""
+        with stage("admission"):
+            retrieval_admission.acquire(deadline)
+        start = time.perf_counter()
+        elapsed = None
+        try:
+            yield
+            elapsed = time.perf_counter() - start
+        finally:
+            retrieval_admission.release(elapsed)
+
+    def prepare_answer(query: str, session_id, history, start: float,
+                       deadline: Optional[float] = None) -> PreparedAnswer:
+        """
+        Everything RAG does before generating: the retrieval question and
+        embedding, the answer cache lookup, retrieval and the extractive
+        reply. `reply` is set when no generation is needed: a cached or
+        extracted answer (recorded in the session), or the degraded reply
+        when admission sheds the request or its deadline passes.
+        """
+        try:
+            question = standalone_question(query, history, deadline)
+        except Overloaded as exc:
+            count("chat_rag_shed_total", reason=exc.reason)
+            return PreparedAnswer(query, None, [], degraded_reply(query, exc.reason))
+        except FutureTimeout:
+            count("chat_rag_timeouts_total")
+            return PreparedAnswer(query, None, [], degraded_reply(query, "timeout"))
+
+        ids, extracted = [], None
+        try:
+            with retrieval_slot(deadline):
+                vector = embed_question(query, question, history)
+                own_vector = cache_vector(query, question, vector)
+                cached = lookup_cache(query, history, own_vector)
+                if cached is None:
+                    with stage("retrieve"):
+                        ids = retriever.ranked_ids(question, vector)
+                    extracted = extractive_reply(vector, ids)
+        except Overloaded as exc:
+            count("chat_rag_shed_total", reason="retrieval_" + exc.reason)
+            return PreparedAnswer(question, None, [], degraded_reply(query, "retrieval_" + exc.reason))
+
+        if cached is not None:
+            sessions.append(session_id, query, cached)
+            return PreparedAnswer(question, own_vector, ids, cached)
+        if extracted is not None:
+            extracted = finish(query, session_id, history, extracted, time.perf_counter() - start, own_vector)
+        return PreparedAnswer(question, own_vector, ids, extracted)
+
+    def agent(query: str, session_id: Optional[str] = None, deadline: Optional[float] = None) -> str:
+        reply = routed_reply(query)
+        if reply is not None:
+            return reply
+
+        # RAG fallback (FAQs only)
+        try:
+            history = sessions.get_history(session_id)
+            start = time.perf_counter()
+            prepared = prepare_answer(query, session_id, history, start, deadline)
+            if prepared.reply is not None:
+                return prepared.reply
+
+            def generate():
+                prompt = build_prompt(prompt_question(query, prepared.question), prepared.ids)
+                with stage("generate"):
+                    raw_answer = llm.invoke(prompt)
+                return raw_answer, time.perf_counter() - start
+
+            try:
+                with stage("admission"):
+                    future = admission.submit(generate, deadline)
+            except Overloaded as exc:
+                count("chat_rag_shed_total", reason=exc.reason)
+                return degraded_reply(query, exc.reason)
+
+            try:
+                raw_answer, elapsed = future.result(timeout=remaining(deadline))
+                merge_trace(future.trace)
+            except FutureTimeout:
+                count("chat_rag_timeouts_total")
+                future.add_done_callback(store_late_answer(query, history, prepared.vector))
+                return degraded_reply(query, "timeout")
+        except Exception:
+            return technical_issue
+
+        return finish(query, session_id, history, raw_answer, elapsed, prepared.vector)
+
+    def stream(query: str, session_id: Optional[str] = None, deadline: Optional[float] = None,
+               route: Optional[RouteResult] = None):
+        """
+        Streaming variant of `agent`.
+
+        Yields ("token", text) while the LLM generates and always ends with
+        ("done", reply), where reply is the cleaned final answer. Rule, tool,
+        cached and extractive replies produce only the "done" event. The
+        deadline only applies to admission: once tokens flow, the stream
+        runs to the end. `route` is the result of `route_query(query)`, if
+        the caller already has it.
+        """
+        reply = routed_reply(query, route)
+        if reply is not None:
+            yield "done", reply
+            return
 
-        return answer
+        try:
+            history = sessions.get_history(session_id)
+            start = time.perf_counter()
+            prepared = prepare_answer(query, session_id, history, start, deadline)
+            if prepared.reply is not None:
+                yield "done", prepared.reply
+                return
+
+            try:
+                with stage("admission"):
+                    admission.acquire(deadline)
+            except Overloaded as exc:
+                count("chat_rag_shed_total", reason=exc.reason)
+                yield "done", degraded_reply(query, exc.reason)
+                return
+
+            elapsed = None
+            try:
+                prompt = build_prompt(prompt_question(query, prepared.question), prepared.ids)
+                parts = []
+                tokens = llm.stream(prompt, pipeline_kwargs=LLM_STREAM_KWARGS)
+                while True:
+                    # Only time generation, not the time the client takes to
+                    # consume each token.
+                    with stage("generate"):
+                        token = next(tokens, None)
+                    if token is None:
+                        break
+                    parts.append(token)
+                    yield "token", token
+                elapsed = time.perf_counter() - start
+            finally:
+                # The slot is freed even when the client goes away mid-stream.
+                admission.release(elapsed)
+        except Exception:
+            yield "done", technical_issue
+            return
+
+        yield "done", finish(query, session_id, history, "".join(parts), elapsed, prepared.vector)
+
+    def answer_batch(queries: Sequence[str], deadline: Optional[float] = None) -> List[str]:
+        """
+        Standalone RAG answers for `queries` (no session history), with a
+        single batched LLM call for the ones the answer cache and the
+        extractive path do not serve. Each query's retrieval and the call
+        wait for their admission slots until `deadline` (BATCH_DEADLINE_MS
+        from now by default); a shed query gets the degraded reply.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + BATCH_DEADLINE_MS / 1000.0
+        replies = [None] * len(queries)
+        vectors = [None] * len(queries)
+        pending = list(range(len(queries)))
+        try:
+            start = time.perf_counter()
+            prompts = []
+            for i in list(pending):
+                prepared = prepare_answer(queries[i], None, None, start, deadline)
+                if prepared.reply is not None:
+                    replies[i] = prepared.reply
+                    pending.remove(i)
+                else:
+                    vectors[i] = prepared.vector
+                    prompts.append(build_prompt(prompt_question(queries[i], prepared.question), prepared.ids))
+            if not pending:
+                return replies
+            # One batched call holds one slot, like any other generation.
+            try:
+                with stage("admission"):
+                    admission.acquire(deadline)
+            except Overloaded as exc:
+                count("chat_rag_shed_total", reason=exc.reason)
+                for i in pending:
+                    replies[i] = degraded_reply(queries[i], exc.reason)
+                return replies
+            generation_start = time.perf_counter()
+            seconds = None
+            try:
+                with stage("generate"):
+                    raw_answers = llm.batch(prompts)
+                seconds = time.perf_counter() - generation_start
+            finally:
+                # The slot's service time is the whole batched call.
+                admission.release(seconds)
+            elapsed = (time.perf_counter() - start) / len(pending)
+        except Exception:
+            for i in pending:
+                replies[i] = technical_issue
+            return replies
+        for i, raw_answer in zip(pending, raw_answers):
+            replies[i] = finish(queries[i], None, None, raw_answer, elapsed, vectors[i])
+        return replies
+
+    agent.stream = stream
+    agent.answer_batch = answer_batch
+    agent.search = search
+    agent.sentence_index = sentence_index
+    agent.admission = admission
+    agent.retrieval_admission = retrieval_admission
+    agent.vectorstore = vectorstore
+
+    # Expose the session store and answer cache so the app can report stats.
+    agent.sessions = sessions
+    agent.answer_cache = answer_cache
 
     # Return the configured agent function to the Flask app.
     return agent
@@ -0,0 +1,193 @@
+"""
+Declarative intent table and single-pass classifier.
+
+Every intent is described once in `INTENTS` (name, priority, phrases). At
+import time all phrases are compiled into one regular expression, so a query
+is scanned exactly once and every matching intent is reported together with
+the character spans that triggered it. `route()` then picks the winning
+intent by priority; the handlers live in agents/agent_router.py.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+Span = Tuple[int, int]
+
+
+class Intent(NamedTuple):
+    name: str
+    priority: int
+    # AND of OR-groups: the intent matches when at least one phrase of
+    # every group occurs in the query (substring match, lowercase).
+    groups: Tuple[Tuple[str, ...], ...] = ()
+    # Whole-query matches (after strip/lowercase), e.g. "hi".
+    exact: Tuple[str, ...] = ()
+    # Conditions that are not phrase lookups: "short" (fewer than two
+    # words) or "off_topic" (no e-commerce keyword at all).
+    gate: Optional[str] = None
+
+
+class RouteResult(NamedTuple):
+    intent: str
+    matches: Dict[str, List[Span]]
+
+
+# Keywords used to quickly check if a query is related to e‑commerce.
+ECOMMERCE_KEYWORDS = [
+    "order", "refund", "payment", "pay", "card", "upi", "wallet",
+    "shipping", "delivery", "track", "tracking",
+    "product", "item", "size", "color", "stock", "availability",
+    "price", "discount", "offer", "coupon", "promo",
+    "return", "replace", "exchange", "cancel", "cancellation",
+    "invoice", "bill", "receipt",
+    "account", "login", "signup", "register", "address",
+]
+
+# Intent used when nothing in the table applies.
+FALLBACK_INTENT = "rag"
+
+INTENTS = [
+    Intent("greeting", 10, exact=("hi", "hello", "hey", "good morning", "good evening")),
+    Intent("help", 20, exact=("i need help", "help", "can you help me")),
+    Intent("thanks", 30, groups=(("thank you", "thanks", "appreciate", "good job"),)),
+    Intent("repeated_complaint", 40, groups=(("multiple complaints", "no response"),)),
+    Intent("unclear", 50, gate="short"),
+    Intent("out_of_scope", 60, gate="off_topic"),
+    Intent("escalation", 70, groups=((
+        "missing item", "items missing", "courier not responding",
+        "multiple complaints", "no response", "not responding",
+    ),)),
+    Intent("order_status", 80, groups=(("order",), ("status", "track", "where is"))),
+    Intent("return", 90, groups=(("return", "replace", "exchange"),)),
+    Intent("modify_order", 100, groups=(("modify my order", "change my order"),)),
+    Intent("payment_cancel", 110, groups=(("payment",), ("cancel",))),
+    Intent("payment_failed", 120, groups=(("payment failed", "upi failed"),)),
+    Intent("double_charge", 130, groups=(("charged twice", "double charge"),)),
+    Intent("refund_policy", 140, groups=(("refund policy",),)),
+]
+
+# Phrase groups that are reported as matches but are not intents themselves.
+KEYWORD_GROUPS = {
+    "ecommerce": tuple(ECOMMERCE_KEYWORDS),
+}
+
+
+def _trie_regex(phrases) -> str:
+    """
+    Build one regex alternation from a prefix trie of `phrases`.
+
+    Shared prefixes are tested once ("pay", "payment", "payment failed"
+    become `pay(?:ment(?:\\ failed)?)?`), and longer phrases win over their
+    prefixes at the same position.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def render(node) -> str:
+        optional = "" in node
+        branches = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class IntentRouter:
+    """Compiles an intent table into one regex and classifies in one pass."""
+
+    def __init__(self, intents=INTENTS, keyword_groups=KEYWORD_GROUPS):
+        self.intents = sorted(intents, key=lambda i: i.priority)
+        self.keyword_groups = dict(keyword_groups)
+        self._exact = {}
+        labels = {}  # phrase -> {(name, group_index)}
+
+        for intent in self.intents:
+            for phrase in intent.exact:
+                self._exact.setdefault(phrase, intent.name)
+            for gi, group in enumerate(intent.groups):
+                for phrase in group:
+                    labels.setdefault(phrase, set()).add((intent.name, gi))
+        for name, phrases in self.keyword_groups.items():
+            for phrase in phrases:
+                labels.setdefault(phrase, set()).add((name, 0))
+
+        # A regex reports only the longest phrase starting at each position,
+        # so each phrase also carries the labels of the phrases that are its
+        # prefixes, e.g. "payment failed" -> "payment" -> "pay".
+        self._hits = {
+            phrase: tuple(
+                (label, len(other))
+                for other, other_labels in labels.items()
+                if phrase.startswith(other)
+                for label in other_labels
+            )
+            for phrase in labels
+        }
+
+        self._group_counts = {i.name: len(i.groups) for i in self.intents if i.groups}
+        self._group_counts.update({name: 1 for name in self.keyword_groups})
+
+        self._order = [(i.name, i.gate) for i in self.intents]
+        self._pattern = re.compile(_trie_regex(labels))
+
+    def classify(self, query: str) -> Dict[str, List[Span]]:
+        """Return every matched intent / keyword group with its spans."""
+        text = query.lower()
+        found = {}  # (name, group_index) -> [spans]
+        hits = self._hits
+        search = self._pattern.search
+        # Restarting one character after each match start lets matches
+        # overlap, e.g. "exchange my order" also yields "change my order".
+        m = search(text)
+        while m is not None:
+            offset = m.start()
+            for label, length in hits[m.group()]:
+                spans = found.get(label)
+                if spans is None:
+                    found[label] = [(offset, offset + length)]
+                else:
+                    spans.append((offset, offset + length))
+            m = search(text, offset + 1)
+
+        matches = {}
+        counts = self._group_counts
+        for (name, gi), spans in found.items():
+            if counts[name] == 1:
+                matches[name] = spans
+            elif name not in matches and all((name, g) in found for g in range(counts[name])):
+                matches[name] = sorted(span for g in range(counts[name]) for span in found[(name, g)])
+
+        stripped = text.strip()
+        exact = self._exact.get(stripped)
+        if exact is not None:
+            start = text.find(stripped)
+            matches[exact] = [(start, start + len(stripped))]
+        return matches
+
+    def route(self, query: str) -> RouteResult:
+        """Classify `query` and pick the highest-priority applicable intent."""
+        matches = self.classify(query)
+        for name, gate in self._order:
+            if gate is None:
+                hit = name in matches
+            elif gate == "short":
+                hit = len(query.split()) < 2
+            else:  # "off_topic"
+                hit = "ecommerce" not in matches
+            if hit:
+                return RouteResult(name, matches)
+        return RouteResult(FALLBACK_INTENT, matches)
+
+
+ROUTER = IntentRouter()
+
+
+def route(query: str) -> RouteResult:
+    return ROUTER.route(query)
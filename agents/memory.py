@@ -0,0 +1,254 @@
+"""
+Session-scoped chat memory.
+
+Each `/chat` session keeps its own short history of (question, answer) turns,
+which is passed to the RAG chain as `chat_history`. Histories are capped per
+session (turns and approximate tokens) and whole sessions are evicted by
+LRU/TTL, so memory use stays bounded no matter how long the server runs.
+
+Two backends are available:
+    - InMemoryBackend: per-process OrderedDict (default).
+    - SQLiteBackend:   a local SQLite file shared by all workers on a host.
+
+A session's TTL counts from its last read or write. Appending a turn is a
+single read-modify-write under the backend's lock (a write transaction for
+SQLite), so concurrent turns of one session are never lost.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from config.settings import (
+    MEMORY_BACKEND,
+    MEMORY_MAX_SESSIONS,
+    MEMORY_MAX_TOKENS,
+    MEMORY_MAX_TURNS,
+    MEMORY_SQLITE_PATH,
+    MEMORY_TTL_SECONDS,
+)
+
+Turn = Tuple[str, str]
+Truncate = Callable[[List[Turn]], List[Turn]]
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate (whitespace words); good enough for capping history."""
+    return len(text.split())
+
+
+def _turns_size(turns: List[Turn]) -> int:
+    return sum(len(q.encode("utf-8")) + len(a.encode("utf-8")) for q, a in turns)
+
+
+class InMemoryBackend:
+    """LRU + TTL dict of session histories, local to one process."""
+
+    def __init__(self, max_sessions: int = MEMORY_MAX_SESSIONS, ttl: float = MEMORY_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # session_id -> (last_access, turns)
+        self._lock = threading.Lock()
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+
+    def get(self, session_id: str) -> List[Turn]:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            last_access, turns = entry
+            if self.ttl and now - last_access > self.ttl:
+                del self._sessions[session_id]
+                self.ttl_evictions += 1
+                return []
+            # Reads refresh the TTL too, keeping entries ordered by last access.
+            self._sessions[session_id] = (now, turns)
+            self._sessions.move_to_end(session_id)
+            return list(turns)
+
+    def append(self, session_id: str, turn: Turn, truncate: Truncate) -> None:
+        """Add `turn` to the session, then cap its history with `truncate`."""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            turns = []
+            if entry is not None and not (self.ttl and now - entry[0] > self.ttl):
+                turns = list(entry[1])
+            turns.append(turn)
+            self._sessions[session_id] = (now, truncate(turns))
+            self._sessions.move_to_end(session_id)
+            self._expire(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.lru_evictions += 1
+
+    def _expire(self, now: float) -> None:
+        # Least recently used entries are at the front, so stop at the first live one.
+        if not self.ttl:
+            return
+        while self._sessions:
+            session_id, (last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self.ttl_evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            turns = [t for _, t in self._sessions.values()]
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "turns": sum(len(t) for t in turns),
+                "bytes": sum(_turns_size(t) for t in turns),
+                "lru_evictions": self.lru_evictions,
+                "ttl_evictions": self.ttl_evictions,
+            }
+
+
+class SQLiteBackend:
+    """Session histories in a SQLite file, shared by every worker on the host."""
+
+    def __init__(
+        self,
+        path: str = MEMORY_SQLITE_PATH,
+        max_sessions: int = MEMORY_MAX_SESSIONS,
+        ttl: float = MEMORY_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._local = threading.local()
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " turns TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def after_fork(self) -> None:
+        # Connections opened before fork() belong to the parent.
+        self._local = threading.local()
+
+    def _read(self, conn: sqlite3.Connection, session_id: str, now: float) -> List[Turn]:
+        row = conn.execute(
+            "SELECT turns, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or (self.ttl and now - row[1] > self.ttl):
+            return []
+        return [tuple(t) for t in json.loads(row[0])]
+
+    def get(self, session_id: str) -> List[Turn]:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            turns = self._read(conn, session_id, now)
+            if turns:
+                # Reads refresh the TTL too.
+                conn.execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (now, session_id))
+        return turns
+
+    def append(self, session_id: str, turn: Turn, truncate: Truncate) -> None:
+        """Add `turn` to the session, then cap its history with `truncate`."""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            # Take the write lock before reading, so concurrent appends serialize.
+            conn.execute("BEGIN IMMEDIATE")
+            turns = truncate(self._read(conn, session_id, now) + [turn])
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, turns, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(turns), now),
+            )
+            if self.ttl:
+                cur = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+                self.ttl_evictions += cur.rowcount
+            cur = conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            self.lru_evictions += cur.rowcount
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        sessions, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(turns)), 0) FROM sessions"
+        ).fetchone()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "bytes": size,
+            "file_bytes": page_count * page_size,
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions,
+        }
+
+
+class SessionStore:
+    """Per-session history with turn and token caps on top of a backend."""
+
+    def __init__(self, backend=None, max_turns: int = MEMORY_MAX_TURNS, max_tokens: int = MEMORY_MAX_TOKENS):
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.truncated_turns = 0
+
+    def get_history(self, session_id: Optional[str]) -> List[Turn]:
+        if not session_id:
+            return []
+        return self.backend.get(session_id)
+
+    def append(self, session_id: Optional[str], question: str, answer: str) -> None:
+        if not session_id:
+            return
+        self.backend.append(session_id, (question, answer), self._truncate)
+
+    def _truncate(self, turns: List[Turn]) -> List[Turn]:
+        # Called by the backend under its lock, which also guards the counter.
+        # Drop the oldest turns first; the newest turn is always kept.
+        dropped = max(0, len(turns) - self.max_turns)
+        turns = turns[dropped:]
+        total = sum(count_tokens(q) + count_tokens(a) for q, a in turns)
+        while len(turns) > 1 and total > self.max_tokens:
+            q, a = turns.pop(0)
+            total -= count_tokens(q) + count_tokens(a)
+            dropped += 1
+        self.truncated_turns += dropped
+        return turns
+
+    def stats(self) -> dict:
+        stats = self.backend.stats()
+        stats["truncated_turns"] = self.truncated_turns
+        return stats
+
+
+def load_session_store() -> SessionStore:
+    if MEMORY_BACKEND == "sqlite":
+        return SessionStore(SQLiteBackend())
+    return SessionStore(InMemoryBackend())
@@ -0,0 +1,134 @@
+"""
+Admission control for the RAG / LLM path.
+
+Only RAG-bound requests go through here; rule and tool replies never wait
+for a slot. At most RAG_MAX_CONCURRENT requests generate at once and at most
+RAG_MAX_QUEUE wait for a slot. A request is shed (and gets a degraded reply
+instead) when:
+
+    - "queue_full": every slot is busy and the queue is full, or
+    - "deadline":   its deadline would pass before it could finish, judged
+                    by a moving average of recent RAG service times, either
+                    on arrival or while it waits in the queue.
+
+`submit` runs admitted work on a pool sized to the slots, so a caller can
+stop waiting at its deadline; the slot stays taken until the generation
+actually ends, which keeps the concurrency bound honest. The work records
+its stages in a trace of its own (`future.trace`) that the caller merges
+into the request's trace once it has the result, so a generation that
+outlives its request never writes into a trace that has already ended.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from backend.metrics import branch_trace, run_traced
+from config.settings import CHAT_DEADLINE_MS, RAG_MAX_CONCURRENT, RAG_MAX_QUEUE
+
+EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def request_deadline(timeout_ms=None) -> float:
+    """time.monotonic() deadline: the client's timeout_ms, at most CHAT_DEADLINE_MS."""
+    limit = CHAT_DEADLINE_MS
+    try:
+        if timeout_ms is not None and float(timeout_ms) > 0:
+            limit = min(float(timeout_ms), CHAT_DEADLINE_MS)
+    except (TypeError, ValueError):
+        pass
+    return time.monotonic() + limit / 1000.0
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = RAG_MAX_CONCURRENT, max_queue: int = RAG_MAX_QUEUE):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.service_seconds = 0.0  # moving average; 0 until the first completion
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self._setup()
+
+    def _setup(self) -> None:
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="rag")
+
+    def after_fork(self) -> None:
+        self.active = self.waiting = 0
+        self._setup()
+
+    def _expected_finish(self) -> float:
+        # Seconds until a request arriving now would be answered.
+        queued_rounds = (self.waiting + max(0, self.active - self.max_concurrent + 1)) / self.max_concurrent
+        return self.service_seconds * (1 + queued_rounds)
+
+    def acquire(self, deadline: Optional[float] = None) -> None:
+        """Take a slot, waiting in the queue if needed; raises Overloaded."""
+        with self._cond:
+            if self.active >= self.max_concurrent and self.waiting >= self.max_queue:
+                raise Overloaded("queue_full")
+            if deadline is not None and time.monotonic() + self._expected_finish() > deadline:
+                raise Overloaded("deadline")
+            self.waiting += 1
+            try:
+                while self.active >= self.max_concurrent:
+                    timeout = None
+                    if deadline is not None:
+                        # Give up once the remaining time is below a service time.
+                        timeout = deadline - self.service_seconds - time.monotonic()
+                        if timeout <= 0:
+                            raise Overloaded("deadline")
+                    self._cond.wait(timeout)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+
+    def release(self, seconds: Optional[float] = None) -> None:
+        with self._cond:
+            self.active -= 1
+            if seconds is not None:
+                self.service_seconds = (
+                    seconds if not self.service_seconds
+                    else (1 - EWMA_ALPHA) * self.service_seconds + EWMA_ALPHA * seconds
+                )
+            self._cond.notify()
+
+    def submit(self, fn: Callable, deadline: Optional[float] = None) -> Future:
+        """Run `fn` on the RAG pool once admitted (in the caller's context, under `future.trace`)."""
+        self.acquire(deadline)
+        start = time.perf_counter()
+        trace = branch_trace()
+        try:
+            future = self._pool.submit(contextvars.copy_context().run, run_traced, trace, fn)
+        except BaseException:
+            self.release()
+            raise
+        future.trace = trace
+        future.add_done_callback(
+            lambda f: self.release(time.perf_counter() - start if f.exception() is None else None)
+        )
+        return future
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "service_ms_avg": round(self.service_seconds * 1000.0, 3),
+            }
@@ -1,21 +1,113 @@
-from flask import Flask, request, jsonify, render_template
+import json
+import uuid
+
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
-from backend.mock_tools import get_order_status, create_return_request, get_refund_policy
+from backend.admission import request_deadline
+from backend.batch import Throughput, parse_records, triage
+from backend.mock_tools import ORDER_STORE, create_return_request
+from backend.response_cache import RESPONSE_CACHE, order_status_response, refund_policy_response
 
-from llm.llm_loader import load_llm
-from rag.vectorstore import load_vectorstore
-from agents.agent_router import create_agent
+from backend.metrics import REGISTRY, set_intent, trace_request
+from backend.runtime import Runtime
+from backend.streaming import chat_events
+from config.settings import LAZY_STARTUP
 
 app = Flask(__name__, template_folder="../templates", static_folder="../static")
 CORS(app)
 
 print("Initializing system...")
 
-llm = load_llm()
-vectorstore = load_vectorstore()
-agent = create_agent(llm, vectorstore)
+# Rule and tool intents are served right away; the embedding model, vector
+# store and LLM load in the background when LAZY_STARTUP is on.
+agent = Runtime()
+agent.start(background=LAZY_STARTUP)
+
+
+def runtime_gauges():
+    """Queue depths, cache sizes and load state sampled on each scrape."""
+    yield "chat_ready", {}, agent.ready
+    for name, component in agent.status()["components"].items():
+        yield "chat_component_ready", {"component": name}, component["state"] == "ready"
+        yield "chat_component_load_seconds", {"component": name}, component["load_seconds"]
+
+    for key, value in agent.sessions.stats().items():
+        if isinstance(value, (int, float)):
+            yield f"chat_sessions_{key}", {}, value
+
+    if agent.answer_cache is not None:
+        for key, value in agent.answer_cache.stats().items():
+            if isinstance(value, (int, float)):
+                yield f"chat_answer_cache_{key}", {}, value
+
+    embedding_stats = getattr(agent.embeddings, "stats", None)
+    if embedding_stats is not None:
+        for key, value in embedding_stats().items():
+            if isinstance(value, (int, float)):
+                yield f"chat_embedding_cache_{key}", {}, value
+
+    llm_stats = getattr(getattr(agent.llm, "pipeline", None), "stats", None)
+    if llm_stats is not None:
+        for key, value in llm_stats().items():
+            if isinstance(value, (int, float)):
+                yield f"chat_llm_batcher_{key}", {}, value
+
+    if agent.admission is not None:
+        for key, value in agent.admission.stats().items():
+            yield f"chat_rag_{key}", {}, value
+        for key, value in agent.retrieval_admission.stats().items():
+            yield f"chat_rag_retrieval_{key}", {}, value
+
+    if RESPONSE_CACHE is not None:
+        for key, value in RESPONSE_CACHE.stats().items():
+            if isinstance(value, (int, float)):
+                yield f"chat_response_cache_{key}", {}, value
 
-print("System is ready")
+    # Row counts scan the orders table; they are on /api/order-store-stats only.
+    for key, value in ORDER_STORE.stats(counts=False).items():
+        if isinstance(value, (int, float)):
+            yield f"chat_order_store_{key}", {}, value
+
+    for key, value in agent.tenants.stats().items():
+        if isinstance(value, (int, float)):
+            yield f"chat_tenant_indexes_{key}", {}, value
+    for tenant, stats in agent.tenants.tenant_stats().items():
+        yield "chat_tenant_index_resident", {"tenant": tenant}, stats["resident"]
+        yield "chat_tenant_index_bytes", {"tenant": tenant}, stats["bytes"]
+        yield "chat_tenant_index_loads", {"tenant": tenant}, stats["loads"]
+        yield "chat_tenant_index_evictions", {"tenant": tenant}, stats["evictions"]
+        yield "chat_tenant_index_last_load_ms", {"tenant": tenant}, stats["last_load_ms"]
+
+
+REGISTRY.register_gauges(runtime_gauges)
+
+
+def conditional_json(payload, max_age: float = 0, public: bool = False):
+    """
+    JSON response with an ETag. A GET carrying a matching If-None-Match gets
+    304 Not Modified. Clients may reuse the body for `max_age` seconds;
+    with max_age=0 they must revalidate first.
+    """
+    response = jsonify(payload)
+    response.add_etag()
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    if max_age > 0:
+        response.cache_control.max_age = int(max_age)
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def request_tenant(data: dict):
+    """Tenant named by the "tenant" field or the X-Tenant header, if any."""
+    return data.get("tenant") or request.headers.get("X-Tenant") or None
+
+
+def unknown_tenant(tenant: str):
+    set_intent("unknown_tenant")
+    return jsonify({"error": f"unknown tenant: {tenant}"}), 404
 
 @app.route("/")
 def home():
@@ -23,32 +115,78 @@ def home():
 
 @app.route("/chat", methods=["POST"])
 def chat():
-    try:
-        data = request.get_json(force=True)
-        query = data.get("query", "").strip()
+    with trace_request("chat"):
+        try:
+            data = request.get_json(force=True)
+            query = data.get("query", "").strip()
+            session_id = data.get("session_id") or uuid.uuid4().hex
+            # Optional "timeout_ms", capped at CHAT_DEADLINE_MS.
+            deadline = request_deadline(data.get("timeout_ms"))
+            tenant = request_tenant(data)
+            if tenant is not None and not agent.has_tenant(tenant):
+                return unknown_tenant(tenant)
+
+            if not query:
+                set_intent("empty")
+                return jsonify({
+                    "response": "Please type a question so I can help you 🙂",
+                    "session_id": session_id,
+                })
+
+            answer = agent(query, session_id=session_id, deadline=deadline, tenant=tenant)
+
+            return conditional_json({"response": answer, "session_id": session_id})
+
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            REGISTRY.inc("chat_errors_total", kind="chat")
 
-        if not query:
             return jsonify({
-                "response": "Please type a question so I can help you 🙂"
+                "response": "Sorry, I ran into an internal issue. Please try again."
             })
 
-        answer = agent(query)
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    data = request.get_json(force=True)
+    query = data.get("query", "").strip()
+    session_id = data.get("session_id") or uuid.uuid4().hex
+    tenant = request_tenant(data)
+    if tenant is not None and not agent.has_tenant(tenant):
+        return unknown_tenant(tenant)
+
+    deadline = request_deadline(data.get("timeout_ms"))
+    return Response(
+        stream_with_context(chat_events(agent, query, session_id, deadline, tenant)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        return jsonify({"response": answer})
+@app.route("/batch", methods=["POST"])
+def batch():
+    # JSONL in ({"id", "query"} per line), JSONL out in completion order,
+    # ending with a {"report": ...} line. ?execute_tools=1 also creates
+    # return requests; otherwise they are only classified.
+    execute_tools = request.args.get("execute_tools") == "1"
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
+    def lines():
+        throughput = Throughput()
+        for result, seconds in triage(agent, parse_records(request.stream), execute_tools=execute_tools):
+            throughput.add(result, seconds)
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"report": throughput.report()}) + "\n"
 
-        return jsonify({
-            "response": "Sorry, I ran into an internal issue. Please try again."
-        })
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
 
-@app.route("/api/order-status", methods=["POST"])
+@app.route("/api/order-status", methods=["GET", "POST"])
 def api_order_status():
-    data = request.get_json(force=True)
-    order_id = data.get("order_id", "").strip()
-    return jsonify({"response": get_order_status(order_id)})
+    # GET /api/order-status?order_id=... can be revalidated with If-None-Match.
+    if request.method == "GET":
+        order_id = request.args.get("order_id", "").strip()
+    else:
+        order_id = request.get_json(force=True).get("order_id", "").strip()
+    # Order records change, so clients revalidate instead of reusing the body.
+    return conditional_json({"response": order_status_response(order_id).body})
 
 @app.route("/api/create-return", methods=["POST"])
 def api_create_return():
@@ -59,7 +197,74 @@ def api_create_return():
 
 @app.route("/api/refund-policy", methods=["GET"])
 def api_refund_policy():
-    return jsonify({"response": get_refund_policy()})
+    reply = refund_policy_response()
+    return conditional_json({"response": reply.body}, max_age=reply.max_age, public=True)
+
+@app.route("/api/session-stats", methods=["GET"])
+def api_session_stats():
+    return jsonify(agent.sessions.stats())
+
+@app.route("/api/answer-cache-stats", methods=["GET"])
+def api_answer_cache_stats():
+    if agent.answer_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify(agent.answer_cache.stats())
+
+@app.route("/api/embedding-stats", methods=["GET"])
+def api_embedding_stats():
+    stats = getattr(agent.embeddings, "stats", None)
+    if stats is None:
+        return jsonify({"enabled": False})
+    return jsonify(stats())
+
+@app.route("/api/response-cache-stats", methods=["GET"])
+def api_response_cache_stats():
+    if RESPONSE_CACHE is None:
+        return jsonify({"enabled": False})
+    return jsonify(RESPONSE_CACHE.stats())
+
+@app.route("/api/admission-stats", methods=["GET"])
+def api_admission_stats():
+    if agent.admission is None:
+        return jsonify({"enabled": False})
+    return jsonify({**agent.admission.stats(), "retrieval": agent.retrieval_admission.stats()})
+
+@app.route("/api/order-store-stats", methods=["GET"])
+def api_order_store_stats():
+    return jsonify(ORDER_STORE.stats())
+
+@app.route("/api/tenant-stats", methods=["GET"])
+def api_tenant_stats():
+    # ?tenant=<id> for one tenant; otherwise every tenant requested so far.
+    tenant = request.args.get("tenant")
+    return jsonify({**agent.tenants.stats(), "tenants": agent.tenants.tenant_stats(tenant)})
+
+@app.route("/api/llm-stats", methods=["GET"])
+def api_llm_stats():
+    stats = getattr(getattr(agent.llm, "pipeline", None), "stats", None)
+    if stats is None:
+        return jsonify({"batching": False})
+    return jsonify(stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Prometheus text exposition: per-intent request and per-stage latency
+    # histograms, plus gauges for readiness, sessions, caches and batching.
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is up and serving rule / tool intents.
+    return jsonify({"status": "ok", **agent.status()})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    # Readiness: in lazy mode the app serves rule / tool intents before the
+    # models are loaded; pass ?full=1 to require every component.
+    status = agent.status()
+    full = request.args.get("full") == "1" or not LAZY_STARTUP
+    ok = agent.ready or (not full and not agent.failed)
+    return jsonify(status), 200 if ok else 503
 
 if __name__ == "__main__":
     app.run(debug=True)
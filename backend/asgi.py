@@ -0,0 +1,125 @@
+"""
+ASGI entry point with a natively async streaming chat endpoint.
+
+Usage:
+    uvicorn backend.asgi:app --port 5000
+
+`POST /chat/stream` is served on the event loop. Rule and tool replies
+(which may query the order store) are computed on the loop's default
+executor and flushed at once, while RAG generations run on a small thread
+pool (STREAM_WORKERS) and push tokens back to the loop through a queue.
+Waiting conversations therefore hold no thread of their own, only active
+generations do, and the loop itself never blocks. Every other route is
+served by the Flask app.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+
+from agents.agent_router import route_query, rule_intent
+from backend.admission import request_deadline
+from backend.app import agent
+from backend.app import app as flask_app
+from backend.streaming import chat_events
+from config.settings import STREAM_WORKERS
+
+wsgi_app = WsgiToAsgi(flask_app)
+generation_pool = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="stream")
+
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream; charset=utf-8"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+]
+
+
+async def _read_json(receive) -> dict:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _header(scope, name: bytes):
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1") or None
+    return None
+
+
+def _produce(events, loop, out: asyncio.Queue, cancelled: threading.Event) -> None:
+    try:
+        for event in events:
+            if cancelled.is_set():
+                break
+            loop.call_soon_threadsafe(out.put_nowait, event)
+    finally:
+        events.close()
+        loop.call_soon_threadsafe(out.put_nowait, None)
+
+
+async def _watch_disconnect(receive, cancelled: threading.Event) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            cancelled.set()
+            return
+
+
+async def stream_chat(scope, receive, send) -> None:
+    data = await _read_json(receive)
+    query = str(data.get("query", "")).strip()
+    session_id = data.get("session_id") or uuid.uuid4().hex
+    tenant = data.get("tenant") or _header(scope, b"x-tenant")
+    if tenant is not None and not agent.has_tenant(tenant):
+        body = json.dumps({"error": f"unknown tenant: {tenant}"}).encode("utf-8")
+        await send({"type": "http.response.start", "status": 404,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+        return
+    route = route_query(query) if query else None
+    events = chat_events(agent, query, session_id, request_deadline(data.get("timeout_ms")), tenant, route)
+
+    await send({"type": "http.response.start", "status": 200, "headers": SSE_HEADERS})
+
+    loop = asyncio.get_running_loop()
+    # Rule / tool intents never touch the generation pool.
+    if route is None or rule_intent(route.intent, tenant):
+        for event in await loop.run_in_executor(None, list, events):
+            await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    out = asyncio.Queue()
+    cancelled = threading.Event()
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, cancelled))
+    loop.run_in_executor(generation_pool, _produce, events, loop, out, cancelled)
+    try:
+        while True:
+            event = await out.get()
+            if event is None:
+                break
+            if not cancelled.is_set():
+                await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+        if not cancelled.is_set():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == "/chat/stream" and scope["method"] == "POST":
+        await stream_chat(scope, receive, send)
+        return
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,214 @@
+"""
+Batch triage of support queries: JSONL in, JSONL out.
+
+Usage:
+    python -m backend.batch --input emails.jsonl --output results.jsonl
+        [--batch-size 16] [--workers 4] [--execute-tools] [--report report.json]
+
+Input lines are {"id": ..., "query": ...} ("id" defaults to the line
+number). Every query is routed with the intent table first; rule and tool
+intents are answered at once, and only RAG-bound queries go to the LLM,
+`batch_size` per call on a pool of `workers` threads. Routing starts while
+the models are still loading.
+
+Output lines are {"id", "query", "intent", "kind", "response"}, written and
+flushed as results complete, so the output file is also the checkpoint:
+running again with the same --output skips the ids already in it (a partial
+last line left by an interrupted run is discarded). Queries whose intent
+writes order data (returns) are only classified unless --execute-tools is
+given; their "response" is null and "action_required" is true.
+
+The throughput report (queries/sec overall and per intent, average
+attributed milliseconds per query) is printed to stderr at the end.
+
+The same pipeline is served by `POST /batch` in backend/app.py.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional, Set, Tuple
+
+from agents.agent_router import intent_kind, route_query, rule_reply
+from backend.streaming import EMPTY_QUERY_REPLY
+from config.settings import BATCH_SIZE, BATCH_WORKERS
+
+# Intents whose handler writes to the order store.
+WRITE_INTENTS = frozenset({"return"})
+
+
+def parse_records(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """(id, query) pairs from JSONL lines; blank lines are skipped."""
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        yield str(record.get("id", number)), (record.get("query") or "").strip()
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Ids already written to `path`; drops a trailing partial line."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        good = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            done.add(str(json.loads(line)["id"]))
+            good += len(line)
+        f.truncate(good)
+    return done
+
+
+class Throughput:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.intents = {}  # intent -> [kind, count, attributed seconds]
+        self.skipped = 0
+
+    def add(self, result: dict, seconds: float) -> None:
+        entry = self.intents.setdefault(result["intent"], [result["kind"], 0, 0.0])
+        entry[1] += 1
+        entry[2] += seconds
+
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self.start
+        total = sum(e[1] for e in self.intents.values())
+        by_kind = {}
+        for kind, n, _ in self.intents.values():
+            by_kind[kind] = by_kind.get(kind, 0) + n
+        return {
+            "queries": total,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(elapsed, 3),
+            "queries_per_second": round(total / elapsed, 2) if elapsed else 0.0,
+            "by_kind": by_kind,
+            "by_intent": {
+                intent: {
+                    "kind": kind,
+                    "queries": n,
+                    "queries_per_second": round(n / elapsed, 2) if elapsed else 0.0,
+                    "avg_ms": round(seconds / n * 1000.0, 3),
+                }
+                for intent, (kind, n, seconds) in sorted(self.intents.items(), key=lambda item: -item[1][1])
+            },
+        }
+
+
+def _result(record_id: str, query: str, intent: str, response: Optional[str], kind: Optional[str] = None) -> dict:
+    return {
+        "id": record_id,
+        "query": query,
+        "intent": intent,
+        "kind": kind or intent_kind(intent),
+        "response": response,
+    }
+
+
+def _answer(agent, batch):
+    start = time.perf_counter()
+    replies = agent.answer_batch([query for _, query, _ in batch])
+    seconds = (time.perf_counter() - start) / len(batch)
+    return [
+        (_result(record_id, query, intent, reply), seconds)
+        for (record_id, query, intent), reply in zip(batch, replies)
+    ]
+
+
+def triage(
+    agent,
+    records: Iterable[Tuple[str, str]],
+    batch_size: int = BATCH_SIZE,
+    workers: int = BATCH_WORKERS,
+    execute_tools: bool = False,
+) -> Iterator[Tuple[dict, float]]:
+    """
+    Yield (result, attributed seconds) for every record. Routed replies come
+    out as soon as they are computed, RAG replies as their batch completes.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        in_flight, pending = set(), []
+
+        def drain(block_until):
+            nonlocal in_flight
+            while len(in_flight) > block_until:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+        for record_id, query in records:
+            start = time.perf_counter()
+            if not query:
+                yield _result(record_id, query, "empty", EMPTY_QUERY_REPLY, "rule"), time.perf_counter() - start
+                continue
+            route = route_query(query)
+            if route.intent in WRITE_INTENTS and not execute_tools:
+                result = _result(record_id, query, route.intent, None)
+                result["action_required"] = True
+                yield result, time.perf_counter() - start
+                continue
+            reply = rule_reply(query, route)
+            if reply is not None:
+                yield _result(record_id, query, route.intent, reply), time.perf_counter() - start
+                continue
+
+            pending.append((record_id, query, route.intent))
+            if len(pending) >= batch_size:
+                in_flight.add(pool.submit(_answer, agent, pending))
+                pending = []
+                # Keep at most `workers` batches queued behind the running ones.
+                yield from drain(2 * workers)
+
+        if pending:
+            in_flight.add(pool.submit(_answer, agent, pending))
+        yield from drain(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route and answer a JSONL file of support queries.")
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--execute-tools", action="store_true",
+                        help="also run tools that write order data (return requests)")
+    parser.add_argument("--report", help="also write the throughput report to this file")
+    args = parser.parse_args()
+
+    from backend.runtime import Runtime
+
+    done = load_checkpoint(args.output)
+    throughput = Throughput()
+
+    def remaining():
+        with open(args.input, encoding="utf-8") as f:
+            for record_id, query in parse_records(f):
+                if record_id in done:
+                    throughput.skipped += 1
+                    continue
+                yield record_id, query
+
+    agent = Runtime()
+    agent.start(background=True)
+
+    with open(args.output, "a", encoding="utf-8") as out:
+        for result, seconds in triage(agent, remaining(), args.batch_size, args.workers, args.execute_tools):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            throughput.add(result, seconds)
+
+    report = json.dumps(throughput.report(), indent=2)
+    print(report, file=sys.stderr)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
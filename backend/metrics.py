@@ -0,0 +1,232 @@
+"""
+Per-request stage tracing and Prometheus-style metrics.
+
+A request handler opens a trace with `trace_request()`; code on the request
+path wraps its work in `stage("name")` and tags the trace with
+`set_intent(...)`. Stage times are exclusive (a nested stage's time is not
+counted again in its parent), so the stages of one request add up to its
+total. When the trace ends, the timings are folded into histograms that
+`/metrics` renders in the Prometheus text format.
+
+Tracing costs two perf_counter calls and a few dict updates per stage, and
+`stage()` is a no-op outside a trace.
+
+Requests slower than SLOW_REQUEST_MS (0 disables) are printed with their
+full stage breakdown and the per-request values recorded with `count()`.
+"""
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from config.settings import SLOW_REQUEST_MS
+
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+
+_current = contextvars.ContextVar("request_trace", default=None)
+
+
+class Trace:
+    __slots__ = ("kind", "intent", "start", "stages", "counts", "_stack")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.intent = "unknown"
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+        self._stack = []  # [start, child_seconds] per open stage
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, ms: float) -> None:
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        self.total += ms
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}   # (kind, intent) -> Histogram
+        self.stages = {}     # (stage, intent) -> Histogram
+        self.counters = {}   # (name, labels) -> float
+        self._gauges = []    # callables yielding (name, labels, value)
+
+    def record(self, trace: Trace, total_ms: float) -> None:
+        with self._lock:
+            key = (trace.kind, trace.intent)
+            hist = self.requests.get(key)
+            if hist is None:
+                hist = self.requests[key] = Histogram()
+            hist.observe(total_ms)
+            for name, seconds in trace.stages.items():
+                key = (name, trace.intent)
+                hist = self.stages.get(key)
+                if hist is None:
+                    hist = self.stages[key] = Histogram()
+                hist.observe(seconds * 1000.0)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def register_gauges(self, fn) -> None:
+        """Add a callable yielding (name, labels_dict, value) gauge samples."""
+        self._gauges.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            _render_histograms(lines, "chat_request_latency_ms", "Request latency by intent.",
+                               self.requests, ("kind", "intent"))
+            _render_histograms(lines, "chat_stage_latency_ms", "Exclusive time per request stage.",
+                               self.stages, ("stage", "intent"))
+            seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{_labels(labels)} {_num(value)}")
+
+        for fn in self._gauges:
+            try:
+                samples = list(fn())
+            except Exception:
+                continue
+            for name, labels, value in samples:
+                if value is None:
+                    continue
+                if name not in seen:
+                    lines.append(f"# TYPE {name} gauge")
+                    seen.add(name)
+                lines.append(f"{name}{_labels(sorted(labels.items()))} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _num(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_histograms(lines, name, help_text, histograms, label_names):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, hist in sorted(histograms.items()):
+        base = tuple(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(BUCKETS_MS, hist.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(base + (('le', _num(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(base)} {round(hist.total, 3)}")
+        lines.append(f"{name}_count{_labels(base)} {hist.count}")
+
+
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def trace_request(kind: str = "chat"):
+    """Open a trace for the current request (thread / context)."""
+    trace = Trace(kind)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A streaming generator closed from another context.
+            _current.set(None)
+        total_ms = (time.perf_counter() - trace.start) * 1000.0
+        REGISTRY.record(trace, total_ms)
+        if SLOW_REQUEST_MS and total_ms >= SLOW_REQUEST_MS:
+            print("[slow-request] " + json.dumps({
+                "kind": trace.kind,
+                "intent": trace.intent,
+                "total_ms": round(total_ms, 3),
+                "stages_ms": {k: round(v * 1000.0, 3) for k, v in trace.stages.items()},
+                **({"counts": trace.counts} if trace.counts else {}),
+            }), flush=True)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as stage `name` of the current trace, if any."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    frame = [time.perf_counter(), 0.0]
+    trace._stack.append(frame)
+    try:
+        yield
+    finally:
+        trace._stack.pop()
+        elapsed = time.perf_counter() - frame[0]
+        if trace._stack:
+            trace._stack[-1][1] += elapsed
+        trace.stages[name] = trace.stages.get(name, 0.0) + elapsed - frame[1]
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Add to counter `name` and to the current trace's per-request counts."""
+    REGISTRY.inc(name, value, **labels)
+    trace = _current.get()
+    if trace is not None:
+        key = name + "".join(f"[{v}]" for _, v in sorted(labels.items()))
+        trace.counts[key] = trace.counts.get(key, 0) + value
+
+
+def set_intent(intent: str) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.intent = intent
+
+
+def branch_trace():
+    """A fresh trace for work handed to another thread, or None outside a trace."""
+    parent = _current.get()
+    return Trace(parent.kind) if parent is not None else None
+
+
+def run_traced(trace, fn):
+    """Call `fn` with `trace` as the current trace."""
+    token = _current.set(trace)
+    try:
+        return fn()
+    finally:
+        _current.reset(token)
+
+
+def merge_trace(branch) -> None:
+    """Fold a finished branch trace's stages and counts into the current trace."""
+    trace = _current.get()
+    if trace is None or branch is None:
+        return
+    for name, seconds in branch.stages.items():
+        trace.stages[name] = trace.stages.get(name, 0.0) + seconds
+    for key, value in branch.counts.items():
+        trace.counts[key] = trace.counts.get(key, 0) + value
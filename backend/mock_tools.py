@@ -1,19 +1,24 @@
 from datetime import datetime, timedelta
 
+from backend.order_store import OrderServiceError, load_order_store
+
 MOCK_ORDERS = {
     "ORD123": {
+        "customer_id": "CUST001",
         "status": "Processing",
         "created_at": datetime.now() - timedelta(days=2),
         "expected_delivery": datetime.now() + timedelta(days=4),
         "total_amount": 1499.0,
     },
     "ORD456": {
+        "customer_id": "CUST001",
         "status": "Shipped",
         "created_at": datetime.now() - timedelta(days=3),
         "expected_delivery": datetime.now() + timedelta(days=2),
         "total_amount": 899.0,
     },
     "ORD789": {
+        "customer_id": "CUST002",
         "status": "Delivered",
         "created_at": datetime.now() - timedelta(days=7),
         "expected_delivery": datetime.now() - timedelta(days=2),
@@ -22,13 +27,26 @@ MOCK_ORDERS = {
 }
 
 
-MOCK_RETURNS = []  # store created return requests in memory
+# Orders and return requests live in the configured store, seeded with the
+# mock orders above that it does not have yet.
+ORDER_STORE = load_order_store(seed=MOCK_ORDERS)
+
+
+def order_service_unavailable() -> str:
+    return (
+        "I can't reach our order system right now, so I can't look up your order. "
+        "Please try again in a few minutes or check the 'My Orders' page."
+    )
 
 
 def get_order_status(order_id: str) -> str:
-    """Mock: return human‑readable status for an order id."""
+    """
+    Mock: return human‑readable status for an order id. Raises
+    OrderServiceError when the order store is unreachable, so the reply is
+    not cached (see backend/response_cache.py).
+    """
     oid = order_id.upper().rstrip("?.")  # strip trailing ? or .
-    order = MOCK_ORDERS.get(oid)
+    order = ORDER_STORE.get_order(oid)
     if not order:
         return (
             f"I could not find any order with ID {oid}. "
@@ -64,8 +82,15 @@ def get_order_status(order_id: str) -> str:
 
 
 def create_return_request(order_id: str, reason: str) -> str:
-    """Mock: create a return request and store it in memory."""
-    order = MOCK_ORDERS.get(order_id.upper())
+    """Mock: create a return request and store it in the order store."""
+    try:
+        return _create_return_request(order_id, reason)
+    except OrderServiceError:
+        return order_service_unavailable()
+
+
+def _create_return_request(order_id: str, reason: str) -> str:
+    order = ORDER_STORE.get_order(order_id)
     if not order:
         return (
             f"I could not find an order with ID {order_id}. "
@@ -81,15 +106,13 @@ def create_return_request(order_id: str, reason: str) -> str:
             "the return window shown on the product page."
         )
 
-    request_id = f"RET-{order_id.upper()}"
-    MOCK_RETURNS.append(
-        {
-            "request_id": request_id,
-            "order_id": order_id.upper(),
-            "reason": reason,
-            "created_at": datetime.now(),
-        }
-    )
+    request_id, created = ORDER_STORE.create_return(order_id, reason)
+    if not created:
+        return (
+            f"A return request **{request_id}** already exists for order {order_id}, "
+            "so no new request was created. Our team will share pickup details "
+            "by email or SMS within 1–2 business days."
+        )
 
     return (
         f"A return request **{request_id}** has been created for order {order_id} "
@@ -0,0 +1,324 @@
+"""
+Order store backed by the order-management service (ORDER_STORE=http).
+
+    GET  /orders/<order_id>                  order record, 404 if unknown
+    GET  /customers/<customer_id>/orders     ?limit=N, newest first
+    POST /orders                             [order, ...] upsert
+    POST /returns                            {"order_id", "reason"} ->
+                                             {"request_id", "created"}
+    GET  /returns/<request_id>               return record, 404 if unknown
+
+Order records travel as JSON with ISO-8601 datetimes.
+backend/order_service_stub.py serves this API locally.
+
+`OrderServiceClient` keeps up to ORDER_SERVICE_POOL_SIZE keep-alive
+connections (urllib3), bounds each attempt by ORDER_SERVICE_TIMEOUT_MS and
+retries connection errors, timeouts and 5xx replies with exponential
+backoff and jitter. Every call is safe to retry: reads trivially, and a
+return request is idempotent per order. A `CircuitBreaker` opens after
+ORDER_SERVICE_BREAKER_FAILURES consecutive failed attempts. While it is
+open, calls fail at once with `OrderServiceError` instead of waiting on
+timeouts. After ORDER_SERVICE_BREAKER_RESET_SECONDS one probe call is let
+through, and its result closes the breaker or opens it again. Any outcome
+of an allowed attempt settles the breaker, including an unreadable reply.
+
+The client is synchronous (urllib3), like the SQLite store, rather than an
+asyncio client: every caller runs in a worker thread, either a WSGI
+request thread or, on the ASGI streaming route, the event loop's executor
+(backend/asgi.py), so a slow order service never blocks the loop.
+
+`HTTPOrderStore.get_order` answers repeated lookups from a short-TTL cache
+(unknown ids included). Concurrent misses for the same order id share a
+single request (single flight). Creating a return drops the order's entry.
+"""
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import urllib3
+
+from backend.order_store import OrderServiceError, OrderStore
+from config.settings import (
+    ORDER_SERVICE_BACKOFF_MS,
+    ORDER_SERVICE_BREAKER_FAILURES,
+    ORDER_SERVICE_BREAKER_RESET_SECONDS,
+    ORDER_SERVICE_CACHE_SIZE,
+    ORDER_SERVICE_CACHE_TTL_SECONDS,
+    ORDER_SERVICE_POOL_SIZE,
+    ORDER_SERVICE_RETRIES,
+    ORDER_SERVICE_TIMEOUT_MS,
+    ORDER_SERVICE_URL,
+)
+
+DATETIME_FIELDS = ("created_at", "expected_delivery")
+
+
+def order_to_json(order: dict) -> dict:
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in order.items()}
+
+
+def order_from_json(data: dict) -> dict:
+    return {k: datetime.fromisoformat(v) if k in DATETIME_FIELDS and v else v for k, v in data.items()}
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = ORDER_SERVICE_BREAKER_FAILURES,
+                 reset_seconds: float = ORDER_SERVICE_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.opens = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.probing else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.probing = False
+                self.opens += 1
+
+
+class OrderServiceClient:
+    def __init__(
+        self,
+        base_url: str = ORDER_SERVICE_URL,
+        pool_size: int = ORDER_SERVICE_POOL_SIZE,
+        timeout_ms: float = ORDER_SERVICE_TIMEOUT_MS,
+        retries: int = ORDER_SERVICE_RETRIES,
+        backoff_ms: float = ORDER_SERVICE_BACKOFF_MS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = urllib3.Timeout(total=timeout_ms / 1000.0)
+        self.retries = retries
+        self.backoff = backoff_ms / 1000.0
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.attempts = 0
+        self.failed_attempts = 0
+        self.errors = 0
+        self._setup()
+
+    def _setup(self) -> None:
+        self._lock = threading.Lock()
+        # block=True: at most pool_size connections; callers wait for one.
+        self._http = urllib3.PoolManager(
+            num_pools=1, maxsize=self.pool_size, block=True,
+            headers={"Content-Type": "application/json"},
+        )
+
+    def after_fork(self) -> None:
+        """New connections in a forked worker; sockets must not be shared."""
+        self._setup()
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def request(self, method: str, path: str, payload=None):
+        """Decoded JSON body, or None on 404; raises OrderServiceError."""
+        self._count(calls=1)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0))
+            if not self.breaker.allow():
+                self._count(errors=1)
+                raise OrderServiceError(f"order service circuit open ({method} {path})")
+            self._count(attempts=1)
+            try:
+                response = self._http.request(
+                    method, self.base_url + path, body=body, timeout=self.timeout, retries=False
+                )
+                status = response.status
+                data = json.loads(response.data) if status < 400 else None
+            except urllib3.exceptions.HTTPError as exc:
+                error = exc
+            except BaseException as exc:
+                # Not retried, but the attempt (maybe the half-open probe) is settled.
+                self.breaker.failure()
+                self._count(failed_attempts=1, errors=1)
+                if isinstance(exc, ValueError):
+                    raise OrderServiceError(f"{method} {path}: invalid JSON reply") from exc
+                raise
+            else:
+                if status < 500:
+                    self.breaker.success()
+                    if status >= 400 and status != 404:
+                        self._count(errors=1)
+                        raise OrderServiceError(f"{method} {path}: HTTP {status}")
+                    return data
+                error = f"HTTP {status}"
+            self._count(failed_attempts=1)
+            self.breaker.failure()
+        self._count(errors=1)
+        raise OrderServiceError(f"{method} {path} failed after {self.retries + 1} attempts: {error}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "failed_attempts": self.failed_attempts,
+                "errors": self.errors,
+            }
+        return {
+            "url": self.base_url,
+            "pool_size": self.pool_size,
+            **counters,
+            "breaker_state": self.breaker.state,
+            "breaker_open": self.breaker.state != "closed",
+            "breaker_opens": self.breaker.opens,
+            "breaker_rejected": self.breaker.rejected,
+        }
+
+
+class HTTPOrderStore(OrderStore):
+    def __init__(
+        self,
+        client: Optional[OrderServiceClient] = None,
+        cache_ttl: float = ORDER_SERVICE_CACHE_TTL_SECONDS,
+        cache_size: int = ORDER_SERVICE_CACHE_SIZE,
+        coalesce: bool = True,
+    ):
+        self.client = client or OrderServiceClient()
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.coalesce = coalesce
+        self._cache = OrderedDict()  # order id -> (order or None, expires at)
+        self._inflight = {}  # order id -> Future of the lookup in progress
+        self._version = 0  # bumped by writes; a lookup that raced one is not cached
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def after_fork(self) -> None:
+        self.client.after_fork()
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def _invalidate(self, order_ids: List[str]) -> None:
+        with self._lock:
+            self._version += 1
+            for oid in order_ids:
+                self._cache.pop(oid, None)
+
+    def _fetch(self, oid: str) -> Optional[dict]:
+        data = self.client.request("GET", "/orders/" + quote(oid, safe=""))
+        return order_from_json(data) if data is not None else None
+
+    def get_order(self, order_id: str) -> Optional[dict]:
+        oid = order_id.upper()
+        with self._lock:
+            entry = self._cache.get(oid)
+            if entry is not None and entry[1] > time.monotonic():
+                self._cache.move_to_end(oid)
+                self.hits += 1
+                return dict(entry[0]) if entry[0] is not None else None
+            waiting = self._inflight.get(oid) if self.coalesce else None
+            if waiting is None:
+                self.misses += 1
+                future, version = Future(), self._version
+                if self.coalesce:
+                    self._inflight[oid] = future
+            else:
+                self.coalesced += 1
+        if waiting is not None:
+            order = waiting.result()
+            return dict(order) if order is not None else None
+
+        try:
+            order = self._fetch(oid)
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(oid, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._inflight.pop(oid, None)
+            if self.cache_ttl > 0 and version == self._version:
+                self._cache[oid] = (order, time.monotonic() + self.cache_ttl)
+                self._cache.move_to_end(oid)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        future.set_result(order)
+        return dict(order) if order is not None else None
+
+    def orders_for_customer(self, customer_id: str, limit: int = 20) -> List[dict]:
+        data = self.client.request("GET", f"/customers/{quote(customer_id, safe='')}/orders?limit={int(limit)}")
+        return [order_from_json(o) for o in data or []]
+
+    def create_return(self, order_id: str, reason: str) -> Tuple[str, bool]:
+        data = self.client.request("POST", "/returns", {"order_id": order_id.upper(), "reason": reason})
+        self._invalidate([order_id.upper()])
+        if not isinstance(data, dict) or not isinstance(data.get("request_id"), str) or "created" not in data:
+            raise OrderServiceError(f"POST /returns: unexpected reply {data!r:.200}")
+        if data["created"]:
+            self._notify([order_id.upper()])
+        return data["request_id"], bool(data["created"])
+
+    def get_return(self, request_id: str) -> Optional[dict]:
+        data = self.client.request("GET", "/returns/" + quote(request_id, safe=""))
+        return order_from_json(data) if data is not None else None
+
+    def add_orders(self, orders: Iterable[Tuple[str, dict]], batch_size: int = 1000) -> None:
+        batch, written = [], []
+        for order_id, order in orders:
+            batch.append(order_to_json(dict(order, order_id=order_id.upper())))
+            written.append(order_id.upper())
+            if len(batch) >= batch_size:
+                self.client.request("POST", "/orders", batch)
+                batch = []
+        if batch:
+            self.client.request("POST", "/orders", batch)
+        if written:
+            self._invalidate(written)
+            self._notify(written)
+
+    def stats(self, counts: bool = True) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            cache = {
+                "cache_entries": len(self._cache),
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "coalesced": self.coalesced,
+                "cache_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+        return {"backend": "http", **cache, **self.client.stats()}
@@ -0,0 +1,178 @@
+"""
+Local stand-in for the order-management service (see backend/order_service.py).
+
+Usage:
+    python -m backend.order_service_stub [--host 127.0.0.1] [--port 8081]
+        [--latency-ms 0] [--jitter-ms 0] [--error-rate 0] [--orders 0]
+
+Serves the order-service API from an in-memory store seeded with the mock
+orders (ORD123, ORD456, ORD789) plus --orders synthetic ones (ORD1000...).
+Every request first sleeps --latency-ms (plus up to --jitter-ms), then
+fails with 503 with probability --error-rate. Both can be changed while the
+stub runs:
+
+    POST /_faults {"latency_ms": 200, "jitter_ms": 0, "error_rate": 0.5}
+
+`GET /_stats` returns the number of requests served per route and the
+number of injected errors. Connections are kept alive (HTTP/1.1), so pooled
+clients reuse them.
+
+Run the app against it with ORDER_STORE=http ORDER_SERVICE_URL=http://127.0.0.1:8081.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from backend.order_service import order_from_json, order_to_json
+from backend.order_store import InMemoryOrderStore
+
+ROUTES = (
+    ("GET", re.compile(r"^/orders/([^/]+)$"), "get_order"),
+    ("GET", re.compile(r"^/customers/([^/]+)/orders$"), "customer_orders"),
+    ("POST", re.compile(r"^/orders$"), "add_orders"),
+    ("POST", re.compile(r"^/returns$"), "create_return"),
+    ("GET", re.compile(r"^/returns/([^/]+)$"), "get_return"),
+    ("POST", re.compile(r"^/_faults$"), "faults"),
+    ("GET", re.compile(r"^/_stats$"), "stats"),
+)
+
+
+class StubState:
+    def __init__(self, store, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = {}
+        self.injected_errors = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; with Nagle's algorithm the
+        # body waits for the client's delayed ACK on kept-alive connections.
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status, payload=None):
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def dispatch(self, method):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            for route_method, pattern, name in ROUTES:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    break
+            else:
+                return self.reply(404, {"error": "not found"})
+
+            if name not in ("faults", "stats"):
+                with state.lock:
+                    state.requests[name] = state.requests.get(name, 0) + 1
+                delay = state.latency_ms + random.uniform(0, state.jitter_ms)
+                if delay:
+                    time.sleep(delay / 1000.0)
+                if state.error_rate and random.random() < state.error_rate:
+                    with state.lock:
+                        state.injected_errors += 1
+                    return self.reply(503, {"error": "injected"})
+            args = [unquote(g) for g in match.groups()]
+            status, payload = getattr(self, name)(*args, body=body, query=parse_qs(url.query))
+            self.reply(status, payload)
+
+        def do_GET(self):
+            self.dispatch("GET")
+
+        def do_POST(self):
+            self.dispatch("POST")
+
+        def get_order(self, order_id, **_):
+            order = state.store.get_order(order_id)
+            if order is None:
+                return 404, {"error": "unknown order"}
+            return 200, order_to_json(dict(order, order_id=order_id.upper()))
+
+        def customer_orders(self, customer_id, query, **_):
+            limit = int(query.get("limit", ["20"])[0])
+            return 200, [order_to_json(o) for o in state.store.orders_for_customer(customer_id, limit)]
+
+        def add_orders(self, body, **_):
+            state.store.add_orders((o["order_id"], order_from_json(o)) for o in body)
+            return 200, {"written": len(body)}
+
+        def create_return(self, body, **_):
+            request_id, created = state.store.create_return(body["order_id"], body.get("reason", ""))
+            return 200, {"request_id": request_id, "created": created}
+
+        def get_return(self, request_id, **_):
+            record = state.store.get_return(request_id)
+            return (200, order_to_json(record)) if record is not None else (404, {"error": "unknown return"})
+
+        def faults(self, body, **_):
+            for key in ("latency_ms", "jitter_ms", "error_rate"):
+                if key in (body or {}):
+                    setattr(state, key, float(body[key]))
+            return 200, {"latency_ms": state.latency_ms, "jitter_ms": state.jitter_ms, "error_rate": state.error_rate}
+
+        def stats(self, **_):
+            with state.lock:
+                return 200, {
+                    "requests": dict(state.requests),
+                    "total": sum(state.requests.values()),
+                    "injected_errors": state.injected_errors,
+                }
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_stub_server(host="127.0.0.1", port=8081, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, orders=0):
+    from backend.mock_tools import MOCK_ORDERS
+    from backend.seed_orders import synthetic_orders
+
+    store = InMemoryOrderStore(MOCK_ORDERS, max_returns=1000000)
+    if orders:
+        store.add_orders(synthetic_orders(orders))
+    return StubServer((host, port), make_handler(StubState(store, latency_ms, jitter_ms, error_rate)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stub of the order-management service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--orders", type=int, default=0, help="synthetic orders to add")
+    args = parser.parse_args()
+
+    server = make_stub_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.orders)
+    print(f"Order service stub on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
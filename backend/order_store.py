@@ -0,0 +1,320 @@
+"""
+Order and return storage behind the mock tools.
+
+`get_order_status` / `create_return_request` in backend/mock_tools.py read
+and write through an `OrderStore`:
+
+    - InMemoryOrderStore: dicts guarded by a lock; returns are capped.
+    - SQLiteOrderStore:   a SQLite file indexed on order id and customer,
+                          with a small connection pool, safe under
+                          concurrent writers.
+    - HTTPOrderStore:     the order-management service over HTTP (see
+                          backend/order_service.py).
+
+Order records are dicts with the keys used by the mock tools: "status",
+"created_at", "expected_delivery" (datetimes), "total_amount" and
+"customer_id".
+
+Writers of orders or returns notify the callbacks registered with
+`subscribe` (the response cache invalidates on them).
+"""
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from config.settings import ORDER_DB_PATH, ORDER_DB_POOL_SIZE, ORDER_STORE, MAX_MEMORY_RETURNS
+
+
+class OrderServiceError(Exception):
+    """The order data could not be read or written (service unreachable)."""
+
+
+class OrderStore:
+    """Interface shared by every order store."""
+
+    _listeners: Tuple[Callable[[List[str]], None], ...] = ()
+
+    def subscribe(self, listener: Callable[[List[str]], None]) -> None:
+        """Call `listener(order_ids)` after orders or returns are written."""
+        self._listeners = self._listeners + (listener,)
+
+    def _notify(self, order_ids: List[str]) -> None:
+        for listener in self._listeners:
+            listener(order_ids)
+
+    def after_fork(self) -> None:
+        """Re-open connections in a forked worker process."""
+
+    def get_order(self, order_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def orders_for_customer(self, customer_id: str, limit: int = 20) -> List[dict]:
+        raise NotImplementedError
+
+    def create_return(self, order_id: str, reason: str) -> Tuple[str, bool]:
+        """Record a return; returns (request_id, created). Idempotent per order."""
+        raise NotImplementedError
+
+    def get_return(self, request_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def add_orders(self, orders: Iterable[Tuple[str, dict]]) -> None:
+        raise NotImplementedError
+
+    def stats(self, counts: bool = True) -> dict:
+        """Store statistics; `counts=False` skips row counts that need a table scan."""
+        raise NotImplementedError
+
+
+def return_request_id(order_id: str) -> str:
+    return f"RET-{order_id.upper()}"
+
+
+class InMemoryOrderStore(OrderStore):
+    def __init__(self, orders: Optional[dict] = None, max_returns: int = MAX_MEMORY_RETURNS):
+        self._orders = {}
+        self._by_customer = {}
+        self._returns = OrderedDict()
+        self.max_returns = max_returns
+        self._lock = threading.Lock()
+        if orders:
+            self.add_orders(orders.items())
+
+    def get_order(self, order_id: str) -> Optional[dict]:
+        order = self._orders.get(order_id.upper())
+        return dict(order) if order is not None else None
+
+    def orders_for_customer(self, customer_id: str, limit: int = 20) -> List[dict]:
+        ids = self._by_customer.get(customer_id, [])[-limit:]
+        return [dict(self._orders[oid], order_id=oid) for oid in reversed(ids)]
+
+    def create_return(self, order_id: str, reason: str) -> Tuple[str, bool]:
+        request_id = return_request_id(order_id)
+        with self._lock:
+            if request_id in self._returns:
+                return request_id, False
+            self._returns[request_id] = {
+                "request_id": request_id,
+                "order_id": order_id.upper(),
+                "reason": reason,
+                "created_at": datetime.now(),
+            }
+            while len(self._returns) > self.max_returns:
+                self._returns.popitem(last=False)
+        self._notify([order_id.upper()])
+        return request_id, True
+
+    def get_return(self, request_id: str) -> Optional[dict]:
+        record = self._returns.get(request_id)
+        return dict(record) if record is not None else None
+
+    def add_orders(self, orders: Iterable[Tuple[str, dict]]) -> None:
+        written = []
+        with self._lock:
+            for order_id, order in orders:
+                oid = order_id.upper()
+                is_new = oid not in self._orders
+                self._orders[oid] = dict(order)
+                customer = order.get("customer_id")
+                if customer and is_new:
+                    self._by_customer.setdefault(customer, []).append(oid)
+                if self._listeners:
+                    written.append(oid)
+        if written:
+            self._notify(written)
+
+    def stats(self, counts: bool = True) -> dict:
+        return {"backend": "memory", "orders": len(self._orders), "returns": len(self._returns)}
+
+
+class _ConnectionPool:
+    """A fixed number of SQLite connections shared by request threads."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self._pool = queue.LifoQueue()
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+
+def _ts(value: datetime) -> float:
+    return value.timestamp()
+
+
+def _order_row(row) -> dict:
+    return {
+        "order_id": row[0],
+        "customer_id": row[1],
+        "status": row[2],
+        "created_at": datetime.fromtimestamp(row[3]),
+        "expected_delivery": datetime.fromtimestamp(row[4]),
+        "total_amount": row[5],
+    }
+
+
+ORDER_COLUMNS = "order_id, customer_id, status, created_at, expected_delivery, total_amount"
+
+
+class SQLiteOrderStore(OrderStore):
+    def __init__(self, path: str = ORDER_DB_PATH, pool_size: int = ORDER_DB_POOL_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = _ConnectionPool(path, pool_size)
+        with self._pool.connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_id TEXT PRIMARY KEY,
+                    customer_id TEXT,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expected_delivery REAL NOT NULL,
+                    total_amount REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id, created_at);
+                CREATE TABLE IF NOT EXISTS returns (
+                    request_id TEXT PRIMARY KEY,
+                    order_id TEXT NOT NULL,
+                    reason TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_returns_order ON returns(order_id);
+                """
+            )
+
+    def after_fork(self) -> None:
+        self._pool = _ConnectionPool(self.path, self.pool_size)
+
+    def get_order(self, order_id: str) -> Optional[dict]:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                f"SELECT {ORDER_COLUMNS} FROM orders WHERE order_id = ?", (order_id.upper(),)
+            ).fetchone()
+        return _order_row(row) if row is not None else None
+
+    def orders_for_customer(self, customer_id: str, limit: int = 20) -> List[dict]:
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {ORDER_COLUMNS} FROM orders WHERE customer_id = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (customer_id, limit),
+            ).fetchall()
+        return [_order_row(r) for r in rows]
+
+    def create_return(self, order_id: str, reason: str) -> Tuple[str, bool]:
+        request_id = return_request_id(order_id)
+        with self._pool.connection() as conn:
+            cur = conn.execute(
+                "INSERT INTO returns (request_id, order_id, reason, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(request_id) DO NOTHING",
+                (request_id, order_id.upper(), reason, _ts(datetime.now())),
+            )
+        if cur.rowcount == 1:
+            self._notify([order_id.upper()])
+        return request_id, cur.rowcount == 1
+
+    def get_return(self, request_id: str) -> Optional[dict]:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT request_id, order_id, reason, created_at FROM returns WHERE request_id = ?",
+                (request_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "request_id": row[0],
+            "order_id": row[1],
+            "reason": row[2],
+            "created_at": datetime.fromtimestamp(row[3]),
+        }
+
+    def add_orders(self, orders: Iterable[Tuple[str, dict]], batch_size: int = 10000) -> None:
+        written = []
+
+        def rows():
+            for order_id, o in orders:
+                if self._listeners:
+                    written.append(order_id.upper())
+                yield (
+                    order_id.upper(),
+                    o.get("customer_id"),
+                    o["status"],
+                    _ts(o["created_at"]),
+                    _ts(o["expected_delivery"]),
+                    o["total_amount"],
+                )
+
+        sql = f"INSERT OR REPLACE INTO orders ({ORDER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)"
+        with self._pool.connection() as conn:
+            batch = []
+            for row in rows():
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self._insert_batch(conn, sql, batch)
+                    batch = []
+            if batch:
+                self._insert_batch(conn, sql, batch)
+        if written:
+            self._notify(written)
+
+    @staticmethod
+    def _insert_batch(conn, sql, batch):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(sql, batch)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def count_orders(self) -> int:
+        with self._pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def stats(self, counts: bool = True) -> dict:
+        report = {"backend": "sqlite", "path": self.path, "pool_size": self.pool_size}
+        if counts:
+            with self._pool.connection() as conn:
+                report["orders"] = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+                report["returns"] = conn.execute("SELECT COUNT(*) FROM returns").fetchone()[0]
+        return report
+
+
+def load_order_store(seed: Optional[dict] = None) -> OrderStore:
+    """
+    Build the configured store and add the `seed` orders it does not have
+    yet, so orders kept from an earlier run are not overwritten. The order
+    service owns its data, so it is never seeded from here.
+    """
+    if ORDER_STORE == "http":
+        from backend.order_service import HTTPOrderStore
+        return HTTPOrderStore()
+    if ORDER_STORE == "sqlite":
+        store = SQLiteOrderStore()
+        if seed:
+            store.add_orders((oid, order) for oid, order in seed.items() if store.get_order(oid) is None)
+        return store
+    return InMemoryOrderStore(seed)
@@ -0,0 +1,132 @@
+"""
+Pre-fork serving: load the models once, fork workers that share them.
+
+Usage:
+    python -m backend.prefork --workers 4 [--host 0.0.0.0] [--port 5000] [--access-log]
+
+The parent imports the app with LAZY_STARTUP=0, so the embedding model,
+vector store and LLM are loaded before any worker exists. Workers get the
+parent's memory copy-on-write: model weights and the memory-mapped FAISS /
+BM25 files stay shared, and a worker only pays for the pages it writes to
+(request state, caches, Python object headers).
+
+Before forking, `gc.freeze()` moves every loaded object to the permanent GC
+generation, so garbage collections in the workers do not write to (and
+copy) the pages holding the parent's objects. Tensor data lives in buffers
+outside the Python objects; refcount changes on a tensor only touch its
+small header, never the weights.
+
+Each worker re-creates what does not survive fork() (Runtime.after_fork:
+batcher threads, SQLite connections), limits torch to cpu_count / workers
+threads, and serves the Flask app with a threaded WSGI server on the
+listening socket inherited from the parent. The parent restarts workers
+that die and stops them all on SIGTERM / SIGINT.
+
+Every worker keeps its own in-process state, so run with
+MEMORY_BACKEND=sqlite (sessions) and ORDER_STORE=sqlite or http (returns) to share
+them, and note that /metrics reports the worker that served the scrape.
+LLM_RUNTIME=onnx is not supported: ONNX Runtime sessions own thread pools
+that do not survive fork().
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+
+
+def run_worker(agent, app, order_store, sock, host: str, port: int, threads: int) -> None:
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    agent.after_fork()
+    order_store.after_fork()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the app from workers forked after loading the models.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--access-log", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    # Loaded in this process, before forking.
+    os.environ["LAZY_STARTUP"] = "0"
+    # HF tokenizers disable their thread pool after fork() with a warning.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    from config.settings import LLM_BACKEND, LLM_RUNTIME
+    if LLM_BACKEND != "stub" and LLM_RUNTIME == "onnx":
+        sys.exit("backend.prefork does not support LLM_RUNTIME=onnx; use torch or int8")
+
+    from backend.app import agent, app
+    from backend.mock_tools import ORDER_STORE
+
+    if not agent.ready:
+        sys.exit("model loading failed; not starting workers")
+    if not args.access_log:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(agent, app, ORDER_STORE, sock, args.host, args.port, threads)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = slot
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(args.workers):
+        spawn(slot)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers (parent {os.getpid()})", flush=True)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting", flush=True)
+            spawn(slot)
+
+
+if __name__ == "__main__":
+    main()
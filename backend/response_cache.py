@@ -0,0 +1,145 @@
+"""
+Response cache for the deterministic rule and tool replies.
+
+Canned replies and the policy tools (refund policy, payment help) depend
+only on the intent; an order-status reply depends on the order record. They
+are cached under (intent, normalized arguments, data version) with a TTL per
+intent (RESPONSE_CACHE_TTLS), in front of both /chat (via `rule_reply`) and
+the /api/order-status and /api/refund-policy routes.
+
+Data versions are counters in a fixed number of buckets, one bucket per
+resource hash. Writing an order or return record bumps its order's bucket
+(the order store notifies the cache), so its cached status is never served
+again; a write from another process is only seen once the TTL runs out.
+Return requests write records and are never cached.
+"""
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from backend.mock_tools import ORDER_STORE, get_order_status, get_refund_policy, order_service_unavailable
+from backend.order_store import OrderServiceError
+from config.settings import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTLS
+
+VERSION_BUCKETS = 1024
+
+
+class CachedResponse(NamedTuple):
+    body: str
+    max_age: float  # seconds the reply stays valid; 0 when not cached
+
+
+class ResponseCache:
+    def __init__(self, ttls: dict = RESPONSE_CACHE_TTLS, max_size: int = RESPONSE_CACHE_SIZE):
+        self.ttls = dict(ttls)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (body, expires_at); most recent last
+        self._versions = [0] * VERSION_BUCKETS
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl(self, intent: str) -> float:
+        return self.ttls.get(intent, self.ttls.get("default", 0.0))
+
+    @staticmethod
+    def _bucket(resource: str) -> int:
+        return zlib.crc32(resource.encode("utf-8")) % VERSION_BUCKETS
+
+    def version(self, resource: Optional[str]) -> int:
+        return self._versions[self._bucket(resource)] if resource else 0
+
+    def invalidate(self, resources: Iterable[str]) -> None:
+        """Bump the data version of `resources` (called on writes)."""
+        with self._lock:
+            for resource in resources:
+                self._versions[self._bucket(resource)] += 1
+                self.invalidations += 1
+
+    def get_or_compute(
+        self, intent: str, args: str, compute: Callable[[], str], resource: Optional[str] = None
+    ) -> CachedResponse:
+        ttl = self.ttl(intent)
+        if ttl <= 0:
+            return CachedResponse(compute(), 0.0)
+
+        key = (intent, args, self.version(resource))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return CachedResponse(entry[0], entry[1] - now)
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+
+        body = compute()
+        with self._lock:
+            self._entries[key] = (body, now + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return CachedResponse(body, ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttls": self.ttls,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+RESPONSE_CACHE = ResponseCache() if RESPONSE_CACHE_ENABLED else None
+
+if RESPONSE_CACHE is not None:
+    ORDER_STORE.subscribe(
+        lambda order_ids: RESPONSE_CACHE.invalidate(order_resource(oid) for oid in order_ids)
+    )
+
+
+def normalize_order_id(order_id: str) -> str:
+    # Same normalization as get_order_status.
+    return order_id.strip().upper().rstrip("?.")
+
+
+def order_resource(order_id: str) -> str:
+    return "order:" + order_id.upper()
+
+
+def cached_reply(
+    intent: str, args: str, compute: Callable[[], str], resource: Optional[str] = None
+) -> CachedResponse:
+    if RESPONSE_CACHE is None:
+        return CachedResponse(compute(), 0.0)
+    return RESPONSE_CACHE.get_or_compute(intent, args, compute, resource)
+
+
+def order_status_response(order_id: str) -> CachedResponse:
+    oid = normalize_order_id(order_id)
+    try:
+        return cached_reply("order_status", oid, lambda: get_order_status(oid), resource=order_resource(oid))
+    except OrderServiceError:
+        # Not cached: the next message retries the order service.
+        return CachedResponse(order_service_unavailable(), 0.0)
+
+
+def refund_policy_response() -> CachedResponse:
+    return cached_reply("refund_policy", "", get_refund_policy)
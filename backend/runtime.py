@@ -0,0 +1,244 @@
+"""
+Staged model loading for the web app.
+
+The app answers rule and tool intents as soon as it imports; the embedding
+model, vector store and LLM are loaded afterwards (in a background thread
+when LAZY_STARTUP is on). Until the RAG agent is ready, RAG-bound queries
+wait up to WARMUP_WAIT_SECONDS and then get a "warming up" reply.
+
+`Runtime` is used by the app exactly like the agent returned by
+`create_agent` (callable, `.stream`, `.answer_batch`, `.sessions`,
+`.answer_cache`). Calls naming a `tenant` are answered by that tenant's
+agent (see rag/tenants.py), built on the shared models when its index is
+first loaded; the tenant's session ids are kept apart from the others.
+"""
+import os
+import threading
+import time
+import traceback
+from typing import List, Optional, Sequence
+
+from agents.agent_router import route_query, rule_intent, rule_reply
+from agents.memory import load_session_store
+from backend.admission import remaining
+from backend.metrics import set_intent, stage
+from config.settings import ANSWER_CACHE_ENABLED, WARMUP_WAIT_SECONDS
+from rag.tenants import TenantIndexes
+
+WARMING_UP_REPLY = (
+    "I’m still warming up and can’t answer general questions just yet. "
+    "Please try again in a few seconds — meanwhile I can already help you "
+    "track orders, start returns, or with payment issues."
+)
+
+COMPONENTS = ("embeddings", "vectorstore", "llm", "agent")
+
+
+class Runtime:
+    def __init__(self, sessions=None):
+        self.sessions = sessions if sessions is not None else load_session_store()
+        self.embeddings = None
+        self.vectorstore = None
+        self.llm = None
+        self.rag_agent = None
+        self.tenants = TenantIndexes(self._load_tenant)
+        self.components = {
+            name: {"state": "pending", "load_seconds": None, "error": None}
+            for name in COMPONENTS
+        }
+        self.started_at = time.time()
+        self._ready = threading.Event()
+        self._thread = None
+
+    # -- loading ---------------------------------------------------------
+
+    def _stage(self, name, fn):
+        component = self.components[name]
+        component["state"] = "loading"
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as exc:
+            component["state"] = "failed"
+            component["error"] = f"{type(exc).__name__}: {exc}"
+            raise
+        component["load_seconds"] = round(time.perf_counter() - start, 3)
+        component["state"] = "ready"
+        return result
+
+    def load(self) -> None:
+        """Load every component in order; safe to call from a thread."""
+        # Imported here so transformers / torch are only imported by the
+        # loader, not before the app can serve rule intents.
+        from agents.agent_router import create_agent
+        from llm.llm_loader import load_llm
+        from rag.embeddings import load_embeddings
+        from rag.vectorstore import load_vectorstore
+
+        try:
+            self.embeddings = self._stage("embeddings", load_embeddings)
+            self.vectorstore = self._stage("vectorstore", lambda: load_vectorstore(self.embeddings))
+            self.llm = self._stage("llm", load_llm)
+            self.rag_agent = self._stage(
+                "agent", lambda: create_agent(self.llm, self.vectorstore, sessions=self.sessions)
+            )
+        except Exception:
+            traceback.print_exc()
+            return
+        self._ready.set()
+        print("System is ready")
+
+    def _load_tenant(self, index_dir: str):
+        """Agent over a tenant's index, sharing the models and admission."""
+        from agents.agent_router import create_agent
+        from rag.answer_cache import AnswerCache
+        from rag.ingest import index_meta, open_kb_index
+
+        vectorstore = open_kb_index(index_dir, self.embeddings)
+        answer_cache = None
+        if ANSWER_CACHE_ENABLED:
+            answer_cache = AnswerCache(self.embeddings, kb_hash=index_meta(index_dir).get("kb_hash"))
+        return create_agent(
+            self.llm, vectorstore, sessions=self.sessions,
+            answer_cache=answer_cache, admission=self.rag_agent.admission,
+            retrieval_admission=self.rag_agent.retrieval_admission,
+            tenant=os.path.basename(os.path.normpath(index_dir)),
+        )
+
+    def start(self, background: bool = True) -> None:
+        if not background:
+            self.load()
+            return
+        self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+        self._thread.start()
+
+    # -- state -----------------------------------------------------------
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def failed(self) -> bool:
+        return any(c["state"] == "failed" for c in self.components.values())
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "mode": "full" if self.ready else "rules_only",
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "components": {name: dict(c) for name, c in self.components.items()},
+        }
+
+    def after_fork(self) -> None:
+        """
+        Re-create, in a worker forked from a loaded parent, what does not
+        survive fork(): batcher threads and SQLite connections.
+        """
+        components = (
+            self.sessions.backend,
+            self.embeddings,
+            getattr(self.llm, "pipeline", None),
+            getattr(self.vectorstore, "docstore", None),
+            getattr(self.rag_agent, "admission", None),
+            getattr(self.rag_agent, "retrieval_admission", None),
+            self.tenants,
+        )
+        for component in components:
+            hook = getattr(component, "after_fork", None)
+            if hook is not None:
+                hook()
+
+    @property
+    def answer_cache(self):
+        return self.rag_agent.answer_cache if self.rag_agent is not None else None
+
+    @property
+    def admission(self):
+        return self.rag_agent.admission if self.rag_agent is not None else None
+
+    @property
+    def retrieval_admission(self):
+        return self.rag_agent.retrieval_admission if self.rag_agent is not None else None
+
+    # -- agent interface -------------------------------------------------
+
+    def _early_reply(self, query: str, route=None, tenant: Optional[str] = None) -> Optional[str]:
+        """Rule / tool reply served while the models are still loading."""
+        if route is None:
+            with stage("route"):
+                route = route_query(query)
+        set_intent(route.intent)
+        if not rule_intent(route.intent, tenant):
+            return None
+        return rule_reply(query, route)
+
+    def has_tenant(self, tenant: str) -> bool:
+        return self.tenants.exists(tenant)
+
+    def _agent_for(self, tenant: Optional[str]):
+        """The default agent, or the tenant's (loading its index if needed)."""
+        if tenant is None:
+            return self.rag_agent
+        with stage("tenant_index"):
+            return self.tenants.get(tenant)
+
+    @staticmethod
+    def _session(tenant: Optional[str], session_id: Optional[str]) -> Optional[str]:
+        if tenant is None or session_id is None:
+            return session_id
+        return f"{tenant}:{session_id}"
+
+    def _rag_agent(self, deadline: Optional[float] = None, tenant: Optional[str] = None):
+        if self.ready:
+            return self._agent_for(tenant)
+        wait = WARMUP_WAIT_SECONDS
+        if deadline is not None:
+            wait = min(wait, remaining(deadline))
+        with stage("warmup_wait"):
+            if not self.failed and self.wait_ready(wait):
+                return self._agent_for(tenant)
+        return None
+
+    def __call__(self, query: str, session_id: Optional[str] = None, deadline: Optional[float] = None,
+                 tenant: Optional[str] = None) -> str:
+        session_id = self._session(tenant, session_id)
+        if self.ready:
+            return self._agent_for(tenant)(query, session_id=session_id, deadline=deadline)
+
+        reply = self._early_reply(query, tenant=tenant)
+        if reply is not None:
+            return reply
+        agent = self._rag_agent(deadline, tenant)
+        if agent is None:
+            set_intent("warming_up")
+            return WARMING_UP_REPLY
+        return agent(query, session_id=session_id, deadline=deadline)
+
+    def stream(self, query: str, session_id: Optional[str] = None, deadline: Optional[float] = None,
+               tenant: Optional[str] = None, route=None):
+        session_id = self._session(tenant, session_id)
+        if self.ready:
+            yield from self._agent_for(tenant).stream(query, session_id=session_id, deadline=deadline, route=route)
+            return
+
+        reply = self._early_reply(query, route, tenant)
+        if reply is not None:
+            yield "done", reply
+            return
+        agent = self._rag_agent(deadline, tenant)
+        if agent is None:
+            set_intent("warming_up")
+            yield "done", WARMING_UP_REPLY
+            return
+        yield from agent.stream(query, session_id=session_id, deadline=deadline, route=route)
+
+    def answer_batch(self, queries: Sequence[str]) -> List[str]:
+        """RAG answers for a batch of queries; waits for the models to load."""
+        while not self.wait_ready(1.0):
+            if self.failed:
+                raise RuntimeError("model loading failed; see /healthz")
+        return self.rag_agent.answer_batch(queries)
@@ -0,0 +1,54 @@
+"""
+Generate synthetic orders for load tests.
+
+Usage:
+    python -m backend.seed_orders --count 1000000 [--db artifacts/orders.db]
+
+Order ids are ORD<n> (starting at --start), spread over --customers customer
+ids, with random statuses and dates. Rows are generated lazily and inserted
+in batches, so memory use does not grow with --count.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from backend.order_store import SQLiteOrderStore
+from config.settings import ORDER_DB_PATH
+
+STATUSES = ("Pending", "Processing", "Shipped", "Delivered")
+
+
+def synthetic_orders(count: int, start: int = 1000, customers: int = 100000, seed: int = 0):
+    rng = random.Random(seed)
+    now = datetime.now()
+    for n in range(start, start + count):
+        created = now - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 1440))
+        yield f"ORD{n}", {
+            "customer_id": f"CUST{rng.randint(1, customers):06d}",
+            "status": rng.choice(STATUSES),
+            "created_at": created,
+            "expected_delivery": created + timedelta(days=rng.randint(2, 9)),
+            "total_amount": round(rng.uniform(99, 9999), 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the SQLite order store with synthetic orders.")
+    parser.add_argument("--db", default=ORDER_DB_PATH)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--start", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = SQLiteOrderStore(args.db)
+    begin = time.perf_counter()
+    store.add_orders(synthetic_orders(args.count, args.start, args.customers, args.seed))
+    elapsed = time.perf_counter() - begin
+    print(f"Inserted {args.count} orders into {args.db} in {elapsed:.1f}s "
+          f"({args.count / elapsed:,.0f} orders/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Server-Sent Events helpers for the streaming chat endpoint.
+
+Each event is one `data:` line holding a JSON object:
+    {"type": "token", "text": "..."}                        while generating
+    {"type": "done", "response": "...", "session_id": "..."} once, at the end
+
+The "done" event carries the cleaned final answer, which the client shows in
+place of the raw tokens it has received so far.
+"""
+import json
+
+from backend.metrics import REGISTRY, set_intent, trace_request
+
+EMPTY_QUERY_REPLY = "Please type a question so I can help you 🙂"
+INTERNAL_ERROR_REPLY = "Sorry, I ran into an internal issue. Please try again."
+
+
+def sse_event(payload: dict) -> str:
+    return "data: " + json.dumps(payload, ensure_ascii=False) + "\n\n"
+
+
+def chat_events(agent, query: str, session_id: str, deadline=None, tenant=None, route=None):
+    """Run `agent.stream` and format its output as SSE strings."""
+    with trace_request("stream"):
+        if not query:
+            set_intent("empty")
+            yield sse_event({"type": "done", "response": EMPTY_QUERY_REPLY, "session_id": session_id})
+            return
+
+        try:
+            for kind, text in agent.stream(query, session_id=session_id, deadline=deadline, tenant=tenant, route=route):
+                if kind == "token":
+                    yield sse_event({"type": "token", "text": text})
+                else:
+                    yield sse_event({"type": "done", "response": text, "session_id": session_id})
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            REGISTRY.inc("chat_errors_total", kind="stream")
+            yield sse_event({"type": "done", "response": INTERNAL_ERROR_REPLY, "session_id": session_id})
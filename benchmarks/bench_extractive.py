@@ -0,0 +1,149 @@
+"""
+Latency and answer agreement of extractive answers (ANSWER_MODE=extractive,
+see rag/extractive.py) against the generative path.
+
+Usage:
+    python -m benchmarks.bench_extractive [--dataset data/eval_suite.jsonl]
+        [--thresholds 0.4,0.5,0.6,0.7] [--repeat 3] [--llm-latency-ms 50]
+        [--real-models] [--output report.json]
+
+Every query of the dataset that has a reference answer and is routed to RAG
+is answered by the generative agent and by the extractive agent at each
+threshold (the answer cache is disabled). For every run the report gives:
+
+    extractive_share        share of queries answered without the LLM
+    llm_calls_per_request   LLM generations per query
+    mean_ms, p50_ms, p95_ms end-to-end latency per query
+    agreement_mean          cosine similarity of the reply to the generative
+                            reply, over all queries and over the extracted
+                            ones only (agreement_extracted_mean)
+    reference_similarity    cosine similarity of the reply to the reference
+
+Similarities use the configured embedding model. With the stub models (the
+default) generation costs a fixed --llm-latency-ms per call and replies with
+the first sentences of the retrieved context, so agreement there mostly
+shows whether the same passage was used; use --real-models for flan-t5.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.eval_suite import cosine_rows, load_dataset
+from benchmarks.load_test import percentile
+
+
+def run(agent, counter, queries, repeat):
+    replies, latencies, llm_calls = [], [], []
+    for round_ in range(repeat):
+        for query in queries:
+            calls = counter.calls
+            start = time.perf_counter()
+            reply = agent(query)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            if round_ == 0:
+                replies.append(reply)
+                llm_calls.append(counter.calls - calls)
+    latencies.sort()
+    return replies, np.array(llm_calls), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extractive and generated answers.")
+    parser.add_argument("--dataset", default="data/eval_suite.jsonl")
+    parser.add_argument("--thresholds", default="0.4,0.5,0.6,0.7")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    os.environ["ANSWER_CACHE_ENABLED"] = "0"
+    if not args.real_models:
+        os.environ["LLM_BACKEND"] = "stub"
+        os.environ["EMBEDDING_BACKEND"] = "stub"
+        os.environ.setdefault("VECTORSTORE_DIR", os.path.join(tempfile.mkdtemp(), "faiss_index"))
+        os.environ["STUB_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    from agents.agent_router import create_agent, intent_kind, route_query
+    from agents.memory import SessionStore
+    from llm.llm_loader import load_llm
+    from rag.embeddings import load_embeddings
+    from rag.extractive import SentenceIndex
+    from rag.vectorstore import load_vectorstore
+
+    class CallCounter(BaseCallbackHandler):
+        calls = 0
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            self.calls += len(prompts)
+
+    records = [
+        r for r in load_dataset(args.dataset)
+        if r.get("reference") and intent_kind(route_query(r["query"]).intent) == "rag"
+    ]
+    queries = [r["query"] for r in records]
+    counter = CallCounter()
+    llm = load_llm()
+    llm.callbacks = [counter]
+    vectorstore = load_vectorstore(load_embeddings())
+    embed = vectorstore.embeddings.embed_documents
+
+    start = time.perf_counter()
+    sentence_index = SentenceIndex.build(vectorstore)
+    build_seconds = time.perf_counter() - start
+
+    generative = create_agent(llm, vectorstore, sessions=SessionStore(), answer_mode="generate")
+    baseline, baseline_calls, latencies = run(generative, counter, queries, args.repeat)
+    baseline_vectors = embed(baseline)
+    reference_vectors = embed([r["reference"] for r in records])
+
+    def summary(name, replies, llm_calls, latencies):
+        vectors = embed(replies)
+        agreement = cosine_rows(vectors, baseline_vectors)
+        extracted = llm_calls == 0
+        return {
+            "mode": name,
+            "extractive_share": round(float(extracted.mean()), 4),
+            "llm_calls_per_request": round(float(llm_calls.mean()), 3),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "agreement_mean": round(float(agreement.mean()), 4),
+            "agreement_extracted_mean": round(float(agreement[extracted].mean()), 4) if extracted.any() else None,
+            "reference_similarity": round(float(cosine_rows(vectors, reference_vectors).mean()), 4),
+        }
+
+    runs = [summary("generate", baseline, baseline_calls, latencies)]
+    for threshold in (float(t) for t in args.thresholds.split(",")):
+        sentence_index.threshold = threshold
+        extractive = create_agent(
+            llm, vectorstore, sessions=SessionStore(), answer_mode="extractive", sentence_index=sentence_index
+        )
+        runs.append(summary(f"extractive@{threshold}", *run(extractive, counter, queries, args.repeat)))
+
+    report = {
+        "config": {
+            "queries": len(queries),
+            "repeat": args.repeat,
+            "stub_models": not args.real_models,
+            "llm_latency_ms": None if args.real_models else args.llm_latency_ms,
+            "sentences": len(sentence_index),
+            "sentence_index_build_seconds": round(build_seconds, 3),
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
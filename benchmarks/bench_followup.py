@@ -0,0 +1,138 @@
+"""
+LLM calls, latency and retrieval recall of follow-up questions by
+RAG_FOLLOWUP_MODE (see rag/followup.py).
+
+Usage:
+    python -m benchmarks.bench_followup [--conversations data/followup_eval.jsonl]
+        [--modes llm,blend] [--k 1,3,5] [--repeat 3] [--llm-latency-ms 50]
+        [--real-models] [--output report.json]
+
+Each line of the conversation set is {"id", "turns": [...], "relevant": [...]}:
+the earlier turns are sent first in one session, then the last turn is the
+measured follow-up; "relevant" phrases occur only in the passages answering
+it in context. For every mode the report gives:
+
+    llm_calls_per_request   LLM generations per RAG request, all turns
+    followup_llm_calls      LLM generations per follow-up turn
+    followup_p50_ms / p95   end-to-end latency of the follow-up turn
+    recall@k                share of relevant passages retrieved for it
+
+The answer cache is disabled so every turn reaches the LLM. With the stub
+models (the default) generation costs a fixed --llm-latency-ms per call and
+condensing returns the follow-up unchanged, so "llm" recall there is that of
+the bare follow-up; use --real-models for the recall of flan-t5's rewrite.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.load_test import percentile
+
+
+def load_conversations(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_mode(mode, conversations, llm, vectorstore, ks, repeat):
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    from agents.agent_router import create_agent
+    from agents.memory import SessionStore
+
+    class CallCounter(BaseCallbackHandler):
+        calls = 0
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            self.calls += len(prompts)
+
+    counter = CallCounter()
+    llm.callbacks = [counter]
+    agent = create_agent(llm, vectorstore, sessions=SessionStore(), followup_mode=mode)
+
+    requests = followup_calls = 0
+    latencies, recall = [], {k: [] for k in ks}
+    for round_ in range(repeat):
+        for conv in conversations:
+            session_id = f"{mode}-{conv['id']}-{round_}"
+            for turn in conv["turns"][:-1]:
+                agent(turn, session_id)
+                requests += 1
+
+            followup = conv["turns"][-1]
+            if round_ == 0:
+                calls = counter.calls
+                texts = [doc.page_content for doc in agent.search(followup, session_id)]
+                counter.calls = calls  # retrieval only; not a request
+                for k in ks:
+                    found = sum(any(p in text for text in texts[:k]) for p in conv["relevant"])
+                    recall[k].append(found / len(conv["relevant"]))
+
+            calls = counter.calls
+            start = time.perf_counter()
+            agent(followup, session_id)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            followup_calls += counter.calls - calls
+            requests += 1
+
+    llm.callbacks = None
+    latencies.sort()
+    followups = len(conversations) * repeat
+    return {
+        "mode": mode,
+        "requests": requests,
+        "llm_calls_per_request": round(counter.calls / requests, 3),
+        "followup_llm_calls": round(followup_calls / followups, 3),
+        "followup_p50_ms": round(percentile(latencies, 50), 2),
+        "followup_p95_ms": round(percentile(latencies, 95), 2),
+        **{f"recall@{k}": round(sum(v) / len(v), 4) for k, v in recall.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare follow-up question handling modes.")
+    parser.add_argument("--conversations", default="data/followup_eval.jsonl")
+    parser.add_argument("--modes", default="llm,blend")
+    parser.add_argument("--k", default="1,3,5")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    os.environ["ANSWER_CACHE_ENABLED"] = "0"
+    if not args.real_models:
+        os.environ["LLM_BACKEND"] = "stub"
+        os.environ["EMBEDDING_BACKEND"] = "stub"
+        os.environ.setdefault("VECTORSTORE_DIR", os.path.join(tempfile.mkdtemp(), "faiss_index"))
+        os.environ["STUB_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+
+    from llm.llm_loader import load_llm
+    from rag.embeddings import load_embeddings
+    from rag.vectorstore import load_vectorstore
+
+    conversations = load_conversations(args.conversations)
+    ks = [int(k) for k in args.k.split(",")]
+    llm = load_llm()
+    vectorstore = load_vectorstore(load_embeddings())
+
+    report = {
+        "config": {
+            "conversations": len(conversations),
+            "repeat": args.repeat,
+            "stub_models": not args.real_models,
+            "llm_latency_ms": None if args.real_models else args.llm_latency_ms,
+        },
+        "modes": [run_mode(mode, conversations, llm, vectorstore, ks, args.repeat) for mode in args.modes.split(",")],
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
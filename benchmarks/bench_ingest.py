@@ -0,0 +1,97 @@
+"""
+Full and incremental ingestion of a large synthetic knowledge base.
+
+Usage:
+    python -m benchmarks.bench_ingest [--chunks 100000] [--files 200]
+        [--workdir DIR]
+
+Writes --files markdown files holding about --chunks sections in total and
+ingests them with the stub embeddings (EMBEDDING_BACKEND=stub). Then edits
+1% of the sections, deletes one file and ingests again. Prints wall time,
+chunk counts and the peak RSS of the process as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("EMBEDDING_BACKEND", "stub")
+
+from rag.embeddings import load_embeddings  # noqa: E402
+from rag.ingest import ingest  # noqa: E402
+
+WORDS = (
+    "order delivery refund return payment courier address invoice warranty "
+    "exchange discount coupon wallet shipping tracking product size color"
+).split()
+
+
+def write_corpus(source_dir, chunks, files, seed=0):
+    rng = random.Random(seed)
+    per_file = max(1, chunks // files)
+    for f in range(files):
+        with open(os.path.join(source_dir, f"policy-{f:04d}.md"), "w") as out:
+            out.write(f"# Policy {f}\n")
+            for s in range(per_file):
+                words = " ".join(rng.choice(WORDS) for _ in range(30))
+                out.write(f"\n## Rule {f}.{s}\n{words}.\n")
+
+
+def edit_corpus(source_dir, fraction, seed=1):
+    rng = random.Random(seed)
+    names = sorted(os.listdir(source_dir))
+    os.remove(os.path.join(source_dir, names[-1]))
+    for name in names[:-1]:
+        path = os.path.join(source_dir, name)
+        with open(path) as f:
+            lines = f.readlines()
+        for i, line in enumerate(lines):
+            if line.strip() and not line.startswith("#") and rng.random() < fraction:
+                lines[i] = "Updated: " + line
+        with open(path, "w") as f:
+            f.writelines(lines)
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark knowledge-base ingestion.")
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--workdir")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp()
+    source_dir = os.path.join(workdir, "kb")
+    index_dir = os.path.join(workdir, "index")
+    os.makedirs(source_dir, exist_ok=True)
+    embeddings = load_embeddings()
+    report = {}
+    try:
+        write_corpus(source_dir, args.chunks, args.files)
+
+        start = time.perf_counter()
+        report["full"] = ingest(source_dir, index_dir, embeddings)
+        report["full"]["seconds"] = round(time.perf_counter() - start, 2)
+        report["full"]["peak_rss_mb"] = peak_rss_mb()
+
+        edit_corpus(source_dir, 0.01)
+        start = time.perf_counter()
+        report["incremental"] = ingest(source_dir, index_dir, embeddings)
+        report["incremental"]["seconds"] = round(time.perf_counter() - start, 2)
+        report["incremental"]["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
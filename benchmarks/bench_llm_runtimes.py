@@ -0,0 +1,135 @@
+"""
+Latency, memory and answer agreement of the LLM runtimes.
+
+Usage:
+    python -m benchmarks.bench_llm_runtimes [--runtimes torch,int8,onnx]
+        [--repeat 3] [--output report.json]
+
+Each runtime (LLM_RUNTIME, see llm/llm_loader.py) is loaded in its own
+subprocess, so peak RSS is measured per runtime, and answers the FAQ
+questions below from the RAG prompt the agent would build (top-5 retrieved
+knowledge-base passages). Reports load time, per-answer latency percentiles,
+peak RSS and agreement with the fp32 "torch" answers (exact match and mean
+token F1). Prints JSON.
+"""
+import argparse
+import json
+import re
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.load_test import percentile
+
+FAQ_QUESTIONS = [
+    "How long does standard delivery take?",
+    "Do you offer express delivery?",
+    "How can I find products in a category?",
+    "Can I pay using UPI or a wallet?",
+    "What happens when a product is out of stock?",
+    "Are there shipping charges on my order?",
+    "Which items cannot be returned?",
+    "How long do refunds take to process?",
+    "Can I change the delivery address after ordering?",
+    "What should I do if I received a damaged product?",
+]
+
+
+def build_prompts():
+    from prompts.system_prompt import QA_PROMPT
+    from rag.vectorstore import load_vectorstore
+
+    vectorstore = load_vectorstore()
+    prompts = []
+    for question in FAQ_QUESTIONS:
+        docs = vectorstore.similarity_search(question, k=5)
+        context = "\n\n".join(doc.page_content for doc in docs)
+        prompts.append(QA_PROMPT.format(context=context, question=question))
+    return prompts
+
+
+def run_worker(runtime, repeat):
+    from llm.llm_loader import load_llm
+
+    prompts = build_prompts()
+    start = time.perf_counter()
+    llm = load_llm(runtime)
+    load_seconds = time.perf_counter() - start
+
+    llm.invoke(prompts[0])  # warm-up
+    latencies, answers = [], []
+    for _ in range(repeat):
+        answers = []
+        for prompt in prompts:
+            start = time.perf_counter()
+            answers.append(llm.invoke(prompt).strip())
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+    values = sorted(latencies)
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "mean_ms": round(sum(values) / len(values), 1),
+        "p50_ms": round(percentile(values, 50), 1),
+        "p95_ms": round(percentile(values, 95), 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "answers": answers,
+    }
+
+
+def token_f1(a: str, b: str) -> float:
+    ta, tb = re.findall(r"\w+", a.lower()), re.findall(r"\w+", b.lower())
+    if not ta or not tb:
+        return float(ta == tb)
+    common = sum(min(ta.count(t), tb.count(t)) for t in set(ta))
+    if not common:
+        return 0.0
+    precision, recall = common / len(ta), common / len(tb)
+    return 2 * precision * recall / (precision + recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the LLM runtimes.")
+    parser.add_argument("--runtimes", default="torch,int8,onnx")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.repeat)))
+        return
+
+    runtimes = [r for r in args.runtimes.split(",") if r]
+    if "torch" not in runtimes:
+        runtimes.insert(0, "torch")  # the reference for answer agreement
+
+    results = {}
+    for runtime in runtimes:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_llm_runtimes",
+             "--worker", runtime, "--repeat", str(args.repeat)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            results[runtime] = {"error": proc.stderr.strip().splitlines()[-1:]}
+            continue
+        results[runtime] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    reference = results.get("torch", {}).get("answers")
+    for runtime, result in results.items():
+        if reference and "answers" in result:
+            pairs = list(zip(reference, result["answers"]))
+            result["exact_match"] = round(sum(a == b for a, b in pairs) / len(pairs), 3)
+            result["token_f1"] = round(sum(token_f1(a, b) for a, b in pairs) / len(pairs), 3)
+
+    report = {"questions": FAQ_QUESTIONS, "repeat": args.repeat, "runtimes": results}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Throughput and latency of order lookups through the order-service client
+(backend/order_service.py) against the local stub service, under concurrency.
+
+Usage:
+    python -m benchmarks.bench_order_service [--lookups 5000] [--threads 32]
+        [--pool-size 32] [--orders 10000] [--hot 50] [--hot-share 0.8] [--latency-ms 20]
+        [--output report.json]
+
+Starts backend.order_service_stub with --latency-ms per request. Lookups
+follow a skewed mix: --hot-share of them ask for one of --hot order ids,
+since customers keep asking about the same orders. Runs:
+
+    unpooled          a new connection per lookup (urllib.request)
+    pooled            keep-alive pool, no coalescing, no cache
+    pooled+coalesce   concurrent lookups of one id share a request
+    pooled+coalesce+cache   plus the ORDER_SERVICE_CACHE_TTL_SECONDS cache
+
+For each run the report gives lookups/s, p50/p95/p99 latency and the number
+of requests the service received. Two fault runs use the pooled client
+without cache:
+
+    errors_<rate>     the service fails --error-rate of requests (503);
+                      success rate with and without retries
+    outage            every request fails; latency with the circuit breaker
+                      and with the breaker disabled
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_workers import free_port
+from benchmarks.load_test import percentile
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def service_requests(url):
+    with urllib.request.urlopen(url + "/_stats", timeout=10) as response:
+        return json.loads(response.read())["total"]
+
+
+def order_ids(n, orders, hot, hot_share, seed=0):
+    rng = random.Random(seed)
+    hot_ids = [f"ORD{1000 + i}" for i in range(hot)]
+    return [
+        rng.choice(hot_ids) if rng.random() < hot_share else f"ORD{1000 + rng.randrange(orders)}"
+        for _ in range(n)
+    ]
+
+
+def run(name, lookup, ids, threads, url):
+    latencies, errors = [], 0
+
+    def timed(order_id):
+        start = time.perf_counter()
+        try:
+            lookup(order_id)
+            ok = True
+        except Exception:
+            ok = False
+        return (time.perf_counter() - start) * 1000.0, ok
+
+    before = service_requests(url)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for ms, ok in pool.map(timed, ids):
+            latencies.append(ms)
+            errors += not ok
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "run": name,
+        "lookups_per_second": round(len(ids) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "service_requests": service_requests(url) - before,
+        "errors": errors,
+        "success_rate": round(1 - errors / len(ids), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the order-service client.")
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--pool-size", type=int, default=32)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--hot", type=int, default=50)
+    parser.add_argument("--hot-share", type=float, default=0.8)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    from backend.order_service import CircuitBreaker, HTTPOrderStore, OrderServiceClient
+    from config.settings import ORDER_SERVICE_CACHE_TTL_SECONDS
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "backend.order_service_stub", "--port", str(port),
+         "--orders", str(args.orders), "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                service_requests(url)
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        ids = order_ids(args.lookups, args.orders, args.hot, args.hot_share)
+
+        def store(cache_ttl=0.0, coalesce=False, retries=2, breaker_failures=5):
+            client = OrderServiceClient(
+                url, pool_size=args.pool_size, retries=retries, breaker=CircuitBreaker(failures=breaker_failures)
+            )
+            return HTTPOrderStore(client, cache_ttl=cache_ttl, coalesce=coalesce)
+
+        def unpooled(order_id):
+            try:
+                with urllib.request.urlopen(f"{url}/orders/{order_id}", timeout=5) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as exc:
+                if exc.code != 404:
+                    raise
+
+        runs = [
+            run("unpooled", unpooled, ids, args.threads, url),
+            run("pooled", store().get_order, ids, args.threads, url),
+            run("pooled+coalesce", store(coalesce=True).get_order, ids, args.threads, url),
+            run("pooled+coalesce+cache", store(ORDER_SERVICE_CACHE_TTL_SECONDS, True).get_order,
+                ids, args.threads, url),
+        ]
+
+        fault_ids = ids[:1000]
+        post(url + "/_faults", {"error_rate": args.error_rate})
+        runs.append(run(f"errors_{args.error_rate}_no_retries", store(retries=0, breaker_failures=10**9).get_order,
+                        fault_ids, args.threads, url))
+        runs.append(run(f"errors_{args.error_rate}_retries", store(breaker_failures=10**9).get_order,
+                        fault_ids, args.threads, url))
+        post(url + "/_faults", {"error_rate": 1.0})
+        runs.append(run("outage_no_breaker", store(breaker_failures=10**9).get_order, fault_ids, args.threads, url))
+        runs.append(run("outage_breaker", store().get_order, fault_ids, args.threads, url))
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+    report = {
+        "config": {
+            "lookups": args.lookups,
+            "threads": args.threads,
+            "pool_size": args.pool_size,
+            "orders": args.orders,
+            "hot_ids": args.hot,
+            "hot_share": args.hot_share,
+            "service_latency_ms": args.latency_ms,
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
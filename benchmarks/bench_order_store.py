@@ -0,0 +1,84 @@
+"""
+Lookup and insert throughput of the order stores at 1M+ orders.
+
+Usage:
+    python -m benchmarks.bench_order_store [--count 1000000] [--threads 8]
+        [--db PATH] [--backend sqlite|memory]
+
+Seeds --count synthetic orders (skipped when --db already holds them), then
+measures random order-id lookups, customer lookups and concurrent return
+inserts, single-threaded and with --threads threads. Prints JSON.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.order_store import InMemoryOrderStore, SQLiteOrderStore
+from backend.seed_orders import synthetic_orders
+
+
+def throughput(fn, items, threads):
+    start = time.perf_counter()
+    if threads == 1:
+        for item in items:
+            fn(item)
+    else:
+        chunks = [items[i::threads] for i in range(threads)]
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda chunk: [fn(x) for x in chunk], chunks))
+    elapsed = time.perf_counter() - start
+    return round(len(items) / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the order stores.")
+    parser.add_argument("--backend", choices=("sqlite", "memory"), default="sqlite")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--inserts", type=int, default=20000)
+    parser.add_argument("--db", help="reuse an existing SQLite file instead of a temp one")
+    args = parser.parse_args()
+
+    report = {"backend": args.backend, "orders": args.count, "threads": args.threads}
+    start = time.perf_counter()
+    if args.backend == "sqlite":
+        path = args.db or os.path.join(tempfile.mkdtemp(), "orders.db")
+        store = SQLiteOrderStore(path, pool_size=args.threads)
+        if store.count_orders() < args.count:
+            store.add_orders(synthetic_orders(args.count))
+    else:
+        store = InMemoryOrderStore()
+        store.add_orders(synthetic_orders(args.count))
+    report["seed_seconds"] = round(time.perf_counter() - start, 2)
+
+    rng = random.Random(1)
+    order_ids = [f"ORD{rng.randrange(1000, 1000 + args.count)}" for _ in range(args.lookups)]
+    customers = [f"CUST{rng.randint(1, 100000):06d}" for _ in range(args.lookups // 10)]
+    returns = [f"ORD{n}" for n in rng.sample(range(1000, 1000 + args.count), args.inserts)]
+
+    report["order_lookups_per_s"] = {
+        "1": throughput(store.get_order, order_ids, 1),
+        str(args.threads): throughput(store.get_order, order_ids, args.threads),
+    }
+    report["customer_lookups_per_s"] = {
+        "1": throughput(store.orders_for_customer, customers, 1),
+        str(args.threads): throughput(store.orders_for_customer, customers, args.threads),
+    }
+    half = len(returns) // 2
+    report["return_inserts_per_s"] = {
+        "1": throughput(lambda oid: store.create_return(oid, "benchmark"), returns[:half], 1),
+        str(args.threads): throughput(
+            lambda oid: store.create_return(oid, "benchmark"), returns[half:], args.threads
+        ),
+    }
+    report["stats"] = store.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
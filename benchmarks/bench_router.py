@@ -0,0 +1,180 @@
+"""
+Micro-benchmark: compiled intent router vs. the old substring cascade.
+
+Usage:
+    python -m benchmarks.bench_router [--repeat N] [--fuzz N] [--seed S]
+
+`legacy_route` is a copy of the `if any(p in q_lower ...)` chain that used
+to live in agent() (returning intent names instead of replies). Both
+routers are run over the same query mix and must agree on every query.
+They must also agree on --fuzz random queries, built from every phrase of
+the intent table, truncated phrases, filler words and order ids, with
+random case, spacing and punctuation (see `fuzz_queries`). The script exits
+with status 1 on any disagreement.
+
+The compiled router is slower than the cascade: about 10 us against 5 us
+for short queries, and 25 us against 10 us for 200-character messages.
+The cascade's C-level `in` checks stop at the first hit, while the regex
+scans the whole query and reports every intent with its spans. The router
+is kept anyway. It costs a few tens of microseconds per request, well under
+1% of even a cached RAG reply. In exchange, intents, priorities and gates
+live in one table instead of an ordered if-chain.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from agents.intents import ECOMMERCE_KEYWORDS, INTENTS, route
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+QUERIES = [
+    "Hi", "Help", "What can you do?", "thanks a lot!",
+    "Where is my order ORD123?", "Track my order ORD456", "Order status for ORD789",
+    "I want to return order ORD789", "Can I exchange my order ORD456?",
+    "Tell me about your refund policy", "My payment failed", "I was charged twice for my order",
+    "UPI payment issue while placing order", "Tell me about discounts and offers",
+    "Help me find a product", "Do you have wireless headphones in stock?",
+    "My order was delivered but items are missing", "I'm very frustrated with your service",
+    "Courier is not responding for my delivery", "payment deducted, please cancel my order",
+    "I want to modify my order", "How long does standard delivery take after shipping?",
+    "Explain photosynthesis", "Can I pay with a wallet or card?",
+]
+
+
+# Support-email sized messages, where the cascade rescans long text.
+LONG_QUERIES = [
+    "Hello team, I placed a purchase last week for a pair of shoes and a jacket. "
+    "The courier came yesterday but the package looked damaged and I am not sure "
+    "what to do next. I would like to get a replacement if possible. Regards",
+    "Hi, my payment failed twice on checkout and the money was deducted from my "
+    "account both times. Can you check what happened and cancel the pending order "
+    "ORD456 so I can place it again? Thank you",
+]
+
+
+def legacy_route(query: str) -> str:
+    q_lower = query.lower()
+    if q_lower.strip() in ["hi", "hello", "hey", "good morning", "good evening"]:
+        return "greeting"
+    if q_lower.strip() in ["i need help", "help", "can you help me"]:
+        return "help"
+    if any(p in q_lower for p in ["thank you", "thanks", "appreciate", "good job"]):
+        return "thanks"
+    if "multiple complaints" in q_lower or "no response" in q_lower:
+        return "repeated_complaint"
+    if len(q_lower.split()) < 2:
+        return "unclear"
+    if not any(word in q_lower for word in ECOMMERCE_KEYWORDS):
+        return "out_of_scope"
+    if any(p in q_lower for p in [
+        "missing item", "items missing", "courier not responding",
+        "multiple complaints", "no response", "not responding"
+    ]):
+        return "escalation"
+    if "order" in q_lower and ("status" in q_lower or "track" in q_lower or "where is" in q_lower):
+        return "order_status"
+    if any(p in q_lower for p in ["return", "replace", "exchange"]):
+        return "return"
+    if "modify my order" in q_lower or "change my order" in q_lower:
+        return "modify_order"
+    if "payment" in q_lower and "cancel" in q_lower:
+        return "payment_cancel"
+    if "payment failed" in q_lower or "upi failed" in q_lower:
+        return "payment_failed"
+    if "charged twice" in q_lower or "double charge" in q_lower:
+        return "double_charge"
+    if "refund policy" in q_lower:
+        return "refund_policy"
+    return "rag"
+
+
+FILLER = ["my", "the", "i", "want", "to", "please", "is", "was", "it", "for", "and", "not",
+          "where", "why", "ORD123", "ORD456", "12345", "asap", "again"]
+
+
+def fuzz_queries(n, seed=0):
+    """Random queries mixing table phrases (whole and cut) with filler words."""
+    phrases = sorted({p for i in INTENTS for g in i.groups for p in g} | {p for i in INTENTS for p in i.exact})
+    vocabulary = phrases + list(ECOMMERCE_KEYWORDS) + FILLER
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        if rng.random() < 0.05:
+            # Whole-query phrases with stray whitespace / case.
+            words = [rng.choice(phrases)]
+        else:
+            words = []
+            for _ in range(rng.randint(0, 8)):
+                word = rng.choice(vocabulary)
+                if rng.random() < 0.2:
+                    cut = rng.randint(1, len(word))
+                    word = word[:cut] if rng.random() < 0.5 else word[cut - 1:]
+                words.append(word)
+        text = "".join(w + rng.choice(("", " ", " ", " ", "  ", ", ", "!", "?")) for w in words)
+        if rng.random() < 0.3:
+            text = "".join(c.upper() if rng.random() < 0.3 else c for c in text)
+        queries.append(rng.choice(("", " ", "\t")) + text)
+    return queries
+
+
+def load_queries():
+    queries = list(QUERIES)
+    with open(os.path.join(HERE, "..", "data", "sample_queries.json")) as f:
+        queries.extend(item["query"] for item in json.load(f))
+    return queries
+
+
+def time_router(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(queries)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--fuzz", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    queries = load_queries()
+    fuzzed = fuzz_queries(args.fuzz, args.seed)
+    mismatches = [q for q in queries + LONG_QUERIES if legacy_route(q) != route(q).intent]
+    fuzz_mismatches = [q for q in fuzzed if legacy_route(q) != route(q).intent]
+    for q in mismatches + fuzz_mismatches[:20]:
+        print(f"MISMATCH {q!r}: legacy={legacy_route(q)} compiled={route(q).intent}")
+
+    fuzz_intents = {}
+    for q in fuzzed:
+        intent = legacy_route(q)
+        fuzz_intents[intent] = fuzz_intents.get(intent, 0) + 1
+    report = {
+        "repeat": args.repeat,
+        "mismatches": len(mismatches),
+        "fuzz": {"queries": len(fuzzed), "seed": args.seed, "mismatches": len(fuzz_mismatches),
+                 "intents": dict(sorted(fuzz_intents.items()))},
+    }
+    for name, corpus in (("short", queries), ("long", LONG_QUERIES)):
+        legacy_us = time_router(legacy_route, corpus, args.repeat)
+        compiled_us = time_router(route, corpus, args.repeat)
+        report[name] = {
+            "queries": len(corpus),
+            "avg_chars": round(sum(map(len, corpus)) / len(corpus)),
+            "legacy_us_per_query": round(legacy_us, 2),
+            "compiled_us_per_query": round(compiled_us, 2),
+            "speedup": round(legacy_us / compiled_us, 2),
+        }
+    print(json.dumps(report, indent=2))
+    if mismatches or fuzz_mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
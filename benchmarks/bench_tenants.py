@@ -0,0 +1,229 @@
+"""
+Per-tenant index loading and LRU eviction (rag/tenants.py) with hundreds of
+synthetic tenants sharing one set of models.
+
+Usage:
+    python -m benchmarks.bench_tenants [--tenants 300] [--requests 4000]
+        [--threads 8] [--zipf 1.1] [--budgets 0.1,0.25,0.5,1.0]
+        [--workdir DIR] [--real-models] [--output report.json]
+
+Every tenant gets a knowledge base built from the built-in documents plus
+its own return window and shipping threshold, and 20-400 synthetic catalog
+passages, so index sizes vary by tenant. Each one is ingested into
+<workdir>/tenants/<tenant> with rag/ingest.py. A non-empty --workdir is
+reused. Requests pick a tenant with Zipf(--zipf) popularity, so a few
+storefronts get most of the traffic, and ask one of a few FAQ questions
+through `Runtime` with the tenant set (answer cache off).
+
+Each entry of --budgets is a share of the total index size of all tenants,
+used as TENANT_INDEX_MEMORY_MB. For each budget the report gives:
+
+    requests_per_second, p50/p95/p99_ms   end-to-end, all requests
+    cold_p50_ms, warm_p50_ms              requests that loaded an index / not
+    load_ms_mean, load_ms_p95             index load latency
+    hit_rate, loads, evictions            from TenantIndexes.stats()
+    resident, resident_mb                 at the end of the run
+
+`fact_recall` is the share of tenants whose reply to "Do you offer free
+shipping?" quotes their own shipping threshold, which checks that requests
+reach their tenant's index. Every index is opened once before the timed
+runs (to measure its size), so loads read from the page cache. With the
+stub models (the default) generation is instant, so latencies are
+retrieval and loading.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.load_test import percentile
+
+# All routed to RAG; the first one is answered by the tenant's own policy.
+QUESTIONS = [
+    "Do you offer free shipping?",
+    "Which payment methods do you accept?",
+    "How do I use a discount code?",
+    "How long does delivery take?",
+    "Can I cancel my order?",
+]
+
+WORDS = (
+    "cotton linen wool denim leather canvas organic classic slim relaxed waterproof "
+    "lightweight padded vintage striped woven knit recycled premium everyday"
+).split()
+
+
+def tenant_records(tenant: str, rng: random.Random):
+    """(section, text) passages of one synthetic storefront."""
+    from data.knowledge_base import load_documents
+
+    name = tenant.replace("-", " ").title()
+    days = rng.choice(range(7, 91))
+    threshold = rng.choice(range(10, 200, 5))
+    records = [("Policies", text) for text in load_documents()]
+    records.append(("Returns", f"At {name}, items can be returned within {days} days of delivery "
+                               "for a full refund to the original payment method."))
+    records.append(("Shipping", f"{name} offers free standard shipping on orders over ${threshold}."))
+    for i in range(rng.randint(20, 400)):
+        words = " ".join(rng.choice(WORDS) for _ in range(12))
+        records.append(("Catalog", f"{name} item {i}: {words}. Sizes XS to XXL, ships in "
+                                   f"{rng.randint(1, 5)} business days."))
+    return records, threshold
+
+
+def build_tenants(workdir: str, n: int, embeddings, seed: int = 0):
+    """Ingest n synthetic tenants; returns ({tenant: shipping threshold}, seconds)."""
+    from rag.ingest import index_meta, ingest
+
+    rng = random.Random(seed)
+    source_root = os.path.join(workdir, "sources")
+    tenants_dir = os.path.join(workdir, "tenants")
+    facts = {}
+    start = time.perf_counter()
+    for i in range(n):
+        tenant = f"store-{i:04d}"
+        records, threshold = tenant_records(tenant, rng)
+        facts[tenant] = threshold
+        index_dir = os.path.join(tenants_dir, tenant)
+        if index_meta(index_dir):
+            continue
+        source_dir = os.path.join(source_root, tenant)
+        os.makedirs(source_dir, exist_ok=True)
+        with open(os.path.join(source_dir, "kb.jsonl"), "w") as f:
+            for section, text in records:
+                f.write(json.dumps({"section": section, "text": text}) + "\n")
+        ingest(source_dir, index_dir, embeddings)
+    return facts, time.perf_counter() - start
+
+
+def zipf_tenants(tenants, n, s, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(tenants) + 1) ** s
+    order = rng.permutation(len(tenants))  # popularity unrelated to index size
+    picks = rng.choice(len(tenants), size=n, p=weights / weights.sum())
+    return [tenants[order[i]] for i in picks]
+
+
+def run(runtime, tenant_indexes, picks, threads):
+    from backend.metrics import trace_request
+
+    latencies, cold, warm = [], [], []
+
+    def request(i_tenant):
+        i, tenant = i_tenant
+        loads = tenant_indexes.loads
+        start = time.perf_counter()
+        with trace_request("bench"):
+            runtime(QUESTIONS[i % len(QUESTIONS)], tenant=tenant)
+        ms = (time.perf_counter() - start) * 1000.0
+        return ms, tenant_indexes.loads != loads
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for ms, loaded in pool.map(request, enumerate(picks)):
+            latencies.append(ms)
+            (cold if loaded else warm).append(ms)
+    elapsed = time.perf_counter() - start
+    for values in (latencies, cold, warm):
+        values.sort()
+
+    load_ms = sorted(
+        s["mean_load_ms"] for s in tenant_indexes.tenant_stats().values() if s["mean_load_ms"] is not None
+    )
+    stats = tenant_indexes.stats()
+    return {
+        "requests_per_second": round(len(picks) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "cold_p50_ms": round(percentile(cold, 50), 2) if cold else None,
+        "warm_p50_ms": round(percentile(warm, 50), 2) if warm else None,
+        "load_ms_mean": round(sum(load_ms) / len(load_ms), 2) if load_ms else None,
+        "load_ms_p95": round(percentile(load_ms, 95), 2) if load_ms else None,
+        "hit_rate": stats["hit_rate"],
+        "loads": stats["loads"],
+        "evictions": stats["evictions"],
+        "resident": stats["resident"],
+        "resident_mb": stats["resident_mb"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lazily loaded, LRU-evicted tenant indexes.")
+    parser.add_argument("--tenants", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--budgets", default="0.1,0.25,0.5,1.0")
+    parser.add_argument("--workdir")
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="tenants-")
+    os.environ["ANSWER_CACHE_ENABLED"] = "0"
+    os.environ["TENANTS_DIR"] = os.path.join(workdir, "tenants")
+    if not args.real_models:
+        os.environ["LLM_BACKEND"] = "stub"
+        os.environ["EMBEDDING_BACKEND"] = "stub"
+        os.environ.setdefault("VECTORSTORE_DIR", os.path.join(workdir, "faiss_index"))
+
+    from backend.runtime import Runtime
+    from rag.tenants import TenantIndexes, index_bytes
+
+    runtime = Runtime()
+    runtime.start(background=False)
+    if not runtime.ready:
+        raise SystemExit("model loading failed")
+
+    facts, build_seconds = build_tenants(workdir, args.tenants, runtime.embeddings)
+    tenants = sorted(facts)
+
+    # Size of every index, loaded once outside the timed runs.
+    sizes = {}
+    probe = TenantIndexes(runtime._load_tenant, memory_budget_mb=0)
+    runtime.tenants = probe
+    recalled = 0
+    for tenant in tenants:
+        sizes[tenant] = index_bytes(probe.get(tenant))
+        recalled += f"orders over ${facts[tenant]}." in runtime(QUESTIONS[0], tenant=tenant)
+    total_mb = sum(sizes.values()) / 1024 / 1024
+
+    picks = zipf_tenants(tenants, args.requests, args.zipf)
+    runs = []
+    for share in (float(b) for b in args.budgets.split(",")):
+        runtime.tenants = TenantIndexes(runtime._load_tenant, memory_budget_mb=total_mb * share)
+        runs.append({"budget_share": share, "budget_mb": round(total_mb * share, 3),
+                     **run(runtime, runtime.tenants, picks, args.threads)})
+
+    mb = sorted(b / 1024 / 1024 for b in sizes.values())
+    report = {
+        "config": {
+            "tenants": len(tenants),
+            "requests": args.requests,
+            "threads": args.threads,
+            "zipf": args.zipf,
+            "distinct_tenants_requested": len(set(picks)),
+            "stub_models": not args.real_models,
+            "ingest_seconds": round(build_seconds, 2),
+            "index_mb_total": round(total_mb, 3),
+            "index_mb_p50": round(percentile(mb, 50), 4),
+            "index_mb_max": round(mb[-1], 4),
+        },
+        "fact_recall": round(recalled / len(tenants), 4),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Throughput and memory of pre-fork serving (backend/prefork.py) by worker count.
+
+Usage:
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--requests 2000]
+        [--concurrency 32] [--llm-latency-ms 50] [--real-models] [--output report.json]
+
+For each worker count the server is started on a free port, loaded with
+benchmarks/load_test.py over HTTP, and then measured from /proc/<pid>/smaps_rollup
+(Linux) for the parent and every worker:
+
+    rss_mb          resident memory, shared pages counted in full
+    pss_mb          proportional share: shared pages split between processes
+    private_mb      pages only this process maps (copied on write or allocated
+                    after fork); this is what one more worker costs
+
+`unshared_estimate_mb` is workers x the parent's RSS: the memory the same
+number of independently started processes would need.
+
+Runs with the stub models unless --real-models is given.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def memory_mb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+    private = fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0)
+    return {
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "private_mb": round(private, 1),
+    }
+
+
+def child_pids(parent: int):
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == parent:
+            pids.append(int(name))
+    return sorted(pids)
+
+
+def wait_ready(url: str, server, timeout: float = 600.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            with urllib.request.urlopen(url + "/readyz?full=1", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def run(workers: int, args, env) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "backend.prefork", "--workers", str(workers), "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(url, server)
+        with tempfile.NamedTemporaryFile(suffix=".json") as out:
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.load_test", "--url", url,
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                 "--output", out.name],
+                env=env, check=True, stdout=subprocess.DEVNULL,
+            )
+            load = json.load(open(out.name))
+
+        parent = memory_mb(server.pid)
+        children = [memory_mb(pid) for pid in child_pids(server.pid)]
+        return {
+            "workers": workers,
+            "throughput_rps": load["overall"]["throughput_rps"],
+            "p50_ms": load["overall"]["p50_ms"],
+            "p95_ms": load["overall"]["p95_ms"],
+            "errors": load["errors"],
+            "parent": parent,
+            "worker_private_mb_avg": round(sum(c["private_mb"] for c in children) / len(children), 1),
+            "worker_rss_mb_avg": round(sum(c["rss_mb"] for c in children) / len(children), 1),
+            "total_pss_mb": round(parent["pss_mb"] + sum(c["pss_mb"] for c in children), 1),
+            "unshared_estimate_mb": round(workers * parent["rss_mb"], 1),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pre-fork serving by worker count.")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.real_models:
+        env.setdefault("LLM_BACKEND", "stub")
+        env.setdefault("EMBEDDING_BACKEND", "stub")
+        env.setdefault("VECTORSTORE_DIR", os.path.join(tempfile.mkdtemp(), "faiss_index"))
+        env["STUB_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+
+    report = {
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "stub_models": not args.real_models},
+        "runs": [run(int(n), args, env) for n in args.workers.split(",")],
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Offline recall@k / latency evaluation of dense, BM25 and hybrid retrieval.
+
+Usage:
+    python -m benchmarks.eval_retrieval [--queries data/retrieval_eval.jsonl]
+        [--k 1,3,5] [--stub-embeddings] [--output report.json]
+
+Each line of the query set is {"query": ..., "relevant": [...]}, where every
+"relevant" entry is a phrase that appears in exactly the knowledge-base
+passage(s) that answer the query. For each mode the report gives recall@k
+(share of relevant passages found in the top k), MRR, search latency
+percentiles (the query embedding is computed once, outside the timing). For
+the retriever as configured (HYBRID_RETRIEVAL, RETRIEVER_K,
+RETRIEVER_MIN_SCORE_RATIO) it gives recall and the number of passages and
+context characters that would reach the LLM.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.load_test import percentile
+
+
+def load_queries(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency.")
+    parser.add_argument("--queries", default="data/retrieval_eval.jsonl")
+    parser.add_argument("--k", default="1,3,5")
+    parser.add_argument("--stub-embeddings", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if args.stub_embeddings:
+        os.environ["EMBEDDING_BACKEND"] = "stub"
+        os.environ.setdefault("VECTORSTORE_DIR", os.path.join(tempfile.mkdtemp(), "faiss_index"))
+
+    from config.settings import HYBRID_RETRIEVAL
+    from rag.hybrid import HybridRetriever
+    from rag.vectorstore import load_vectorstore
+
+    ks = [int(k) for k in args.k.split(",")]
+    queries = load_queries(args.queries)
+    vectorstore = load_vectorstore()
+    fetch_k = max(ks + [20])
+
+    configured = HybridRetriever(
+        vectorstore=vectorstore, lexical=vectorstore.lexical_index if HYBRID_RETRIEVAL else None
+    )
+    probe = HybridRetriever(vectorstore=vectorstore, lexical=vectorstore.lexical_index,
+                            k=max(ks), fetch_k=fetch_k, min_score_ratio=0.0)
+    modes = {
+        "dense": lambda q, v: probe.dense_ids(v),
+        "bm25": lambda q, v: probe.lexical_ids(q),
+        "hybrid": probe.ranked_ids,
+    }
+
+    vectors = [vectorstore.embeddings.embed_query(q["query"]) for q in queries]
+    report = {"queries": len(queries), "embeddings": os.environ.get("EMBEDDING_BACKEND", "hf"), "modes": {}}
+
+    for mode, search in modes.items():
+        recall = {k: 0.0 for k in ks}
+        reciprocal_ranks, latencies, misses = [], [], []
+        for query, vector in zip(queries, vectors):
+            start = time.perf_counter()
+            ids = search(query["query"], vector)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+            texts = [d.page_content for d in probe.documents(ids[:max(ks)])]
+            relevant = query["relevant"]
+            ranks = [
+                next((r for r, text in enumerate(texts, 1) if phrase in text), None)
+                for phrase in relevant
+            ]
+            for k in ks:
+                recall[k] += sum(1 for r in ranks if r is not None and r <= k) / len(relevant)
+            found = [r for r in ranks if r is not None]
+            reciprocal_ranks.append(1.0 / min(found) if found else 0.0)
+            if not found or min(found) > max(ks):
+                misses.append(query["query"])
+
+        values = sorted(latencies)
+        report["modes"][mode] = {
+            **{f"recall@{k}": round(recall[k] / len(queries), 3) for k in ks},
+            "mrr": round(sum(reciprocal_ranks) / len(queries), 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "misses": misses,
+        }
+
+    contexts = [configured.search_by_vector(q["query"], v) for q, v in zip(queries, vectors)]
+    report["configured"] = {
+        "k": configured.k,
+        "min_score_ratio": configured.min_score_ratio,
+        "hybrid": configured.lexical is not None,
+        "recall": round(sum(
+            sum(any(phrase in d.page_content for d in c) for phrase in q["relevant"]) / len(q["relevant"])
+            for q, c in zip(queries, contexts)
+        ) / len(queries), 3),
+        "avg_passages": round(sum(len(c) for c in contexts) / len(queries), 2),
+        "avg_context_chars": round(sum(sum(len(d.page_content) for d in c) for c in contexts) / len(queries), 1),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Offline evaluation of routing, retrieval and answers, with run-to-run diffs.
+
+Usage:
+    python -m benchmarks.eval_suite [--dataset data/eval_suite.jsonl] [--k 1,3,5]
+        [--stub | --offline] [--skip-answers] [--routing-scale 10000]
+        [--output run.json] [--baseline previous.json] [--max-drop 0.01]
+
+    # diff two saved runs without evaluating
+    python -m benchmarks.eval_suite --diff previous.json run.json
+
+Each dataset line is
+    {"id", "query", "intent", "order_id", "relevant"?: [...], "reference"?: "..."}
+with the intent the router should pick, the order id `extract_order_id`
+should find (null for none), phrases that occur only in the knowledge-base
+passages answering the query, and a reference answer.
+
+    routing    intent accuracy, per-intent precision / recall and order-id
+               accuracy; also the time to route --routing-scale queries
+               (the dataset repeated), which takes well under a second.
+    retrieval  recall@k and MRR of the retriever as configured (hybrid or
+               dense), with all queries embedded in one batch and searched
+               in one FAISS call.
+    answers    every query with a reference is answered as in production
+               (routed first, RAG in batches); answers and references are
+               embedded in two batches and compared by cosine similarity in
+               numpy.
+
+--stub uses the deterministic stub models (no download, runs anywhere);
+--offline uses the configured models from the local Hugging Face cache
+without network access. With --baseline (or --diff) the report lists metric
+deltas and the queries whose routing, retrieval or answer changed, and the
+command exits with status 1 when a metric dropped by more than --max-drop.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Per-query answer similarity drop reported in a diff.
+SIMILARITY_DIFF = 0.1
+
+
+def load_dataset(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate_routing(records, scale):
+    from agents.agent_router import extract_order_id, route_query
+
+    expected = np.array([r["intent"] for r in records])
+    predicted = np.array([route_query(r["query"]).intent for r in records])
+    order_ok = np.array([extract_order_id(r["query"]) == r.get("order_id") for r in records])
+    intent_ok = predicted == expected
+
+    per_intent = {}
+    for intent in np.union1d(expected, predicted):
+        true_positive = np.sum(intent_ok & (expected == intent))
+        labeled, picked = np.sum(expected == intent), np.sum(predicted == intent)
+        per_intent[str(intent)] = {
+            "support": int(labeled),
+            "precision": round(float(true_positive / picked), 3) if picked else 0.0,
+            "recall": round(float(true_positive / labeled), 3) if labeled else 0.0,
+        }
+
+    queries = [r["query"] for r in records] * (scale // len(records) + 1)
+    queries = queries[:scale]
+    start = time.perf_counter()
+    for query in queries:
+        route_query(query)
+        extract_order_id(query)
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "queries": len(records),
+        "intent_accuracy": round(float(intent_ok.mean()), 4),
+        "order_id_accuracy": round(float(order_ok.mean()), 4),
+        "scale_queries": len(queries),
+        "scale_seconds": round(elapsed, 4),
+        "per_intent": per_intent,
+    }
+    per_query = {
+        r["id"]: {"intent": str(p), "intent_ok": bool(ok), "order_ok": bool(o)}
+        for r, p, ok, o in zip(records, predicted, intent_ok, order_ok)
+    }
+    return summary, per_query
+
+
+def evaluate_retrieval(records, vectorstore, ks):
+    from config.settings import HYBRID_RETRIEVAL
+    from rag.hybrid import HybridRetriever
+
+    records = [r for r in records if r.get("relevant")]
+    if not records:
+        return {}, {}
+    retriever = HybridRetriever(
+        vectorstore=vectorstore,
+        lexical=getattr(vectorstore, "lexical_index", None) if HYBRID_RETRIEVAL else None,
+        k=max(ks),
+        min_score_ratio=0.0,
+    )
+    queries = [r["query"] for r in records]
+    start = time.perf_counter()
+    vectors = np.asarray(vectorstore.embeddings.embed_documents(queries), dtype=np.float32)
+    dense = retriever.dense_ids_batch(vectors)
+    ranked = [retriever.ranked_ids(q, v, d) for q, v, d in zip(queries, vectors, dense)]
+    elapsed = time.perf_counter() - start
+
+    # hits[i, j, r]: passage at rank r of query i contains relevant phrase j.
+    width = max(len(r["relevant"]) for r in records)
+    hits = np.zeros((len(records), width, max(ks)), dtype=bool)
+    mask = np.zeros((len(records), width), dtype=bool)
+    for i, (record, ids) in enumerate(zip(records, ranked)):
+        texts = [d.page_content for d in retriever.documents(ids)]
+        for j, phrase in enumerate(record["relevant"]):
+            mask[i, j] = True
+            hits[i, j, :len(texts)] = [phrase in text for text in texts]
+
+    found_by = np.cumsum(hits, axis=2) > 0  # phrase found within the top r + 1
+    recall = {k: (found_by[:, :, k - 1] & mask).sum(axis=1) / mask.sum(axis=1) for k in ks}
+    any_hit = hits.any(axis=1)
+    first = np.where(any_hit.any(axis=1), any_hit.argmax(axis=1) + 1, 0)
+    reciprocal = np.where(first > 0, 1.0 / np.maximum(first, 1), 0.0)
+
+    summary = {
+        "queries": len(records),
+        "hybrid": retriever.lexical is not None,
+        **{f"recall@{k}": round(float(recall[k].mean()), 4) for k in ks},
+        "mrr": round(float(reciprocal.mean()), 4),
+        "seconds": round(elapsed, 4),
+    }
+    per_query = {
+        r["id"]: {**{f"recall@{k}": round(float(recall[k][i]), 3) for k in ks}, "rank": int(first[i])}
+        for i, r in enumerate(records)
+    }
+    return summary, per_query
+
+
+def cosine_rows(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return np.einsum("ij,ij->i", a, b) / np.maximum(norms, 1e-12)
+
+
+def evaluate_answers(records, llm, vectorstore):
+    from agents.agent_router import create_agent
+    from agents.memory import SessionStore
+    from backend.batch import triage
+
+    records = [r for r in records if r.get("reference")]
+    if not records:
+        return {}, {}
+    agent = create_agent(llm, vectorstore, sessions=SessionStore())
+    start = time.perf_counter()
+    answers = {
+        result["id"]: result["response"] or ""
+        for result, _ in triage(agent, [(r["id"], r["query"]) for r in records])
+    }
+    generated = [answers[r["id"]] for r in records]
+    elapsed = time.perf_counter() - start
+
+    embed = vectorstore.embeddings.embed_documents
+    similarity = cosine_rows(embed(generated), embed([r["reference"] for r in records]))
+    summary = {
+        "queries": len(records),
+        "similarity_mean": round(float(similarity.mean()), 4),
+        "similarity_p10": round(float(np.percentile(similarity, 10)), 4),
+        "similarity_min": round(float(similarity.min()), 4),
+        "seconds": round(elapsed, 3),
+    }
+    per_query = {
+        r["id"]: {"similarity": round(float(s), 4), "answer": a}
+        for r, s, a in zip(records, similarity, generated)
+    }
+    return summary, per_query
+
+
+# -- diff -------------------------------------------------------------------
+
+GATED_METRICS = (
+    ("routing", "intent_accuracy"),
+    ("routing", "order_id_accuracy"),
+    ("retrieval", "mrr"),
+    ("answers", "similarity_mean"),
+)
+
+
+def diff_runs(old, new, max_drop):
+    metrics, regressions = {}, []
+    for section in ("routing", "retrieval", "answers"):
+        for key, value in new["summary"].get(section, {}).items():
+            before = old["summary"].get(section, {}).get(key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            metrics[f"{section}.{key}"] = {"old": before, "new": value, "delta": round(value - before, 4)}
+            gated = (section, key) in GATED_METRICS or key.startswith("recall@")
+            if gated and before - value > max_drop:
+                regressions.append(f"{section}.{key}: {before} -> {value}")
+
+    changes = {"routing_fixed": [], "routing_broken": [], "retrieval_worse": [], "retrieval_better": [], "answers_worse": []}
+    old_q, new_q = old["queries"], new["queries"]
+    for qid, now in new_q.items():
+        was = old_q.get(qid)
+        if was is None:
+            continue
+        entry = {"id": qid, "query": now.get("query")}
+        if "intent_ok" in now and "intent_ok" in was and now["intent_ok"] != was["intent_ok"]:
+            changes["routing_fixed" if now["intent_ok"] else "routing_broken"].append(
+                {**entry, "old": was["intent"], "new": now["intent"]}
+            )
+        if "rank" in now and "rank" in was and now["rank"] != was["rank"]:
+            better = now["rank"] and (not was["rank"] or now["rank"] < was["rank"])
+            changes["retrieval_better" if better else "retrieval_worse"].append(
+                {**entry, "old_rank": was["rank"], "new_rank": now["rank"]}
+            )
+        if "similarity" in now and "similarity" in was and was["similarity"] - now["similarity"] > SIMILARITY_DIFF:
+            changes["answers_worse"].append(
+                {**entry, "old": was["similarity"], "new": now["similarity"], "answer": now.get("answer")}
+            )
+    return {"metrics": metrics, "changes": changes, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline routing / retrieval / answer evaluation.")
+    parser.add_argument("--dataset", default="data/eval_suite.jsonl")
+    parser.add_argument("--k", default="1,3,5")
+    parser.add_argument("--stub", action="store_true", help="use the stub LLM and embeddings")
+    parser.add_argument("--offline", action="store_true", help="load models from the local HF cache only")
+    parser.add_argument("--skip-answers", action="store_true")
+    parser.add_argument("--routing-scale", type=int, default=10000)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--max-drop", type=float, default=0.01)
+    args = parser.parse_args()
+
+    if args.diff:
+        old, new = (json.load(open(path)) for path in args.diff)
+        diff = diff_runs(old, new, args.max_drop)
+        print(json.dumps(diff, indent=2, ensure_ascii=False))
+        sys.exit(1 if diff["regressions"] else 0)
+
+    if args.stub:
+        os.environ["LLM_BACKEND"] = "stub"
+        os.environ["EMBEDDING_BACKEND"] = "stub"
+        os.environ.setdefault("VECTORSTORE_DIR", os.path.join(tempfile.mkdtemp(), "faiss_index"))
+    if args.offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+    from rag.embeddings import load_embeddings
+    from rag.vectorstore import load_vectorstore
+
+    ks = [int(k) for k in args.k.split(",")]
+    records = load_dataset(args.dataset)
+    report = {
+        "dataset": args.dataset,
+        "models": "stub" if args.stub else "configured",
+        "summary": {},
+        "queries": {r["id"]: {"query": r["query"]} for r in records},
+    }
+
+    def merge(section, result):
+        summary, per_query = result
+        report["summary"][section] = summary
+        for qid, values in per_query.items():
+            report["queries"][qid].update(values)
+
+    merge("routing", evaluate_routing(records, args.routing_scale))
+    vectorstore = load_vectorstore(load_embeddings())
+    merge("retrieval", evaluate_retrieval(records, vectorstore, ks))
+    if not args.skip_answers:
+        from llm.llm_loader import load_llm
+        merge("answers", evaluate_answers(records, load_llm(), vectorstore))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["diff"] = diff_runs(json.load(f), report, args.max_drop)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(json.dumps(
+        {"summary": report["summary"], **({"diff": report["diff"]} if "diff" in report else {})},
+        indent=2, ensure_ascii=False,
+    ))
+    if report.get("diff", {}).get("regressions"):
+        for line in report["diff"]["regressions"]:
+            print("REGRESSION " + line, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
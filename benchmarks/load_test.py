@@ -0,0 +1,223 @@
+"""
+Load test / latency benchmark for the chat service.
+
+Usage:
+    # in-process through the Flask test client, deterministic stub models
+    python -m benchmarks.load_test --requests 2000 --concurrency 16
+
+    # against a running server
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --concurrency 32
+
+    # fail (exit 1) when p95 of any path regressed by more than 20%
+    python -m benchmarks.load_test --output new.json --baseline old.json
+
+Queries are drawn from a weighted mix of categories (greetings, tracking,
+returns, payments, RAG FAQs). Every request is tagged with the intent the
+router resolves for it and with the path that answers it (rule / tool /
+rag); latency percentiles and throughput are reported per path and per
+category as JSON.
+
+In-process runs default to LLM_BACKEND=stub and EMBEDDING_BACKEND=stub, so
+results are reproducible on a CPU-only box; pass --real-models to load the
+configured models instead, or --llm-latency-ms to simulate generation cost.
+Set ANSWER_CACHE_ENABLED=0 to measure uncached RAG latency.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+QUERY_MIX = {
+    "greeting": (0.15, ["Hi", "Hello", "thanks for the help", "Help"]),
+    "tracking": (0.30, [
+        "Where is my order ORD123?", "Track my order ORD456",
+        "Order status for ORD789", "where is my order ORD999?",
+    ]),
+    "returns": (0.15, [
+        "I want to return order ORD789", "Can I exchange my order ORD456?",
+        "I want to return my order",
+    ]),
+    "payment": (0.15, [
+        "My payment failed", "I was charged twice for my order",
+        "payment deducted, please cancel my order", "Tell me about your refund policy",
+    ]),
+    "rag": (0.25, [
+        "How long does standard delivery take?", "Do you offer express delivery?",
+        "How can I find products in a category?", "Can I pay using UPI or a wallet?",
+        "What happens when a product is out of stock?", "Are there shipping charges on my order?",
+    ]),
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def build_plan(n, seed):
+    rng = random.Random(seed)
+    categories = list(QUERY_MIX)
+    weights = [QUERY_MIX[c][0] for c in categories]
+    plan = []
+    for _ in range(n):
+        category = rng.choices(categories, weights)[0]
+        plan.append((category, rng.choice(QUERY_MIX[category][1])))
+    return plan
+
+
+def in_process_client(args):
+    if not args.real_models:
+        os.environ.setdefault("LLM_BACKEND", "stub")
+        os.environ.setdefault("EMBEDDING_BACKEND", "stub")
+        os.environ.setdefault("VECTORSTORE_DIR", os.path.join(tempfile.mkdtemp(), "faiss_index"))
+    if args.llm_latency_ms is not None:
+        os.environ["STUB_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ.setdefault("LAZY_STARTUP", "0")
+
+    from backend.app import app
+
+    client = app.test_client()
+    lock = threading.Lock() if args.serialize else None
+
+    def send(query):
+        if lock:
+            with lock:
+                response = client.post("/chat", json={"query": query})
+        else:
+            response = client.post("/chat", json={"query": query})
+        return response.status_code
+
+    return send
+
+
+def http_client(args):
+    import requests
+
+    local = threading.local()
+    url = args.url.rstrip("/") + "/chat"
+
+    def send(query):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return session.post(url, json={"query": query}, timeout=args.timeout).status_code
+
+    return send
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for kind, stats in report["by_kind"].items():
+        old = baseline.get("by_kind", {}).get(kind)
+        if not old or not old.get("p95_ms"):
+            continue
+        if stats["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{kind}: p95 {old['p95_ms']}ms -> {stats['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat service.")
+    parser.add_argument("--url", help="HTTP base URL; default is in-process")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--llm-latency-ms", type=float)
+    parser.add_argument("--serialize", action="store_true", help="one in-process request at a time")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    send = http_client(args) if args.url else in_process_client(args)
+
+    # Imported after the environment is set up for in-process runs.
+    from agents.agent_router import intent_kind, route_query
+
+    plan = build_plan(args.requests, args.seed)
+    for _, query in build_plan(args.warmup, args.seed + 1):
+        send(query)
+
+    results = []
+    results_lock = threading.Lock()
+
+    def run(item):
+        category, query = item
+        intent = route_query(query).intent
+        start = time.perf_counter()
+        try:
+            status = send(query)
+        except Exception:
+            status = -1
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        with results_lock:
+            results.append((category, intent, intent_kind(intent), latency_ms, status))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(run, plan))
+    elapsed = time.perf_counter() - start
+
+    def group(index):
+        groups = {}
+        for r in results:
+            groups.setdefault(r[index], []).append(r[3])
+        return {name: summarize(values, elapsed) for name, values in sorted(groups.items())}
+
+    report = {
+        "config": {
+            "target": args.url or "in-process",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "stub_models": not args.url and not args.real_models,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "errors": sum(1 for r in results if r[4] != 200),
+        "overall": summarize([r[3] for r in results], elapsed),
+        "by_kind": group(2),
+        "by_intent": group(1),
+        "by_category": group(0),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
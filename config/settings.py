@@ -1,6 +1,168 @@
 # config/settings.py
+import os
 
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 LLM_MODEL = "google/flan-t5-base"
 
 VECTOR_DB = "FAISS"  # Switch to PINECONE on AWS
+
+# On-disk FAISS index artifacts, one sub-directory per knowledge-base hash.
+VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", "artifacts/faiss_index")
+
+# Retrieval (see rag/hybrid.py): the top RETRIEVER_FETCH_K FAISS and BM25
+# hits are fused with reciprocal rank fusion; up to RETRIEVER_K are kept,
+# dropping those scoring below RETRIEVER_MIN_SCORE_RATIO x the best hit.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "5"))
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+RETRIEVER_MIN_SCORE_RATIO = float(os.getenv("RETRIEVER_MIN_SCORE_RATIO", "0"))
+
+# Prompt budget (see rag/context_budget.py): flan-t5 reads at most 512 input
+# tokens, so retrieved passages and chat history are packed to fit.
+LLM_MAX_INPUT_TOKENS = int(os.getenv("LLM_MAX_INPUT_TOKENS", "512"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "256"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.6"))
+
+# Follow-up questions (see rag/followup.py): "blend" retrieves with the
+# recent user turns (no extra generation, one LLM call per request); "llm"
+# first rewrites the follow-up into a standalone question with the LLM.
+RAG_FOLLOWUP_MODE = os.getenv("RAG_FOLLOWUP_MODE", "blend")
+RAG_FOLLOWUP_TURNS = int(os.getenv("RAG_FOLLOWUP_TURNS", "2"))
+RAG_FOLLOWUP_DECAY = float(os.getenv("RAG_FOLLOWUP_DECAY", "0.5"))
+
+# Answer mode (see rag/extractive.py): "generate" answers every RAG request
+# with the LLM; "extractive" replies with the knowledge-base sentences most
+# similar to the question (up to EXTRACTIVE_MAX_SENTENCES) when the best one
+# reaches EXTRACTIVE_THRESHOLD cosine similarity, and generates otherwise.
+ANSWER_MODE = os.getenv("ANSWER_MODE", "generate")
+EXTRACTIVE_THRESHOLD = float(os.getenv("EXTRACTIVE_THRESHOLD", "0.6"))
+EXTRACTIVE_MAX_SENTENCES = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", "2"))
+
+# Embedding cache (see rag/embedding_cache.py): query vectors are memoized in
+# an LRU and concurrent misses are embedded in one batch; document vectors
+# are persisted under EMBEDDING_CACHE_DIR when it is set.
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "0"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "")
+
+# Per-session chat memory (see agents/memory.py).
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "memory")  # "memory" or "sqlite"
+MEMORY_SQLITE_PATH = os.getenv("MEMORY_SQLITE_PATH", "artifacts/sessions.db")
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "10000"))
+MEMORY_TTL_SECONDS = float(os.getenv("MEMORY_TTL_SECONDS", "1800"))
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "4"))
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "256"))
+
+# Semantic answer cache in front of the RAG chain (see rag/answer_cache.py).
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+
+# Response cache for rule / tool replies (see backend/response_cache.py).
+# TTLs are per intent; "default" covers the canned and policy replies.
+# Order-status replies are also invalidated when the order is written.
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTLS = {
+    "default": float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    "order_status": float(os.getenv("ORDER_STATUS_CACHE_TTL_SECONDS", "60")),
+    "return": 0.0,  # creates a return request; never cached
+}
+
+# Micro-batching of concurrent LLM requests (see llm/batching.py).
+LLM_BATCHING = os.getenv("LLM_BATCHING", "1") == "1"
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "8"))
+LLM_MAX_WAIT_MS = float(os.getenv("LLM_MAX_WAIT_MS", "20"))
+
+# Generation settings for streamed replies (/chat/stream). Token streaming
+# cannot be combined with beam search, so streamed answers decode greedily.
+LLM_STREAM_KWARGS = {
+    "max_new_tokens": 256,
+    "min_length": 20,
+    "repetition_penalty": 1.1,
+    "no_repeat_ngram_size": 3,
+}
+STREAM_WORKERS = int(os.getenv("STREAM_WORKERS", "4"))
+
+# Admission control for the RAG path (see backend/admission.py): requests
+# generating at once, requests allowed to wait, and the default (and
+# maximum) deadline of a /chat request. Shed or late requests get the top
+# knowledge-base passage verbatim instead of a generated answer.
+RAG_MAX_CONCURRENT = int(os.getenv("RAG_MAX_CONCURRENT", "8"))
+RAG_MAX_QUEUE = int(os.getenv("RAG_MAX_QUEUE", "16"))
+# The same limits for the steps before generation (query embedding, answer
+# cache lookup, retrieval, extractive scoring), which now often answer on
+# their own.
+RAG_RETRIEVAL_MAX_CONCURRENT = int(os.getenv("RAG_RETRIEVAL_MAX_CONCURRENT", "16"))
+RAG_RETRIEVAL_MAX_QUEUE = int(os.getenv("RAG_RETRIEVAL_MAX_QUEUE", "64"))
+CHAT_DEADLINE_MS = float(os.getenv("CHAT_DEADLINE_MS", "15000"))
+
+# Batch triage (see backend/batch.py): RAG-bound queries per LLM call and
+# number of batches generated concurrently.
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "16"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+# How long a batch's retrievals and its LLM call may wait for admission
+# before its queries get the degraded reply.
+BATCH_DEADLINE_MS = float(os.getenv("BATCH_DEADLINE_MS", "60000"))
+
+# Staged startup (see backend/runtime.py): serve rule / tool intents at once
+# and load the models in a background thread.
+LAZY_STARTUP = os.getenv("LAZY_STARTUP", "1") == "1"
+WARMUP_WAIT_SECONDS = float(os.getenv("WARMUP_WAIT_SECONDS", "5"))
+
+# Order / return storage (see backend/order_store.py).
+ORDER_STORE = os.getenv("ORDER_STORE", "memory")  # "memory", "sqlite" or "http"
+ORDER_DB_PATH = os.getenv("ORDER_DB_PATH", "artifacts/orders.db")
+ORDER_DB_POOL_SIZE = int(os.getenv("ORDER_DB_POOL_SIZE", "8"))
+
+# Order-management service (ORDER_STORE=http, see backend/order_service.py):
+# pooled keep-alive connections, a timeout per attempt, retries with
+# exponential backoff, a circuit breaker that fails fast after consecutive
+# failures, and a short read cache in front of coalesced order lookups.
+ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://127.0.0.1:8081")
+ORDER_SERVICE_POOL_SIZE = int(os.getenv("ORDER_SERVICE_POOL_SIZE", "16"))
+ORDER_SERVICE_TIMEOUT_MS = float(os.getenv("ORDER_SERVICE_TIMEOUT_MS", "800"))
+ORDER_SERVICE_RETRIES = int(os.getenv("ORDER_SERVICE_RETRIES", "2"))
+ORDER_SERVICE_BACKOFF_MS = float(os.getenv("ORDER_SERVICE_BACKOFF_MS", "50"))
+ORDER_SERVICE_BREAKER_FAILURES = int(os.getenv("ORDER_SERVICE_BREAKER_FAILURES", "5"))
+ORDER_SERVICE_BREAKER_RESET_SECONDS = float(os.getenv("ORDER_SERVICE_BREAKER_RESET_SECONDS", "10"))
+ORDER_SERVICE_CACHE_TTL_SECONDS = float(os.getenv("ORDER_SERVICE_CACHE_TTL_SECONDS", "5"))
+ORDER_SERVICE_CACHE_SIZE = int(os.getenv("ORDER_SERVICE_CACHE_SIZE", "10000"))
+MAX_MEMORY_RETURNS = int(os.getenv("MAX_MEMORY_RETURNS", "10000"))
+
+# Model backends: "hf" loads the Hugging Face models above, "stub" uses the
+# deterministic stand-ins in llm/stub.py and rag/embeddings.py (benchmarks,
+# offline evaluation).
+LLM_BACKEND = os.getenv("LLM_BACKEND", "hf")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hf")
+STUB_LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "0"))
+STUB_LLM_TOKEN_LATENCY_MS = float(os.getenv("STUB_LLM_TOKEN_LATENCY_MS", "0"))
+
+# Runtime for the Hugging Face LLM (see llm/llm_loader.py): "torch" (fp32),
+# "int8" (dynamically quantized PyTorch) or "onnx" (ONNX Runtime with KV
+# cache, exported to LLM_ONNX_DIR on first use).
+LLM_RUNTIME = os.getenv("LLM_RUNTIME", "torch")
+LLM_ONNX_DIR = os.getenv("LLM_ONNX_DIR", "artifacts/onnx")
+
+# Request tracing (see backend/metrics.py): log requests slower than this
+# many milliseconds with their per-stage breakdown; 0 disables the log.
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+# Knowledge-base ingestion (see rag/ingest.py). When KB_SOURCE_DIR is set, the
+# retriever uses the index ingested from that directory into KB_INDEX_DIR
+# instead of the built-in documents in data/knowledge_base.py.
+KB_SOURCE_DIR = os.getenv("KB_SOURCE_DIR", "")
+KB_INDEX_DIR = os.getenv("KB_INDEX_DIR", "artifacts/kb_index")
+KB_CHUNK_SIZE = int(os.getenv("KB_CHUNK_SIZE", "800"))
+KB_CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", "100"))
+KB_EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "64"))
+
+# Multi-tenant knowledge bases (see rag/tenants.py): a /chat request naming a
+# tenant is answered from the index ingested into TENANTS_DIR/<tenant>. The
+# models are shared; tenant indexes load on first use and the least recently
+# used are dropped while the loaded ones exceed TENANT_INDEX_MEMORY_MB.
+TENANTS_DIR = os.getenv("TENANTS_DIR", "artifacts/tenants")
+TENANT_INDEX_MEMORY_MB = float(os.getenv("TENANT_INDEX_MEMORY_MB", "512"))
@@ -0,0 +1,143 @@
+"""
+Micro-batching in front of a `transformers` pipeline.
+
+Concurrent requests are queued and coalesced into one padded batch, up to
+`max_batch_size` prompts or `max_wait_ms` after the first prompt arrived,
+whichever comes first. A single worker thread runs the batch through the
+pipeline and hands each result back to the caller waiting on it.
+
+`BatchingPipeline` looks like the wrapped pipeline to `HuggingFacePipeline`
+(it is callable with a list of prompts and exposes `.task`, `.model` and
+`.tokenizer`), so LangChain code does not change.
+"""
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from config.settings import LLM_MAX_BATCH_SIZE, LLM_MAX_WAIT_MS
+
+# Upper bounds (ms) of the wait-time histogram buckets.
+WAIT_BUCKETS_MS = (1, 5, 10, 20, 50, 100, 250, 500, 1000, float("inf"))
+
+
+class BatchingPipeline:
+    def __init__(self, pipe, max_batch_size: int = LLM_MAX_BATCH_SIZE, max_wait_ms: float = LLM_MAX_WAIT_MS):
+        self.pipe = pipe
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.wait_buckets = Counter()
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.requests = 0
+
+        self._start_worker()
+
+    def _start_worker(self):
+        self._worker = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+        self._worker.start()
+
+    def after_fork(self) -> None:
+        """Restart the worker in a forked process; threads do not survive fork()."""
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._start_worker()
+
+    # Attributes HuggingFacePipeline reads from the wrapped pipeline.
+    @property
+    def task(self):
+        return self.pipe.task
+
+    @property
+    def model(self):
+        return self.pipe.model
+
+    @property
+    def tokenizer(self):
+        return self.pipe.tokenizer
+
+    def submit(self, prompt: str, **kwargs) -> Future:
+        future = Future()
+        self._queue.put((prompt, kwargs, future, time.perf_counter()))
+        return future
+
+    def __call__(self, prompts, **kwargs):
+        single = isinstance(prompts, str)
+        if single:
+            prompts = [prompts]
+        futures = [self.submit(p, **kwargs) for p in prompts]
+        results = [f.result() for f in futures]
+        return results[0] if single else results
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[3] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Prompts that queued up behind the previous batch are taken
+            # right away; otherwise wait for more until the deadline.
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._record(batch, started)
+
+            # Only prompts with identical generation kwargs can share a batch.
+            groups = {}
+            for item in batch:
+                key = tuple(sorted(item[1].items()))
+                groups.setdefault(key, []).append(item)
+
+            for items in groups.values():
+                prompts = [item[0] for item in items]
+                try:
+                    outputs = self.pipe(prompts, batch_size=len(prompts), **items[0][1])
+                except Exception as exc:
+                    for item in items:
+                        item[2].set_exception(exc)
+                    continue
+                for item, output in zip(items, outputs):
+                    item[2].set_result(output)
+
+    def _record(self, batch, started):
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.batch_sizes[len(batch)] += 1
+            for item in batch:
+                wait = started - item[3]
+                self.wait_seconds_total += wait
+                self.wait_seconds_max = max(self.wait_seconds_max, wait)
+                wait_ms = wait * 1000.0
+                bucket = next(b for b in WAIT_BUCKETS_MS if wait_ms <= b)
+                self.wait_buckets[bucket] += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "requests": self.requests,
+                "batches": sum(self.batch_sizes.values()),
+                "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                "wait_ms_histogram": {
+                    ("+Inf" if b == float("inf") else str(b)): self.wait_buckets[b]
+                    for b in WAIT_BUCKETS_MS
+                },
+                "wait_ms_avg": round(self.wait_seconds_total / self.requests * 1000.0, 3) if self.requests else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000.0, 3),
+            }
@@ -0,0 +1,57 @@
+"""
+Deterministic stand-in for the flan-t5 pipeline (LLM_BACKEND=stub).
+
+Used by benchmarks and offline evaluation on CPU-only boxes: no model is
+downloaded, answers are a pure function of the prompt, and an optional fixed
+latency per call / per streamed token simulates generation cost.
+
+    - Condense-question prompts return the follow-up question unchanged.
+    - QA prompts return the first two sentences of the store information.
+"""
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def stub_answer(prompt: str) -> str:
+    follow_up = re.search(r"Follow Up Input: (.*)\nStandalone question:", prompt, re.S)
+    if follow_up:
+        return follow_up.group(1).strip()
+
+    context = re.search(r"Store information:\n(.*?)\n\nCustomer question:", prompt, re.S)
+    if not context:
+        return prompt.strip().splitlines()[-1] if prompt.strip() else ""
+    sentences = [s for s in _SENTENCE.split(context.group(1).strip()) if s]
+    return " ".join(sentences[:2])
+
+
+class StubLLM(LLM):
+    latency_ms: float = 0.0
+    token_latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        answer = stub_answer(prompt)
+        delay = self.latency_ms + self.token_latency_ms * len(answer.split())
+        if delay:
+            time.sleep(delay / 1000.0)
+        return answer
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        for i, word in enumerate(stub_answer(prompt).split(" ")):
+            if self.token_latency_ms:
+                time.sleep(self.token_latency_ms / 1000.0)
+            chunk = GenerationChunk(text=word if i == 0 else " " + word)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
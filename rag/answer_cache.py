@@ -0,0 +1,152 @@
+"""
+Semantic answer cache in front of the RAG chain.
+
+Questions are normalized for an exact-match lookup first; otherwise the
+question's embedding is compared (cosine similarity) against every cached
+question. A hit returns the cached answer and skips generation. Callers
+pass the embedding they already computed for retrieval, so a miss costs no
+extra forward pass; without one, the question is embedded here with the
+already-loaded embedding model.
+
+The cache is bounded (LRU) and is cleared whenever the knowledge-base hash
+changes, so answers never outlive the documents they were generated from.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from config.settings import ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD
+from rag.embeddings import query_vector
+
+# Rough bytes of one entry besides its vector: key, answer and bookkeeping.
+ENTRY_BYTES = 1024
+
+
+def normalize_question(text: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        embeddings,
+        kb_hash: Optional[str] = None,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_size: int = ANSWER_CACHE_SIZE,
+    ):
+        self.embeddings = embeddings
+        self.kb_hash = kb_hash
+        self.threshold = threshold
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._clear()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def _clear(self) -> None:
+        # key -> (slot, answer, generation_seconds); most recent last.
+        self._entries = OrderedDict()
+        self._keys = [None] * self.max_size
+        self._free = list(range(self.max_size - 1, -1, -1))
+        self._vectors = None  # (max_size, dim) unit vectors, allocated lazily
+        self._used = np.zeros(self.max_size, dtype=bool)
+
+    def capacity_bytes(self, dim: int) -> int:
+        """Estimated memory of the cache when full, for `dim`-dimensional embeddings."""
+        return self.max_size * (dim * 4 + 1 + ENTRY_BYTES)
+
+    def _embed(self, text: str, vector=None) -> np.ndarray:
+        if vector is None:
+            vector = query_vector(self.embeddings, text)
+        vec = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def invalidate(self, kb_hash: Optional[str] = None) -> None:
+        """Drop everything; called when the knowledge base changes."""
+        with self._lock:
+            if kb_hash is not None and kb_hash == self.kb_hash:
+                return
+            self.kb_hash = kb_hash
+            self._clear()
+            self.invalidations += 1
+
+    def lookup(self, question: str, vector=None) -> Optional[str]:
+        """Cached answer for `question`; `vector` is its embedding, if known."""
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[1]
+            if not self._entries:
+                self.misses += 1
+                return None
+
+        vec = self._embed(key, vector)
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                self.misses += 1
+                return None
+            scores = self._vectors @ vec
+            scores[~self._used] = -1.0
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+            hit_key = self._keys[slot]
+            self._entries.move_to_end(hit_key)
+            _, answer, seconds = self._entries[hit_key]
+            self.semantic_hits += 1
+            self.saved_seconds += seconds
+            return answer
+
+    def store(self, question: str, answer: str, generation_seconds: float = 0.0, vector=None) -> None:
+        key = normalize_question(question)
+        vec = self._embed(key, vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vec.shape[0]), dtype=np.float32)
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                slot = entry[0]
+            elif self._free:
+                slot = self._free.pop()
+            else:
+                _, (slot, _, _) = self._entries.popitem(last=False)
+                self._keys[slot] = None
+                self.evictions += 1
+            self._vectors[slot] = vec
+            self._used[slot] = True
+            self._keys[slot] = key
+            self._entries[key] = (slot, answer, generation_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "kb_hash": self.kb_hash,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "latency_saved_seconds": round(self.saved_seconds, 3),
+            }
+
@@ -0,0 +1,127 @@
+"""
+Compact BM25 inverted index, stored next to the FAISS index.
+
+The index is a set of flat numpy arrays (CSR layout): for term t, the
+postings are `postings[offsets[t]:offsets[t + 1]]` (document positions) and
+`tfs[...]` (term frequencies). Documents are identified by the same integer
+ids as the FAISS index, so hits resolve through the vector store's docstore.
+Saved as .npy files and memory-mapped when loaded, like the FAISS index.
+
+Exact tokens matter here ("UPI", "COD", coupon codes), so text is only
+lowercased and split on non-word characters; there is no stemming.
+"""
+import json
+import os
+import re
+from array import array
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+TOKEN = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it my of on or "
+    "the their they this to was what when where which will with you your".split()
+)
+
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, terms, offsets, postings, tfs, doc_ids, lengths):
+        self.terms = {t: i for i, t in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_ids = doc_ids
+        self.lengths = lengths
+        n = len(doc_ids)
+        # At least 1, so documents of only stopwords do not divide by zero.
+        self.avg_length = max(float(lengths.mean()), 1.0) if n else 1.0
+        df = np.diff(offsets).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self._norm = (K1 * (1 - B + B * lengths / self.avg_length)).astype(np.float32) if n else lengths
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[int, str]]) -> "BM25Index":
+        """Build from (id, text) pairs, streamed once."""
+        vocab = {}
+        term_docs, term_tfs = [], []
+        doc_ids, lengths = array("q"), array("I")
+        for position, (doc_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                t = vocab.get(token)
+                if t is None:
+                    t = vocab[token] = len(term_docs)
+                    term_docs.append(array("i"))
+                    term_tfs.append(array("H"))
+                term_docs[t].append(position)
+                term_tfs[t].append(min(tf, 65535))
+
+        terms = list(vocab)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(d) for d in term_docs])
+        postings = np.empty(int(offsets[-1]), dtype=np.int32)
+        tfs = np.empty(int(offsets[-1]), dtype=np.uint16)
+        for t, (docs, counts) in enumerate(zip(term_docs, term_tfs)):
+            postings[offsets[t]:offsets[t + 1]] = docs
+            tfs[offsets[t]:offsets[t + 1]] = counts
+        return cls(
+            terms, offsets, postings, tfs,
+            np.frombuffer(doc_ids, dtype=np.int64).copy(),
+            np.frombuffer(lengths, dtype=np.uint32).astype(np.float32),
+        )
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[int, float]]:
+        """Top-k (doc id, BM25 score) pairs for `query`, best first."""
+        scores = None
+        for token in set(tokenize(query)):
+            t = self.terms.get(token)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            if scores is None:
+                scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+            scores[docs] += self.idf[t] * tf * (K1 + 1) / (tf + self._norm[docs])
+        if scores is None:
+            return []
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(self.doc_ids[i]), float(scores[i])) for i in hits]
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(sorted(self.terms, key=self.terms.get), f, ensure_ascii=False)
+        for name in ("offsets", "postings", "tfs", "doc_ids", "lengths"):
+            np.save(os.path.join(path, name + ".npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            terms = json.load(f)
+        arrays = [
+            np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+            for name in ("offsets", "postings", "tfs", "doc_ids", "lengths")
+        ]
+        return cls(terms, *arrays)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
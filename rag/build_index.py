@@ -0,0 +1,32 @@
+"""
+Offline build of the FAISS index artifact.
+
+Usage:
+    python -m rag.build_index [--force] [--index-dir DIR]
+
+Run this once per release (or whenever data/knowledge_base.py changes) so
+serving processes only have to memory-map the saved index at startup.
+Knowledge bases kept as files are ingested with `python -m rag.ingest`.
+"""
+import argparse
+
+from config.settings import VECTORSTORE_DIR
+from data.knowledge_base import load_documents
+from rag.embeddings import load_embeddings
+from rag.vectorstore import ensure_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the knowledge-base FAISS index.")
+    parser.add_argument("--index-dir", default=VECTORSTORE_DIR)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the hash is unchanged")
+    args = parser.parse_args()
+
+    documents = load_documents()
+    embeddings = load_embeddings()
+    path = ensure_index(documents, embeddings, args.index_dir, force=args.force)
+    print(f"Index ready at {path} ({len(documents)} documents)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Token budget for the prompts sent to the LLM.
+
+flan-t5's encoder reads at most LLM_MAX_INPUT_TOKENS tokens; anything beyond
+is tokenized and then silently cut. `ContextBudget` counts tokens with the
+model's own tokenizer and fills each prompt up to the limit instead:
+
+    - QA prompt: retrieved passages in rank order. Passages repeating text
+      already packed are dropped, and a passage starting with the tail of
+      one already packed (neighbouring chunks) loses that overlap. Passages
+      that do not fit are skipped in favour of shorter lower-ranked ones;
+      the first that does not fit is cut at a sentence end if enough budget
+      is left.
+    - Condense prompt: the most recent chat turns that fit, at most
+      HISTORY_MAX_TOKENS.
+
+Without a tokenizer (stub LLM), whitespace words are counted instead.
+"""
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Sequence, Tuple
+
+from config.settings import CONTEXT_DEDUP_THRESHOLD, HISTORY_MAX_TOKENS, LLM_MAX_INPUT_TOKENS
+
+# A cut passage shorter than this is not worth its tokens.
+MIN_PARTIAL_TOKENS = 32
+
+SHINGLE = 5  # words per shingle for near-duplicate detection
+
+
+class WordCounter:
+    """Whitespace-word token estimate, used when there is no tokenizer."""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return " ".join(text.split()[:max_tokens])
+
+
+class TokenizerCounter:
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.count = lru_cache(maxsize=8192)(self._count)
+
+    def _count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        ids = self.tokenizer.encode(text, add_special_tokens=False)[:max_tokens]
+        return self.tokenizer.decode(ids, skip_special_tokens=True)
+
+
+def token_counter(llm):
+    """Counter for `llm`'s tokenizer (HuggingFacePipeline), else WordCounter."""
+    tokenizer = getattr(getattr(llm, "pipeline", None), "tokenizer", None)
+    return TokenizerCounter(tokenizer) if tokenizer is not None else WordCounter()
+
+
+class Packed(NamedTuple):
+    items: list
+    tokens: int
+    dropped_tokens: int
+    duplicates: int
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + SHINGLE]) for i in range(max(1, len(words) - SHINGLE + 1))}
+
+
+def _strip_overlap(text: str, packed: Sequence[str], min_chars: int = 20, max_chars: int = 1000) -> str:
+    """Drop a prefix of `text` that repeats the end of a packed passage."""
+    best = 0
+    for previous in packed:
+        limit = min(len(text), len(previous), max_chars)
+        for size in range(limit, min_chars - 1, -1):
+            if previous.endswith(text[:size]):
+                best = max(best, size)
+                break
+    return text[best:].lstrip() if best else text
+
+
+def _cut_at_sentence(text: str) -> str:
+    end = max(text.rfind(". "), text.rfind("! "), text.rfind("? "))
+    if end == -1 and text.endswith((".", "!", "?")):
+        return text
+    return text[:end + 1] if end > 0 else text
+
+
+class ContextBudget:
+    def __init__(
+        self,
+        counter=None,
+        max_input_tokens: int = LLM_MAX_INPUT_TOKENS,
+        history_tokens: int = HISTORY_MAX_TOKENS,
+        dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+    ):
+        self.counter = counter or WordCounter()
+        self.max_input_tokens = max_input_tokens
+        self.history_tokens = history_tokens
+        self.dedup_threshold = dedup_threshold
+
+    def remaining(self, prompt, **fixed) -> int:
+        """Tokens left in the input window for `prompt`'s one empty variable."""
+        return max(0, self.max_input_tokens - self.counter.count(prompt.format(**fixed)) - 1)
+
+    def pack_passages(self, passages: Sequence[str], budget: int) -> Packed:
+        count = self.counter.count
+        separator = count("\n\n")
+        kept, seen = [], set()
+        used = dropped = duplicates = 0
+        cut_allowed = True
+
+        for text in passages:
+            shingles = _shingles(text)
+            if seen and len(shingles & seen) >= self.dedup_threshold * len(shingles):
+                duplicates += 1
+                continue
+            text = _strip_overlap(text, kept)
+            tokens = count(text) + (separator if kept else 0)
+            if used + tokens <= budget:
+                kept.append(text)
+                seen |= shingles
+                used += tokens
+                continue
+
+            left = budget - used - (separator if kept else 0)
+            if cut_allowed and left >= MIN_PARTIAL_TOKENS:
+                # Cut the best passage that does not fit rather than lose it.
+                cut_allowed = False
+                part = _cut_at_sentence(self.counter.truncate(text, left))
+                part_tokens = count(part)
+                if part and part_tokens <= left:
+                    kept.append(part)
+                    seen |= shingles
+                    used += part_tokens + (separator if len(kept) > 1 else 0)
+                    dropped += max(0, tokens - part_tokens)
+                    continue
+            dropped += tokens
+        return Packed(kept, used, dropped, duplicates)
+
+    def pack_history(self, turns: Sequence[Tuple[str, str]], budget: int) -> Packed:
+        """Most recent turns that fit in `budget` (and HISTORY_MAX_TOKENS)."""
+        budget = min(budget, self.history_tokens)
+        kept: List[Tuple[str, str]] = []
+        used = dropped = 0
+        for question, answer in reversed(turns):
+            # Matches the "Human: ...\nAssistant: ..." lines of _get_chat_history.
+            tokens = self.counter.count(f"Human: {question}\nAssistant: {answer}")
+            if not dropped and used + tokens <= budget:
+                kept.append((question, answer))
+                used += tokens
+            else:
+                dropped += tokens
+        return Packed(kept[::-1], used, dropped, 0)
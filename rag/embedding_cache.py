@@ -0,0 +1,251 @@
+"""
+Memoized, batched embeddings in front of the embedding model.
+
+`CachedEmbeddings` wraps any LangChain `Embeddings`:
+
+    - embed_query: vectors are memoized by normalized text (whitespace
+      collapsed) in a bounded LRU, so the answer-cache lookup, retrieval and
+      repeated or condensed questions embed each distinct text once. Misses
+      from concurrent requests are coalesced: a single worker thread drains
+      every query waiting in the queue (up to `max_batch_size`) into one
+      `embed_documents` call, i.e. one forward pass.
+    - embed_documents: with EMBEDDING_CACHE_DIR set, document vectors are
+      persisted in a SQLite file keyed by model and text, so rebuilding or
+      re-ingesting the knowledge base only embeds new texts.
+
+Vectors are kept as read-only, C-contiguous float32 numpy arrays, the
+layout FAISS consumes. `embed_query_array` / `embed_documents_array` return
+them without copies; `embed_query` / `embed_documents` return lists of
+floats, as the LangChain `Embeddings` interface specifies. In-repo callers
+go through `rag.embeddings.query_vector` / `document_vectors`, which use the
+array methods when the model is cached.
+
+Coalesced queries go through `embed_documents`; that matches `embed_query`
+for the sentence-transformers and stub backends used here, which add no
+query instruction.
+"""
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import (
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_MAX_BATCH_SIZE,
+    EMBEDDING_MAX_WAIT_MS,
+)
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _as_vectors(values) -> np.ndarray:
+    vectors = np.ascontiguousarray(values, dtype=np.float32)
+    vectors.flags.writeable = False
+    return vectors
+
+
+class DocumentVectorStore:
+    """SQLite file of document vectors keyed by sha256(model, text)."""
+
+    def __init__(self, path: str, model_name: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.model_name = model_name
+        self._connect()
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID")
+
+    def _connect(self) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+    def after_fork(self) -> None:
+        # A SQLite connection must not be used by two processes.
+        self._connect()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256((self.model_name + "\0" + text).encode("utf-8")).digest()
+
+    def get_many(self, keys: List[bytes]) -> dict:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update(rows)
+        return {k: np.frombuffer(v, dtype=np.float32) for k, v in found.items()}
+
+    def put_many(self, items) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, vector) VALUES (?, ?)",
+                [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items],
+            )
+            self._conn.execute("COMMIT")
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        base: Embeddings,
+        model_name: str,
+        max_size: int = EMBEDDING_CACHE_SIZE,
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+        cache_dir: Optional[str] = EMBEDDING_CACHE_DIR,
+    ):
+        self.base = base
+        self.model_name = model_name
+        self.max_size = max_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.documents = (
+            DocumentVectorStore(os.path.join(cache_dir, "document_vectors.db"), model_name)
+            if cache_dir else None
+        )
+
+        self._lock = threading.Lock()
+        self._vectors = OrderedDict()  # normalized text -> vector; most recent last
+        self._inflight = {}            # normalized text -> Future
+        self._queue = queue.Queue()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.batch_sizes = Counter()
+        self.document_hits = 0
+        self.document_misses = 0
+
+        self._start_worker()
+
+    def _start_worker(self):
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def after_fork(self) -> None:
+        """Restart the batcher in a forked process; the LRU is kept."""
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._queue = queue.Queue()
+        if self.documents is not None:
+            self.documents.after_fork()
+        self._start_worker()
+
+    # -- queries ---------------------------------------------------------
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        key = normalize_text(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self.hits += 1
+                return vector
+            # Identical questions in flight share one computation.
+            future = self._inflight.get(key)
+            if future is None:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                self._queue.put((key, future))
+            else:
+                self.hits += 1
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = _as_vectors(self.base.embed_documents([key for key, _ in batch]))
+            except Exception as exc:
+                with self._lock:
+                    for key, future in batch:
+                        self._inflight.pop(key, None)
+                        future.set_exception(exc)
+                continue
+
+            with self._lock:
+                self.batch_sizes[len(batch)] += 1
+                for (key, future), vector in zip(batch, vectors):
+                    self._vectors[key] = vector
+                    self._inflight.pop(key, None)
+                    future.set_result(vector)
+                while len(self._vectors) > self.max_size:
+                    self._vectors.popitem(last=False)
+                    self.evictions += 1
+
+    # -- documents -------------------------------------------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        if self.documents is None:
+            return _as_vectors(self.base.embed_documents(texts))
+
+        keys = [self.documents.key(t) for t in texts]
+        found = self.documents.get_many(keys)
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            computed = self.base.embed_documents([texts[i] for i in missing])
+            new = [(keys[i], v) for i, v in zip(missing, computed)]
+            self.documents.put_many(new)
+            found.update((k, np.asarray(v, dtype=np.float32)) for k, v in new)
+        with self._lock:
+            self.document_hits += len(texts) - len(missing)
+            self.document_misses += len(missing)
+        return _as_vectors([found[k] for k in keys])
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            batches = sum(self.batch_sizes.values())
+            batched = sum(size * n for size, n in self.batch_sizes.items())
+            return {
+                "model": self.model_name,
+                "entries": len(self._vectors),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "queue_depth": self._queue.qsize(),
+                "batches": batches,
+                "batch_size_avg": round(batched / batches, 3) if batches else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                "document_hits": self.document_hits,
+                "document_misses": self.document_misses,
+            }
@@ -1,7 +1,76 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from config.settings import EMBEDDING_MODEL
+import hashlib
+import re
 
-def load_embeddings():
-    return HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL
-    )
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import EMBEDDING_BACKEND, EMBEDDING_CACHE_ENABLED, EMBEDDING_MODEL
+
+STUB_EMBEDDING_DIM = 384
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings (EMBEDDING_BACKEND=stub).
+
+    Words are hashed into a fixed number of signed buckets and the vector is
+    L2-normalized, so texts sharing words are close. No model is loaded,
+    which keeps benchmarks and offline evaluation reproducible on any box.
+    """
+
+    def __init__(self, dim: int = STUB_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            h = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:8], "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm:
+            vec /= norm
+        return vec.tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def query_vector(embeddings, text: str) -> np.ndarray:
+    """float32 embedding of `text`, without a list round trip when cached."""
+    embed = getattr(embeddings, "embed_query_array", None)
+    if embed is not None:
+        return embed(text)
+    return np.asarray(embeddings.embed_query(text), dtype=np.float32)
+
+
+def document_vectors(embeddings, texts) -> np.ndarray:
+    """float32 (len(texts), dim) embeddings, without a list round trip when cached."""
+    embed = getattr(embeddings, "embed_documents_array", None)
+    if embed is not None:
+        return embed(list(texts))
+    return np.asarray(embeddings.embed_documents(list(texts)), dtype=np.float32)
+
+
+def embedding_model_name() -> str:
+    """Name used to key on-disk indexes for the configured embedding backend."""
+    if EMBEDDING_BACKEND == "stub":
+        return f"stub-hashing-{STUB_EMBEDDING_DIM}"
+    return EMBEDDING_MODEL
+
+
+def load_embeddings(cached: bool = EMBEDDING_CACHE_ENABLED):
+    if EMBEDDING_BACKEND == "stub":
+        base = HashingEmbeddings()
+    else:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        base = HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL
+        )
+    if not cached:
+        return base
+
+    from rag.embedding_cache import CachedEmbeddings
+    return CachedEmbeddings(base, embedding_model_name())
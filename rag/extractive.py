@@ -0,0 +1,109 @@
+"""
+Extractive answers: reply with knowledge-base sentences instead of generating.
+
+Most FAQ answers are a close paraphrase of one or two knowledge-base
+sentences. With ANSWER_MODE=extractive every indexed passage is split into
+sentences once, at startup, and the sentences are embedded in batches (with
+EMBEDDING_CACHE_DIR set the vectors are read back from disk on the next
+start). They are kept as one unit-norm float32 matrix in CSR layout, like
+the BM25 index: `ids` holds the passages' FAISS ids in ascending order (0..n-1
+for a plain index, the chunk ids of an IndexIDMap2 built by rag/ingest.py),
+and the sentences of passage `ids[k]` are rows `offsets[k]:offsets[k + 1]`.
+
+For a request, the rows of the retrieved passages are scored against the
+query embedding with one matrix-vector product. When the best cosine
+similarity reaches `threshold`, the reply is the top `max_sentences`
+sentences scoring at least `threshold`, best first; otherwise the caller
+falls back to generation.
+"""
+import re
+from typing import List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from config.settings import EXTRACTIVE_MAX_SENTENCES, EXTRACTIVE_THRESHOLD
+from rag.embeddings import document_vectors
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+# Sentences embedded per batch while building.
+BUILD_BATCH_SIZE = 256
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE.split(text.strip()) if s.strip()]
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceIndex:
+    def __init__(self, sentences: List[str], vectors: np.ndarray, offsets: np.ndarray,
+                 ids: Optional[np.ndarray] = None,
+                 threshold: float = EXTRACTIVE_THRESHOLD, max_sentences: int = EXTRACTIVE_MAX_SENTENCES):
+        self.sentences = sentences
+        self.vectors = vectors
+        self.offsets = offsets
+        self.ids = ids if ids is not None else np.arange(len(offsets) - 1, dtype=np.int64)
+        self.threshold = threshold
+        self.max_sentences = max_sentences
+
+    @classmethod
+    def build(cls, vectorstore, batch_size: int = BUILD_BATCH_SIZE, **kwargs) -> "SentenceIndex":
+        """Split and embed every passage of `vectorstore`."""
+        index = vectorstore.index
+        if hasattr(index, "id_map"):
+            ids = np.sort(faiss.vector_to_array(index.id_map).astype(np.int64))
+        else:
+            ids = np.arange(index.ntotal, dtype=np.int64)
+        sentences, offsets = [], np.zeros(len(ids) + 1, dtype=np.int64)
+        for k, i in enumerate(ids):
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)])
+            if not isinstance(doc, str):
+                sentences.extend(split_sentences(doc.page_content))
+            offsets[k + 1] = len(sentences)
+
+        embeddings = vectorstore.embeddings
+        blocks = [_unit_rows(document_vectors(embeddings, sentences[start:start + batch_size]))
+                  for start in range(0, len(sentences), batch_size)]
+        dim = vectorstore.index.d
+        vectors = np.concatenate(blocks) if blocks else np.zeros((0, dim), dtype=np.float32)
+        return cls(sentences, vectors, offsets, ids, **kwargs)
+
+    def score(self, vector, ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(sentence rows, cosine similarities) of the passages `ids`."""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, ids), max(len(self.ids) - 1, 0))
+        known = positions[self.ids[positions] == ids] if len(self.ids) else positions[:0]
+        spans = [np.arange(self.offsets[k], self.offsets[k + 1]) for k in known]
+        rows = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+        if not len(rows):
+            return rows, np.zeros(0, dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        return rows, self.vectors[rows] @ query
+
+    def extract(self, vector, ids: Sequence[int]) -> Tuple[Optional[str], float]:
+        """(reply, best score); reply is None below the threshold."""
+        rows, scores = self.score(vector, ids)
+        if not len(rows):
+            return None, 0.0
+        order = np.argsort(-scores, kind="stable")
+        best = float(scores[order[0]])
+        if best < self.threshold:
+            return None, best
+        picked = []
+        for j in order:
+            if scores[j] < self.threshold or len(picked) == self.max_sentences:
+                break
+            sentence = self.sentences[rows[j]]
+            if sentence not in picked:  # passages may repeat a sentence
+                picked.append(sentence)
+        return " ".join(picked), best
+
+    def __len__(self) -> int:
+        return len(self.sentences)
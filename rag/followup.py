@@ -0,0 +1,74 @@
+"""
+Retrieval queries for follow-up questions without a condensing LLM call.
+
+LangChain's ConversationalRetrievalChain rewrites every follow-up into a
+standalone question with one generation before answering it with another.
+With RAG_FOLLOWUP_MODE=blend the retrieval query is built from the
+conversation instead, so the LLM runs once per request:
+
+    - A self-contained turn (long enough, no pronoun or "what about ..."
+      opener pointing back at the conversation) is used as is.
+    - Otherwise the question is the previous RAG_FOLLOWUP_TURNS user turns
+      followed by the latest one; BM25 searches that text, and FAISS a
+      blend of their embeddings weighted RAG_FOLLOWUP_DECAY ** age (the
+      latest turn has weight 1), rescaled to the latest turn's norm.
+
+Only user turns are used: the assistant's answers are long and would pull
+the blend towards passages already answered. Turn embeddings come from the
+embedding cache, so earlier turns are usually not embedded again.
+"""
+import re
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import RAG_FOLLOWUP_DECAY, RAG_FOLLOWUP_TURNS
+from rag.embeddings import query_vector
+
+# Shorter turns are treated as follow-ups ("and express?").
+MIN_WORDS = 4
+
+REFERRING_WORDS = frozenset({
+    "it", "its", "this", "that", "these", "those", "they", "them", "their",
+    "ones", "same", "above", "else",
+})
+_CONTINUATION = re.compile(r"^\s*(and|also|but|so|then|what about|how about|what if)\b", re.I)
+_WORD = re.compile(r"[a-z']+")
+
+
+def is_self_contained(query: str) -> bool:
+    words = _WORD.findall(query.lower())
+    if len(words) < MIN_WORDS or _CONTINUATION.match(query):
+        return False
+    return not REFERRING_WORDS.intersection(words)
+
+
+def recent_questions(history: Sequence[Tuple[str, str]], turns: int = RAG_FOLLOWUP_TURNS) -> List[str]:
+    return [question for question, _ in history[-turns:]] if turns > 0 else []
+
+
+def followup_question(query: str, history: Sequence[Tuple[str, str]], turns: int = RAG_FOLLOWUP_TURNS) -> str:
+    """Text the follow-up is retrieved and answered with."""
+    if not history or is_self_contained(query):
+        return query
+    return " ".join(recent_questions(history, turns) + [query])
+
+
+def blend_vectors(vectors, decay: float = RAG_FOLLOWUP_DECAY) -> np.ndarray:
+    """Weighted mean of turn vectors, oldest first; scaled to the last one's norm."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    weights = decay ** np.arange(len(vectors) - 1, -1, -1, dtype=np.float32)
+    blended = weights @ vectors
+    norm = np.linalg.norm(blended)
+    if not norm:
+        return vectors[-1]
+    return blended * (np.linalg.norm(vectors[-1]) / norm)
+
+
+def followup_vector(embeddings, query: str, history: Sequence[Tuple[str, str]], turns: int = RAG_FOLLOWUP_TURNS,
+                    decay: float = RAG_FOLLOWUP_DECAY) -> np.ndarray:
+    """Retrieval embedding of `query` in the context of `history`."""
+    if not history or is_self_contained(query):
+        return query_vector(embeddings, query)
+    texts = recent_questions(history, turns) + [query]
+    return blend_vectors([query_vector(embeddings, text) for text in texts], decay)
@@ -0,0 +1,76 @@
+"""
+Hybrid retrieval: dense FAISS candidates fused with BM25 candidates.
+
+Both searches return their top `fetch_k` ids and the two rankings are
+combined with reciprocal rank fusion (score = sum of 1 / (rrf_k + rank)),
+which needs no calibration between L2 distances and BM25 scores. The top
+`k` fused hits are kept, minus any scoring below `min_score_ratio` times the
+best one, so a query with one clear answer sends less context to the LLM.
+Only the kept hits are read from the docstore.
+"""
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from config.settings import RETRIEVER_FETCH_K, RETRIEVER_K, RETRIEVER_MIN_SCORE_RATIO, RRF_K
+from rag.embeddings import query_vector
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], rrf_k: int = RRF_K) -> List[Tuple[int, float]]:
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class HybridRetriever(BaseRetriever):
+    vectorstore: Any
+    lexical: Optional[Any] = None  # rag.bm25.BM25Index; dense-only when None
+    k: int = RETRIEVER_K
+    fetch_k: int = RETRIEVER_FETCH_K
+    rrf_k: int = RRF_K
+    min_score_ratio: float = RETRIEVER_MIN_SCORE_RATIO
+
+    def dense_ids(self, vector) -> List[int]:
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        _, ids = self.vectorstore.index.search(query, self.fetch_k)
+        return [int(i) for i in ids[0] if i != -1]
+
+    def dense_ids_batch(self, vectors) -> List[List[int]]:
+        """`dense_ids` for many query vectors in one FAISS search."""
+        queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        _, ids = self.vectorstore.index.search(queries, self.fetch_k)
+        return [[int(i) for i in row if i != -1] for row in ids]
+
+    def lexical_ids(self, query: str) -> List[int]:
+        if self.lexical is None:
+            return []
+        return [doc_id for doc_id, _ in self.lexical.search(query, self.fetch_k)]
+
+    def ranked_ids(self, query: str, vector, dense_ids: Optional[List[int]] = None) -> List[int]:
+        if dense_ids is None:
+            dense_ids = self.dense_ids(vector)
+        fused = reciprocal_rank_fusion([dense_ids, self.lexical_ids(query)], self.rrf_k)
+        if not fused:
+            return []
+        cutoff = fused[0][1] * self.min_score_ratio
+        return [doc_id for doc_id, score in fused[:self.k] if score >= cutoff]
+
+    def documents(self, ids: Sequence[int]) -> List[Document]:
+        store = self.vectorstore
+        docs = []
+        for i in ids:
+            doc = store.docstore.search(store.index_to_docstore_id[i])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
+
+    def search_by_vector(self, query: str, vector) -> List[Document]:
+        """Hybrid search with an already computed query embedding."""
+        return self.documents(self.ranked_ids(query, vector))
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> List[Document]:
+        return self.search_by_vector(query, query_vector(self.vectorstore.embeddings, query))
@@ -0,0 +1,420 @@
+"""
+Incremental knowledge-base ingestion.
+
+Usage:
+    python -m rag.ingest --source-dir docs/kb [--index-dir DIR] [--rebuild]
+
+Reads the .md, .txt and .jsonl files under the source directory, splits them
+into chunks with langchain-text-splitters and keeps a FAISS index in sync
+with them. Every chunk is keyed by a hash of its source, section and text:
+chunks already in the index are kept, new or edited ones are embedded in
+batches of KB_EMBED_BATCH_SIZE, and chunks that disappeared from the sources
+are removed. Files are read one section at a time, so memory use is bounded
+by the batch size and the FAISS index itself, not by the corpus.
+
+The index directory holds:
+    chunks.db          SQLite table of chunk id -> hash, source, section,
+                       text (the retriever resolves hits here) and metadata
+    index-<gen>.faiss  IndexIDMap2 over a flat L2 index keyed by chunk id
+    bm25-<gen>/        BM25 index over the same chunk ids (rag/bm25.py)
+
+A run writes a new index file and switches to it in the same SQLite
+transaction that records the chunk changes, so an interrupted run leaves
+the previous index in place. Running workers keep the index they opened;
+restart them to pick up a new one.
+
+JSONL records hold "text" (or "content") and optionally "source" and
+"section" (or "title").
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from typing import Iterator, NamedTuple, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from config.settings import (
+    KB_CHUNK_OVERLAP,
+    KB_CHUNK_SIZE,
+    KB_EMBED_BATCH_SIZE,
+    KB_INDEX_DIR,
+    KB_SOURCE_DIR,
+)
+from rag.bm25 import BM25Index
+from rag.embeddings import document_vectors, embedding_model_name, load_embeddings
+from rag.vectorstore import read_index
+
+SOURCE_EXTENSIONS = (".md", ".markdown", ".txt", ".jsonl")
+MANIFEST_FILE = "chunks.db"
+
+# Long sections are handed to the splitter in blocks of about this size
+# (cut at a blank line), so one huge file never sits in memory whole.
+MAX_SECTION_CHARS = 64 * 1024
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+
+
+class Chunk(NamedTuple):
+    chunk_hash: str
+    source: str
+    section: str
+    text: str
+
+
+def chunk_hash(source: str, section: str, text: str) -> str:
+    data = "\0".join((source, section, text)).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+# -- reading sources ------------------------------------------------------
+
+def iter_source_files(source_dir: str) -> Iterator[str]:
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.lower().endswith(SOURCE_EXTENSIONS) and not name.startswith("."):
+                yield os.path.join(root, name)
+
+
+def _blocks(lines, section: str):
+    """Group lines into blocks of up to MAX_SECTION_CHARS, cut at blank lines."""
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= MAX_SECTION_CHARS and not line.strip():
+            yield section, "".join(block)
+            block, size = [], 0
+    if block:
+        yield section, "".join(block)
+
+
+def _markdown_sections(f) -> Iterator[Tuple[str, str]]:
+    """Yield (heading path, text) blocks of a markdown file."""
+    headings, block, size, in_fence = [], [], 0, False
+    for line in f:
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING.match(line)
+        if match is not None:
+            if block:
+                yield " > ".join(headings), "".join(block)
+            block, size = [], 0
+            level = len(match.group(1))
+            headings = headings[:level - 1] + [match.group(2)]
+            continue
+        block.append(line)
+        size += len(line)
+        if size >= MAX_SECTION_CHARS and not line.strip():
+            yield " > ".join(headings), "".join(block)
+            block, size = [], 0
+    if block:
+        yield " > ".join(headings), "".join(block)
+
+
+def _jsonl_records(f, rel_path: str) -> Iterator[Tuple[str, str, str]]:
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f"{rel_path}:{line_no}: invalid JSON ({exc})") from None
+        text = record.get("text") or record.get("content") or ""
+        section = record.get("section") or record.get("title") or ""
+        yield str(record.get("source") or rel_path), str(section), text
+
+
+def iter_sections(path: str, rel_path: str) -> Iterator[Tuple[str, str, str]]:
+    """Yield (source, section, text) for one source file."""
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith(".jsonl"):
+            yield from _jsonl_records(f, rel_path)
+        elif path.lower().endswith(".txt"):
+            for section, text in _blocks(f, ""):
+                yield rel_path, section, text
+        else:
+            for section, text in _markdown_sections(f):
+                yield rel_path, section, text
+
+
+def make_splitter(chunk_size: int = KB_CHUNK_SIZE, chunk_overlap: int = KB_CHUNK_OVERLAP):
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def iter_chunks(source_dir: str, splitter=None) -> Iterator[Chunk]:
+    splitter = splitter or make_splitter()
+    for path in iter_source_files(source_dir):
+        rel_path = os.path.relpath(path, source_dir)
+        for source, section, text in iter_sections(path, rel_path):
+            if not text.strip():
+                continue
+            for piece in splitter.split_text(text):
+                yield Chunk(chunk_hash(source, section, piece), source, section, piece)
+
+
+# -- the chunk manifest ---------------------------------------------------
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY,
+            chunk_hash TEXT NOT NULL,
+            source TEXT NOT NULL,
+            section TEXT NOT NULL,
+            text TEXT NOT NULL,
+            seen INTEGER NOT NULL,
+            deleted INTEGER
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_chunks_live_hash
+            ON chunks(chunk_hash) WHERE deleted IS NULL;
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """
+    )
+    return conn
+
+
+def index_meta(index_dir: str = KB_INDEX_DIR) -> dict:
+    """Metadata of the current index (empty if none was built yet)."""
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+
+def _kb_hash(conn, model_name: str) -> str:
+    h = hashlib.sha256(model_name.encode("utf-8"))
+    rows = conn.execute("SELECT chunk_hash FROM chunks WHERE deleted IS NULL ORDER BY chunk_hash")
+    for (value,) in rows:
+        h.update(value.encode("ascii"))
+    return h.hexdigest()[:16]
+
+
+# -- ingestion ------------------------------------------------------------
+
+def ingest(
+    source_dir: str = KB_SOURCE_DIR,
+    index_dir: str = KB_INDEX_DIR,
+    embeddings=None,
+    batch_size: int = KB_EMBED_BATCH_SIZE,
+    rebuild: bool = False,
+    splitter=None,
+) -> dict:
+    """Bring the index in `index_dir` in line with `source_dir`; returns counts."""
+    if not source_dir or not os.path.isdir(source_dir):
+        raise ValueError(f"knowledge-base source directory not found: {source_dir!r}")
+    if embeddings is None:
+        embeddings = load_embeddings()
+    os.makedirs(index_dir, exist_ok=True)
+
+    with open(os.path.join(index_dir, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            return _ingest(source_dir, index_dir, embeddings, batch_size, rebuild, splitter)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _ingest(source_dir, index_dir, embeddings, batch_size, rebuild, splitter) -> dict:
+    model_name = embedding_model_name()
+    conn = _connect(os.path.join(index_dir, MANIFEST_FILE))
+    meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    old_file = meta.get("index_file")
+
+    index = None
+    if not rebuild and meta.get("model") == model_name and old_file:
+        index = faiss.read_index(os.path.join(index_dir, old_file))
+    generation = int(meta.get("generation", 0)) + 1
+    next_id = int(meta.get("next_id", 1))
+    counts = {"added": 0, "kept": 0, "removed": 0}
+
+    pending = []  # (chunk id, text) waiting to be embedded
+    seen = []     # ids of unchanged chunks
+
+    def flush_pending():
+        nonlocal index
+        vectors = document_vectors(embeddings, [text for _, text in pending])
+        if index is None:
+            index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+        index.add_with_ids(vectors, np.asarray([i for i, _ in pending], dtype=np.int64))
+        pending.clear()
+
+    def flush_seen():
+        conn.executemany("UPDATE chunks SET seen = ? WHERE id = ?", [(generation, i) for i in seen])
+        seen.clear()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if index is None:
+            # First run, a different embedding model or --rebuild.
+            conn.execute("DELETE FROM chunks")
+
+        for chunk in iter_chunks(source_dir, splitter):
+            row = conn.execute(
+                "SELECT id, seen FROM chunks WHERE chunk_hash = ? AND deleted IS NULL",
+                (chunk.chunk_hash,),
+            ).fetchone()
+            if row is not None:
+                if row[1] != generation:
+                    seen.append(row[0])
+                    counts["kept"] += 1
+                    if len(seen) >= 1000:
+                        flush_seen()
+                continue
+
+            conn.execute(
+                "INSERT INTO chunks (id, chunk_hash, source, section, text, seen) VALUES (?, ?, ?, ?, ?, ?)",
+                (next_id, chunk.chunk_hash, chunk.source, chunk.section, chunk.text, generation),
+            )
+            pending.append((next_id, chunk.text))
+            next_id += 1
+            counts["added"] += 1
+            if len(pending) >= batch_size:
+                flush_pending()
+
+        if pending:
+            flush_pending()
+        if seen:
+            flush_seen()
+        if index is None:
+            raise ValueError(f"no documents found in {source_dir!r}")
+
+        stale = [r[0] for r in conn.execute(
+            "SELECT id FROM chunks WHERE deleted IS NULL AND seen < ?", (generation,)
+        )]
+        if stale:
+            index.remove_ids(np.asarray(stale, dtype=np.int64))
+        counts["removed"] = len(stale)
+
+        # Removed chunks stay readable for one more run, for workers still
+        # serving the previous index.
+        conn.execute("UPDATE chunks SET deleted = ? WHERE deleted IS NULL AND seen < ?", (generation, generation))
+        conn.execute("DELETE FROM chunks WHERE deleted IS NOT NULL AND deleted < ?", (generation,))
+
+        index_file = f"index-{generation}.faiss"
+        faiss.write_index(index, os.path.join(index_dir, index_file))
+        bm25_dir = f"bm25-{generation}"
+        live = conn.execute("SELECT id, text FROM chunks WHERE deleted IS NULL ORDER BY id")
+        BM25Index.build(live).save(os.path.join(index_dir, bm25_dir))
+        new_meta = {
+            "model": model_name,
+            "generation": generation,
+            "next_id": next_id,
+            "index_file": index_file,
+            "bm25_dir": bm25_dir,
+            "chunks": index.ntotal,
+            "kb_hash": _kb_hash(conn, model_name),
+        }
+        conn.execute("DELETE FROM meta")
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in new_meta.items()])
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if name.startswith("index-") and name.endswith(".faiss") and name != index_file:
+            os.remove(path)
+        elif name.startswith("bm25-") and name != bm25_dir:
+            shutil.rmtree(path, ignore_errors=True)
+    return {**counts, "chunks": new_meta["chunks"], "kb_hash": new_meta["kb_hash"]}
+
+
+# -- serving --------------------------------------------------------------
+
+class ChunkDocstore(Docstore):
+    """Resolves FAISS hits to chunks stored in chunks.db (read-only)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return conn
+
+    def after_fork(self) -> None:
+        self._local = threading.local()
+
+    def search(self, search):
+        row = self._conn().execute(
+            "SELECT text, source, section FROM chunks WHERE id = ?", (int(search),)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(
+            page_content=row[0],
+            metadata={"source": row[1], "section": row[2], "chunk_id": int(search)},
+        )
+
+
+class _ChunkIds(dict):
+    """index_to_docstore_id for an IndexIDMap2: FAISS hits already are chunk ids."""
+
+    def __missing__(self, key):
+        return int(key)
+
+
+def open_kb_index(index_dir: str, embeddings) -> FAISS:
+    meta = index_meta(index_dir)
+    if not meta:
+        raise FileNotFoundError(f"no knowledge-base index in {index_dir!r}; run python -m rag.ingest")
+    store = FAISS(
+        embedding_function=embeddings,
+        index=read_index(os.path.join(index_dir, meta["index_file"])),
+        docstore=ChunkDocstore(os.path.join(index_dir, MANIFEST_FILE)),
+        index_to_docstore_id=_ChunkIds(),
+    )
+    bm25_dir = meta.get("bm25_dir")
+    store.lexical_index = BM25Index.load(os.path.join(index_dir, bm25_dir)) if bm25_dir else None
+    return store
+
+
+def load_kb_vectorstore(embeddings, source_dir: str = KB_SOURCE_DIR, index_dir: str = KB_INDEX_DIR) -> FAISS:
+    """Open the ingested index, ingesting `source_dir` first if there is none."""
+    if not index_meta(index_dir):
+        print(f"Ingesting {source_dir} into {index_dir}...")
+        ingest(source_dir, index_dir, embeddings)
+    return open_kb_index(index_dir, embeddings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a knowledge-base directory into the FAISS index.")
+    parser.add_argument("--source-dir", default=KB_SOURCE_DIR, required=not KB_SOURCE_DIR)
+    parser.add_argument("--index-dir", default=KB_INDEX_DIR)
+    parser.add_argument("--batch-size", type=int, default=KB_EMBED_BATCH_SIZE)
+    parser.add_argument("--rebuild", action="store_true", help="drop the index and embed every chunk again")
+    args = parser.parse_args()
+
+    stats = ingest(args.source_dir, args.index_dir, batch_size=args.batch_size, rebuild=args.rebuild)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Per-tenant knowledge bases for the storefronts hosted by one process.
+
+Each tenant's documents are ingested into their own index directory,
+TENANTS_DIR/<tenant>, with the usual ingestion CLI:
+
+    python -m rag.ingest --source-dir stores/acme --index-dir artifacts/tenants/acme
+
+The embedding model and the LLM are shared. Only the tenant indexes are
+loaded separately. `TenantIndexes.get(tenant)` opens a tenant's index
+(memory-mapped FAISS, BM25 arrays, chunks.db) on first use. Concurrent
+first requests for the same tenant share one load, and indexes are opened
+one at a time, so loads never overshoot the budget by more than one index
+(np.load is also not thread-safe on some Python 3.11 releases). Loaded
+indexes are kept in LRU order. After each load, the least recently used
+ones are dropped until the resident indexes fit in TENANT_INDEX_MEMORY_MB.
+The index just loaded is always kept, even if it alone exceeds the budget.
+A request that still holds an evicted index finishes with it; the next
+request loads it again.
+
+Resident size is estimated from the arrays an index keeps in memory: FAISS
+vectors and ids, the BM25 postings, and the sentence vectors in extractive
+mode. A tenant agent adds AGENT_OVERHEAD_BYTES for its chain and retriever,
+and its answer cache at full size, since the cache fills after the load.
+
+`stats()` reports, per tenant, whether its index is resident, its size, how
+often it was loaded and evicted, and how long loads took.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from config.settings import TENANT_INDEX_MEMORY_MB, TENANTS_DIR
+from rag.ingest import MANIFEST_FILE
+
+# Memory a tenant agent adds on top of its index, sentence vectors and
+# answer cache: the LangChain chain, the retriever and the create_agent
+# closures (the models and the session store are shared). tracemalloc
+# measures about 15 KiB per create_agent call over an already loaded index.
+AGENT_OVERHEAD_BYTES = 16 * 1024
+
+# Tenant ids name a directory under TENANTS_DIR: no separators, no dot dirs.
+_TENANT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class UnknownTenant(KeyError):
+    pass
+
+
+def valid_tenant_id(tenant) -> bool:
+    return isinstance(tenant, str) and bool(_TENANT_ID.match(tenant))
+
+
+def index_bytes(value) -> int:
+    """Estimated resident bytes of a vector store, or of an agent over one."""
+    store = getattr(value, "vectorstore", value)
+    index = store.index
+    # Flat codes (d float32 per vector) plus the 64-bit id of each vector.
+    total = index.ntotal * (index.d * 4 + 8)
+    lexical = getattr(store, "lexical_index", None)
+    if lexical is not None:
+        total += sum(a.nbytes for a in vars(lexical).values() if isinstance(a, np.ndarray))
+        total += 64 * len(lexical.terms)  # term -> row dict, roughly
+    sentence_index = getattr(value, "sentence_index", None)
+    if sentence_index is not None:
+        arrays = (sentence_index.vectors, sentence_index.offsets, sentence_index.ids)
+        total += sum(a.nbytes for a in arrays)
+    if value is not store:
+        total += AGENT_OVERHEAD_BYTES
+        answer_cache = getattr(value, "answer_cache", None)
+        if answer_cache is not None:
+            total += answer_cache.capacity_bytes(index.d)
+    return int(total)
+
+
+class TenantIndexes:
+    def __init__(
+        self,
+        load: Callable[[str], object],
+        tenants_dir: str = TENANTS_DIR,
+        memory_budget_mb: float = TENANT_INDEX_MEMORY_MB,
+        size: Callable[[object], int] = index_bytes,
+    ):
+        """`load(index_dir)` opens a tenant's index (or builds its agent)."""
+        self.load = load
+        self.tenants_dir = tenants_dir
+        self.budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.size = size
+        self._resident = OrderedDict()  # tenant -> (value, bytes), LRU first
+        self._loading = {}  # tenant -> Future of the load in progress
+        self._tenants = {}  # tenant -> counters, for every tenant ever requested
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.failed_loads = 0
+
+    def index_dir(self, tenant: str) -> str:
+        if not valid_tenant_id(tenant):
+            raise UnknownTenant(tenant)
+        return os.path.join(self.tenants_dir, tenant)
+
+    def exists(self, tenant: str) -> bool:
+        """True if `tenant` has an ingested index (no load needed)."""
+        if not valid_tenant_id(tenant):
+            return False
+        # Resident tenants skip the filesystem: this runs on every request.
+        if tenant in self._resident:
+            return True
+        return os.path.exists(os.path.join(self.index_dir(tenant), MANIFEST_FILE))
+
+    def tenants(self) -> List[str]:
+        if not os.path.isdir(self.tenants_dir):
+            return []
+        return sorted(t for t in os.listdir(self.tenants_dir) if self.exists(t))
+
+    def _counters(self, tenant: str) -> dict:
+        counters = self._tenants.get(tenant)
+        if counters is None:
+            counters = self._tenants[tenant] = {
+                "hits": 0, "loads": 0, "evictions": 0, "bytes": 0,
+                "last_load_ms": None, "total_load_ms": 0.0, "last_used": None,
+            }
+        return counters
+
+    def get(self, tenant: str):
+        """The tenant's loaded index (or agent); raises UnknownTenant."""
+        with self._lock:
+            entry = self._resident.get(tenant)
+            if entry is not None:
+                self._resident.move_to_end(tenant)
+                self.hits += 1
+                counters = self._counters(tenant)
+                counters["hits"] += 1
+                counters["last_used"] = time.time()
+                return entry[0]
+            waiting = self._loading.get(tenant)
+            if waiting is None:
+                future = self._loading[tenant] = Future()
+        if waiting is not None:
+            return waiting.result()
+
+        start = time.perf_counter()
+        try:
+            if not self.exists(tenant):
+                raise UnknownTenant(tenant)
+            with self._load_lock:
+                value = self.load(self.index_dir(tenant))
+            nbytes = self.size(value)
+        except BaseException as exc:
+            with self._lock:
+                self._loading.pop(tenant, None)
+                if not isinstance(exc, UnknownTenant):
+                    self.failed_loads += 1
+            future.set_exception(exc)
+            raise
+        load_ms = (time.perf_counter() - start) * 1000.0
+
+        with self._lock:
+            self._loading.pop(tenant, None)
+            self._resident[tenant] = (value, nbytes)
+            self.resident_bytes += nbytes
+            self.loads += 1
+            counters = self._counters(tenant)
+            counters["loads"] += 1
+            counters["bytes"] = nbytes
+            counters["last_load_ms"] = round(load_ms, 3)
+            counters["total_load_ms"] += load_ms
+            counters["last_used"] = time.time()
+            self._evict_over_budget()
+        future.set_result(value)
+        return value
+
+    def _evict_over_budget(self) -> None:
+        # Called with the lock held; the newest entry is last and never evicted.
+        while self.resident_bytes > self.budget_bytes and len(self._resident) > 1:
+            tenant, (_, nbytes) = self._resident.popitem(last=False)
+            self.resident_bytes -= nbytes
+            self.evictions += 1
+            self._tenants[tenant]["evictions"] += 1
+
+    def evict(self, tenant: str) -> bool:
+        """Drop a tenant's index (e.g. after re-ingesting it)."""
+        with self._lock:
+            entry = self._resident.pop(tenant, None)
+            if entry is None:
+                return False
+            self.resident_bytes -= entry[1]
+            self.evictions += 1
+            self._tenants[tenant]["evictions"] += 1
+            return True
+
+    def after_fork(self) -> None:
+        """Workers load their own indexes; the mapped files share page cache."""
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._resident = OrderedDict()
+        self._loading = {}
+        self.resident_bytes = 0
+
+    def tenant_stats(self, tenant: Optional[str] = None) -> dict:
+        with self._lock:
+            names = [tenant] if tenant is not None else list(self._tenants)
+            report = {}
+            for name in names:
+                counters = self._tenants.get(name)
+                if counters is None:
+                    continue
+                loads = counters["loads"]
+                report[name] = {
+                    "resident": name in self._resident,
+                    "bytes": counters["bytes"],
+                    "hits": counters["hits"],
+                    "loads": loads,
+                    "evictions": counters["evictions"],
+                    "last_load_ms": counters["last_load_ms"],
+                    "mean_load_ms": round(counters["total_load_ms"] / loads, 3) if loads else None,
+                    "last_used": counters["last_used"],
+                }
+            return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.loads
+            return {
+                "tenants_dir": self.tenants_dir,
+                "budget_mb": round(self.budget_bytes / 1024 / 1024, 3),
+                "resident": len(self._resident),
+                "resident_mb": round(self.resident_bytes / 1024 / 1024, 3),
+                "tenants_seen": len(self._tenants),
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "failed_loads": self.failed_loads,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            }
@@ -1,12 +1,166 @@
+import fcntl
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Optional
+
+import faiss
 from langchain_community.vectorstores import FAISS
+
+from config.settings import KB_SOURCE_DIR, VECTORSTORE_DIR
 from data.knowledge_base import load_documents
-from rag.embeddings import load_embeddings
+from rag.bm25 import BM25Index
+from rag.embeddings import embedding_model_name, load_embeddings
 
-def load_vectorstore():
-    documents = load_documents()
-    embeddings = load_embeddings()
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+LEXICAL_DIR = "bm25"
+MODEL_FILE = "model.txt"
+
+
+def documents_hash(documents, model_name: Optional[str] = None) -> str:
+    """Content hash of the knowledge base plus the embedding model name."""
+    h = hashlib.sha256((model_name or embedding_model_name()).encode("utf-8"))
+    for doc in documents:
+        data = doc.encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()[:16]
+
+
+def index_path(doc_hash: str, index_dir: str = VECTORSTORE_DIR) -> str:
+    return os.path.join(index_dir, doc_hash)
+
+
+def build_index(documents, embeddings, index_dir: str = VECTORSTORE_DIR) -> str:
+    """
+    Embed `documents` and write the FAISS artifact for their hash.
+
+    The index is written to a temporary directory and renamed into place, so a
+    reader never sees a half-written artifact. An existing artifact for the
+    same hash is renamed aside first and deleted after the swap; callers
+    hold the build lock (see `ensure_index`), so a worker starting during
+    the swap waits for it instead of rebuilding. Artifacts for older hashes of
+    the same embedding model are removed afterwards; those of other models
+    (e.g. a stub index built by a benchmark) are kept.
+    """
+    doc_hash = documents_hash(documents)
+    target = index_path(doc_hash, index_dir)
+    os.makedirs(index_dir, exist_ok=True)
+
+    store = FAISS.from_texts(texts=documents, embedding=embeddings)
+    tmp = tempfile.mkdtemp(prefix=".build-", dir=index_dir)
+    store.save_local(tmp)
+    # FAISS.from_texts numbers the documents 0..n-1 in order.
+    BM25Index.build(enumerate(documents)).save(os.path.join(tmp, LEXICAL_DIR))
+    model_name = embedding_model_name()
+    with open(os.path.join(tmp, MODEL_FILE), "w") as f:
+        f.write(model_name)
+    old = None
+    if os.path.isdir(target):
+        old = tempfile.mkdtemp(prefix=".old-", dir=index_dir)
+        os.rename(target, os.path.join(old, doc_hash))
+    os.rename(tmp, target)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if name != doc_hash and os.path.isdir(path) and not name.startswith("."):
+            if artifact_model(path) == model_name:
+                shutil.rmtree(path, ignore_errors=True)
+    return target
+
+
+def artifact_model(path: str) -> Optional[str]:
+    """Embedding model an artifact was built with (None if unrecorded)."""
+    try:
+        with open(os.path.join(path, MODEL_FILE)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_index(path: str):
+    """
+    Read a FAISS index file read-only.
 
-    return FAISS.from_texts(
-        texts=documents,
-        embedding=embeddings
+    The index is memory-mapped so that every worker process shares the
+    same page-cache pages. faiss>=1.8 can map flat indexes (IO_FLAG_MMAP_IFC);
+    older releases only map IVF inverted lists and read flat codes into memory.
+    """
+    flags = faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    try:
+        return faiss.read_index(path, flags)
+    except RuntimeError:
+        return faiss.read_index(path, faiss.IO_FLAG_READ_ONLY)
+
+
+def open_index(path: str, embeddings) -> FAISS:
+    """
+    Open a saved artifact read-only (see `read_index`). The BM25 index saved
+    with it is attached as `store.lexical_index` for hybrid retrieval.
+    """
+    index = read_index(os.path.join(path, INDEX_FILE))
+
+    with open(os.path.join(path, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
     )
+    store.lexical_index = BM25Index.load(os.path.join(path, LEXICAL_DIR))
+    return store
+
+
+def _is_complete(path: str) -> bool:
+    return os.path.exists(os.path.join(path, INDEX_FILE)) and os.path.isdir(os.path.join(path, LEXICAL_DIR))
+
+
+def ensure_index(documents, embeddings, index_dir: str = VECTORSTORE_DIR, force: bool = False) -> str:
+    """
+    Return the artifact path for `documents`, building it if the hash changed
+    (or always with `force`).
+
+    A file lock makes sure only one of several starting workers does the
+    embedding; the others wait and then reuse the artifact it wrote.
+    """
+    target = index_path(documents_hash(documents), index_dir)
+    if _is_complete(target) and not force:
+        return target
+
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if force or not _is_complete(target):
+                print(f"Building vector index at {target}...")
+                build_index(documents, embeddings, index_dir)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return target
+
+
+def knowledge_base_hash() -> str:
+    """Hash of the knowledge base the retriever serves (keys the answer cache)."""
+    if KB_SOURCE_DIR:
+        from rag.ingest import index_meta
+        return index_meta().get("kb_hash", "")
+    return documents_hash(load_documents())
+
+
+def load_vectorstore(embeddings=None):
+    if embeddings is None:
+        embeddings = load_embeddings()
+    if KB_SOURCE_DIR:
+        from rag.ingest import load_kb_vectorstore
+        return load_kb_vectorstore(embeddings)
+
+    documents = load_documents()
+    path = ensure_index(documents, embeddings)
+    return open_index(path, embeddings)